@@ -11,7 +11,9 @@ from app.api.v1.endpoints import (
     geo,
     plan,
     cache,
-    hls_analysis_points
+    hls_analysis_points,
+    tiles,
+    uploads
 )
 
 api_router = APIRouter()
@@ -81,4 +83,16 @@ api_router.include_router(
     hls_analysis_points.router,
     prefix="/hls-analysis-points",
     tags=["hls-analysis-points"]
-)
\ No newline at end of file
+)
+
+api_router.include_router(
+    tiles.router,
+    prefix="/tiles",
+    tags=["vector-tiles"]
+)
+
+api_router.include_router(
+    uploads.router,
+    prefix="/uploads",
+    tags=["uploads"]
+)
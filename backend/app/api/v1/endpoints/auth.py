@@ -9,6 +9,7 @@ from app.core.exceptions import (
     InvalidCredentialsError,
     InvalidTokenError,
     UserNotFoundError,
+    ServiceOverloadedError,
     to_http_exception
 )
 from app.models.user import (
@@ -35,7 +36,7 @@ async def register(user_data: RegisterRequest):
     try:
         user_service = UserService()
         return await user_service.register_user(user_data)
-    except UserAlreadyExistsError as e:
+    except (UserAlreadyExistsError, ServiceOverloadedError) as e:
         raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
@@ -50,7 +51,7 @@ async def login(login_data: LoginRequest):
     try:
         user_service = UserService()
         return await user_service.login_user(login_data.email, login_data.password)
-    except InvalidCredentialsError as e:
+    except (InvalidCredentialsError, ServiceOverloadedError) as e:
         raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
@@ -64,7 +65,7 @@ async def login_form(form_data: OAuth2PasswordRequestForm = Depends()):
     try:
         user_service = UserService()
         return await user_service.login_user(form_data.username, form_data.password)
-    except InvalidCredentialsError as e:
+    except (InvalidCredentialsError, ServiceOverloadedError) as e:
         raise to_http_exception(e)
     except Exception as e:
         raise HTTPException(
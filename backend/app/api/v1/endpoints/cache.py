@@ -4,322 +4,239 @@ Provides pre-processed data for fast response
 """
 
 from fastapi import APIRouter, HTTPException, Query, Depends
-from sqlalchemy.orm import Session
+from supabase import Client
 from typing import Dict, List, Optional, Any
-from datetime import datetime, timedelta
-import json
+from datetime import datetime
 import logging
 
 from app.core.database import get_db
+from app.core.exceptions import DatabaseError
 from app.models.user import User
 from app.api.deps import get_current_user
+from app.repositories.municipality_cache_repository import MunicipalityCacheRepository, CACHE_TABLES
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+MAX_BULK_CODES = 100
+
+
+def get_cache_repository(db: Client = Depends(get_db)) -> MunicipalityCacheRepository:
+    """Dependency to get the municipal cache repository"""
+    return MunicipalityCacheRepository(db)
+
+
+def _build_cached_result(
+    code: str,
+    row: Optional[Dict[str, Any]],
+    include_geometry: bool,
+    include_plan: bool,
+    include_ndvi: bool
+) -> Dict[str, Any]:
+    """Shapes one RPC row into the cached-data response"""
+    row = row or {}
+    result = {
+        "municipality_code": code,
+        "cached": True,
+        "timestamp": datetime.now().isoformat()
+    }
+    if include_geometry:
+        result["geometry"] = row.get("geometry")
+    if include_plan:
+        result["plan"] = row.get("plan")
+    if include_ndvi:
+        result["ndvi"] = row.get("ndvi")
+
+    # Check if all data is available
+    missing_data = [
+        key for key, included in (("geometry", include_geometry), ("plan", include_plan), ("ndvi", include_ndvi))
+        if included and not result.get(key)
+    ]
+    if missing_data:
+        result["missing_data"] = missing_data
+        result["cache_status"] = "partial"
+    else:
+        result["cache_status"] = "complete"
+    return result
+
+
+def _build_status(code: str, row: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Shapes one status RPC row into the cache-status response"""
+    row = row or {}
+    status = {
+        "municipality_code": code,
+        "timestamp": datetime.now().isoformat(),
+        "cache_status": {
+            "geometry": {
+                "available": (row.get("geometry_count") or 0) > 0,
+                "count": row.get("geometry_count") or 0,
+                "last_update": row.get("geometry_last_update"),
+                "expires_at": row.get("geometry_expires_at")
+            },
+            "plan": {
+                "available": (row.get("plan_count") or 0) > 0,
+                "count": row.get("plan_count") or 0,
+                "last_update": row.get("plan_last_update"),
+                "expires_at": row.get("plan_expires_at")
+            },
+            "ndvi": {
+                "available": (row.get("ndvi_count") or 0) > 0,
+                "count": row.get("ndvi_count") or 0,
+                "last_date": row.get("ndvi_last_date"),
+                "expires_at": row.get("ndvi_expires_at")
+            }
+        }
+    }
+
+    available = [entry["available"] for entry in status["cache_status"].values()]
+    status["overall_status"] = "complete" if all(available) else "partial" if any(available) else "missing"
+    return status
+
+
+def _parse_codes(codes: str) -> List[str]:
+    parsed = list(dict.fromkeys(c.strip() for c in codes.split(",") if c.strip()))
+    if not parsed:
+        raise HTTPException(status_code=400, detail="Informe ao menos um código de município")
+    if len(parsed) > MAX_BULK_CODES:
+        raise HTTPException(status_code=400, detail=f"Máximo de {MAX_BULK_CODES} municípios por requisição")
+    return parsed
+
+
 @router.get("/municipality/{code}/cached")
 async def get_cached_municipality_data(
     code: str,
     include_geometry: bool = Query(True),
     include_plan: bool = Query(True),
     include_ndvi: bool = Query(True),
-    db: Session = Depends(get_db)
+    repo: MunicipalityCacheRepository = Depends(get_cache_repository)
 ) -> Dict[str, Any]:
     """
-    Returns municipal data from cache (fast response)
+    Returns municipal data from cache (fast response, single round trip)
     """
     try:
-        result = {
-            "municipality_code": code,
-            "cached": True,
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Search geometry if requested
-        if include_geometry:
-            geometry_result = db.execute("""
-                SELECT municipality_name, state, geometry_data, bbox, source, updated_at
-                FROM municipality_geometry_cache 
-                WHERE municipality_code = :code AND expires_at > NOW()
-            """, {"code": code}).fetchone()
-            
-            if geometry_result:
-                result["geometry"] = {
-                    "name": geometry_result[0],
-                    "state": geometry_result[1],
-                    "geometry": json.loads(geometry_result[2]),
-                    "bbox": json.loads(geometry_result[3]),
-                    "source": geometry_result[4],
-                    "updated_at": geometry_result[5].isoformat()
-                }
-            else:
-                result["geometry"] = None
-        
-        # Search plan if requested
-        if include_plan:
-            plan_result = db.execute("""
-                SELECT municipality_name, state, plan_data, ndvi_data, zones_data, summary_data, updated_at
-                FROM municipality_plan_cache 
-                WHERE municipality_code = :code AND expires_at > NOW()
-            """, {"code": code}).fetchone()
-            
-            if plan_result:
-                result["plan"] = {
-                    "name": plan_result[0],
-                    "state": plan_result[1],
-                    "plan": json.loads(plan_result[2]),
-                    "ndvi_data": json.loads(plan_result[3]) if plan_result[3] else None,
-                    "zones": json.loads(plan_result[4]) if plan_result[4] else None,
-                    "summary": json.loads(plan_result[5]) if plan_result[5] else None,
-                    "updated_at": plan_result[6].isoformat()
-                }
-            else:
-                result["plan"] = None
-        
-        # Search NDVI if requested
-        if include_ndvi:
-            ndvi_results = db.execute("""
-                SELECT date_observed, ndvi_value, cloud_coverage, statistics
-                FROM municipality_ndvi_cache 
-                WHERE municipality_code = :code AND expires_at > NOW()
-                ORDER BY date_observed DESC
-                LIMIT 30
-            """, {"code": code}).fetchall()
-            
-            if ndvi_results:
-                time_series = []
-                for row in ndvi_results:
-                    time_series.append({
-                        "date": row[0].isoformat(),
-                        "ndvi": float(row[1]) if row[1] else None,
-                        "cloud_coverage": row[2],
-                        "statistics": json.loads(row[3]) if row[3] else None
-                    })
-                
-                result["ndvi"] = {
-                    "time_series": time_series,
-                    "count": len(time_series)
-                }
-            else:
-                result["ndvi"] = None
-        
-        # Check if all data is available
-        missing_data = []
-        if include_geometry and not result.get("geometry"):
-            missing_data.append("geometry")
-        if include_plan and not result.get("plan"):
-            missing_data.append("plan")
-        if include_ndvi and not result.get("ndvi"):
-            missing_data.append("ndvi")
-        
-        if missing_data:
-            result["missing_data"] = missing_data
-            result["cache_status"] = "partial"
-        else:
-            result["cache_status"] = "complete"
-        
-        return result
-        
-    except Exception as e:
+        rows = repo.get_cached_data([code], include_geometry, include_plan, include_ndvi)
+        return _build_cached_result(code, rows.get(code), include_geometry, include_plan, include_ndvi)
+    except DatabaseError as e:
         logger.error(f"Error fetching cached data for municipality {code}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+
+@router.get("/municipalities/cached")
+async def get_cached_municipalities_data(
+    codes: str = Query(..., description="Comma-separated IBGE codes"),
+    include_geometry: bool = Query(False),
+    include_plan: bool = Query(True),
+    include_ndvi: bool = Query(True),
+    ndvi_limit: int = Query(30, ge=1, le=365),
+    repo: MunicipalityCacheRepository = Depends(get_cache_repository)
+) -> Dict[str, Any]:
+    """
+    Returns cached data for many municipalities at once (overview dashboards)
+    """
+    code_list = _parse_codes(codes)
+    try:
+        rows = repo.get_cached_data(code_list, include_geometry, include_plan, include_ndvi, ndvi_limit)
+        items = [
+            _build_cached_result(code, rows.get(code), include_geometry, include_plan, include_ndvi)
+            for code in code_list
+        ]
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "count": len(items),
+            "complete": sum(1 for item in items if item["cache_status"] == "complete"),
+            "municipalities": items
+        }
+    except DatabaseError as e:
+        logger.error(f"Error fetching cached data for municipalities {code_list}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
 @router.get("/municipality/{code}/status")
 async def get_municipality_cache_status(
     code: str,
-    db: Session = Depends(get_db)
+    repo: MunicipalityCacheRepository = Depends(get_cache_repository)
 ) -> Dict[str, Any]:
     """
     Returns cache status for a municipality
     """
     try:
-        # Check status of each cache type
-        status = {
-            "municipality_code": code,
+        rows = repo.get_status([code])
+        return _build_status(code, rows.get(code))
+    except DatabaseError as e:
+        logger.error(f"Error checking cache status for municipality {code}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/municipalities/status")
+async def get_municipalities_cache_status(
+    codes: str = Query(..., description="Comma-separated IBGE codes"),
+    repo: MunicipalityCacheRepository = Depends(get_cache_repository)
+) -> Dict[str, Any]:
+    """
+    Returns cache status for many municipalities at once
+    """
+    code_list = _parse_codes(codes)
+    try:
+        rows = repo.get_status(code_list)
+        return {
             "timestamp": datetime.now().isoformat(),
-            "cache_status": {}
+            "municipalities": [_build_status(code, rows.get(code)) for code in code_list]
         }
-        
-        # Geometry status
-        geometry_status = db.execute("""
-            SELECT COUNT(*) as count, MAX(updated_at) as last_update, MIN(expires_at) as expires_at
-            FROM municipality_geometry_cache 
-            WHERE municipality_code = :code AND expires_at > NOW()
-        """, {"code": code}).fetchone()
-        
-        status["cache_status"]["geometry"] = {
-            "available": geometry_status[0] > 0,
-            "count": geometry_status[0],
-            "last_update": geometry_status[1].isoformat() if geometry_status[1] else None,
-            "expires_at": geometry_status[2].isoformat() if geometry_status[2] else None
-        }
-        
-        # Plan status
-        plan_status = db.execute("""
-            SELECT COUNT(*) as count, MAX(updated_at) as last_update, MIN(expires_at) as expires_at
-            FROM municipality_plan_cache 
-            WHERE municipality_code = :code AND expires_at > NOW()
-        """, {"code": code}).fetchone()
-        
-        status["cache_status"]["plan"] = {
-            "available": plan_status[0] > 0,
-            "count": plan_status[0],
-            "last_update": plan_status[1].isoformat() if plan_status[1] else None,
-            "expires_at": plan_status[2].isoformat() if plan_status[2] else None
-        }
-        
-        # NDVI status
-        ndvi_status = db.execute("""
-            SELECT COUNT(*) as count, MAX(date_observed) as last_date, MIN(expires_at) as expires_at
-            FROM municipality_ndvi_cache 
-            WHERE municipality_code = :code AND expires_at > NOW()
-        """, {"code": code}).fetchone()
-        
-        status["cache_status"]["ndvi"] = {
-            "available": ndvi_status[0] > 0,
-            "count": ndvi_status[0],
-            "last_date": ndvi_status[1].isoformat() if ndvi_status[1] else None,
-            "expires_at": ndvi_status[2].isoformat() if ndvi_status[2] else None
-        }
-        
-        # Overall status
-        all_available = all([
-            status["cache_status"]["geometry"]["available"],
-            status["cache_status"]["plan"]["available"],
-            status["cache_status"]["ndvi"]["available"]
-        ])
-        
-        status["overall_status"] = "complete" if all_available else "partial" if any([
-            status["cache_status"]["geometry"]["available"],
-            status["cache_status"]["plan"]["available"],
-            status["cache_status"]["ndvi"]["available"]
-        ]) else "missing"
-        
-        return status
-        
-    except Exception as e:
-        logger.error(f"Error checking cache status for municipality {code}: {e}")
+    except DatabaseError as e:
+        logger.error(f"Error checking cache status for municipalities {code_list}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+
 @router.get("/municipalities/stats")
 async def get_cache_statistics(
-    db: Session = Depends(get_db)
+    repo: MunicipalityCacheRepository = Depends(get_cache_repository)
 ) -> Dict[str, Any]:
     """
     Returns general cache statistics
     """
     try:
-        stats = {
+        data = repo.get_statistics()
+        return {
             "timestamp": datetime.now().isoformat(),
-            "cache_statistics": {}
-        }
-        
-        # Geometry statistics
-        geometry_stats = db.execute("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN expires_at > NOW() THEN 1 END) as active,
-                COUNT(CASE WHEN expires_at <= NOW() THEN 1 END) as expired
-            FROM municipality_geometry_cache
-        """).fetchone()
-        
-        stats["cache_statistics"]["geometry"] = {
-            "total": geometry_stats[0],
-            "active": geometry_stats[1],
-            "expired": geometry_stats[2]
-        }
-        
-        # Plan statistics
-        plan_stats = db.execute("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN expires_at > NOW() THEN 1 END) as active,
-                COUNT(CASE WHEN expires_at <= NOW() THEN 1 END) as expired
-            FROM municipality_plan_cache
-        """).fetchone()
-        
-        stats["cache_statistics"]["plan"] = {
-            "total": plan_stats[0],
-            "active": plan_stats[1],
-            "expired": plan_stats[2]
-        }
-        
-        # NDVI statistics
-        ndvi_stats = db.execute("""
-            SELECT 
-                COUNT(*) as total,
-                COUNT(CASE WHEN expires_at > NOW() THEN 1 END) as active,
-                COUNT(CASE WHEN expires_at <= NOW() THEN 1 END) as expired
-            FROM municipality_ndvi_cache
-        """).fetchone()
-        
-        stats["cache_statistics"]["ndvi"] = {
-            "total": ndvi_stats[0],
-            "active": ndvi_stats[1],
-            "expired": ndvi_stats[2]
-        }
-        
-        # General statistics
-        stats["cache_statistics"]["overall"] = {
-            "total_municipalities": len(set([
-                row[0] for row in db.execute("SELECT DISTINCT municipality_code FROM municipality_geometry_cache").fetchall()
-            ])),
-            "cache_hit_rate": "N/A",  # Would be calculated with usage metrics
-            "last_update": datetime.now().isoformat()
+            "cache_statistics": {
+                "geometry": data.get("geometry", {}),
+                "plan": data.get("plan", {}),
+                "ndvi": data.get("ndvi", {}),
+                "overall": {
+                    "total_municipalities": data.get("total_municipalities", 0),
+                    "cache_hit_rate": "N/A",  # Would be calculated with usage metrics
+                    "last_update": datetime.now().isoformat()
+                }
+            }
         }
-        
-        return stats
-        
-    except Exception as e:
+    except DatabaseError as e:
         logger.error(f"Error fetching cache statistics: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+
 @router.delete("/municipality/{code}/cache")
 async def clear_municipality_cache(
     code: str,
     cache_type: str = Query("all", regex="^(all|geometry|plan|ndvi)$"),
-    db: Session = Depends(get_db),
+    repo: MunicipalityCacheRepository = Depends(get_cache_repository),
     current_user: User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
     Clears cache for a specific municipality (requires authentication)
     """
+    if current_user.role not in ["admin", "moderator"]:
+        raise HTTPException(status_code=403, detail="Permission denied")
+
     try:
-        if current_user.role not in ["admin", "moderator"]:
-            raise HTTPException(status_code=403, detail="Permission denied")
-        
-        deleted_count = 0
-        
-        if cache_type in ["all", "geometry"]:
-            result = db.execute("""
-                DELETE FROM municipality_geometry_cache 
-                WHERE municipality_code = :code
-            """, {"code": code})
-            deleted_count += result.rowcount
-        
-        if cache_type in ["all", "plan"]:
-            result = db.execute("""
-                DELETE FROM municipality_plan_cache 
-                WHERE municipality_code = :code
-            """, {"code": code})
-            deleted_count += result.rowcount
-        
-        if cache_type in ["all", "ndvi"]:
-            result = db.execute("""
-                DELETE FROM municipality_ndvi_cache 
-                WHERE municipality_code = :code
-            """, {"code": code})
-            deleted_count += result.rowcount
-        
-        db.commit()
-        
+        cache_types = list(CACHE_TABLES) if cache_type == "all" else [cache_type]
+        deleted_count = repo.clear(code, cache_types)
+
         return {
             "municipality_code": code,
             "cache_type": cache_type,
             "deleted_records": deleted_count,
             "timestamp": datetime.now().isoformat()
         }
-        
-    except Exception as e:
+    except DatabaseError as e:
         logger.error(f"Error clearing cache for municipality {code}: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
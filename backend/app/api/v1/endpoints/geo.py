@@ -1,27 +1,35 @@
 from fastapi import APIRouter, Query, HTTPException
 from typing import List, Dict, Any
 from app.core.cache import cache
+from app.services.gazetteer_service import gazetteer
+from app.services.nominatim_client import nominatim_client
+from app.services.geometry_store import (
+    GEOMETRY_FORMATS,
+    RESOLUTIONS,
+    encode_topojson,
+    geometry_store,
+    resolution_for_zoom,
+)
 import httpx
 
 
 router = APIRouter()
 
 
-# Mock/placeholder simples. Em produção, substituir por IBGE/Supabase.
-_MUNICIPALITIES = [
-    {
-        "name": "Sinimbu",
-        "ibge_code": "4320676",
-        "state": "RS",
-        "bbox": [-52.60, -29.45, -52.30, -29.75],
-    }
-]
-
-
 @router.get("/search")
-async def search_municipalities(q: str = Query(..., min_length=2), source: str = Query("local")) -> List[Dict[str, Any]]:
+async def search_municipalities(
+    q: str = Query(..., min_length=2),
+    source: str = Query("local"),
+    state: str | None = Query(None, min_length=2, max_length=2),
+    limit: int = Query(10, ge=1, le=50),
+) -> List[Dict[str, Any]]:
+    # Fonte local: gazetteer IBGE em memória (sem I/O, dispensa cache)
+    if source == "local":
+        return [m.to_dict() for m in gazetteer.search(q, limit=limit, state=state)]
+
     q_lower = q.lower()
-    cache_key = f"geo_search:{q_lower}:{source}"
+    uf = state.strip().upper() if state else None
+    cache_key = f"geo_search:{q_lower}:{source}:{uf or ''}:{limit}"
     cached = cache.get(cache_key)
     if cached is not None:
         return cached
@@ -36,14 +44,20 @@ async def search_municipalities(q: str = Query(..., min_length=2), source: str =
                 data = resp.json()
                 # Normaliza
                 items = []
-                for it in data[:10]:
+                for it in data:
+                    item_state = ((it.get("microrregiao") or {}).get("mesorregiao") or {}).get("UF", {}).get("sigla", "")
+                    if uf and item_state != uf:
+                        continue
+                    local = gazetteer.get(str(it.get("id")))
                     items.append({
                         "name": it.get("nome"),
                         "ibge_code": str(it.get("id")),
-                        "state": it.get("microrregiao", {}).get("mesorregiao", {}).get("UF", {}).get("sigla", ""),
-                        "bbox": None,
+                        "state": item_state,
+                        "bbox": list(local.bbox) if local else None,
                         "source": "ibge",
                     })
+                    if len(items) >= limit:
+                        break
                 cache.set(cache_key, items, ttl_seconds=3600)
                 return items
         except Exception:
@@ -53,114 +67,121 @@ async def search_municipalities(q: str = Query(..., min_length=2), source: str =
     # Fonte: OSM Nominatim (boa UX, com bbox)
     if source in ("osm", "nominatim"):
         try:
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                "q": q,
-                "format": "jsonv2",
-                "limit": 10,
-                "addressdetails": 1,
-                "polygon_geojson": 0,
-            }
-            headers = {"User-Agent": "orbee.online/1.0 (contact: admin@orbee.online)"}
-            async with httpx.AsyncClient(timeout=10.0, headers=headers) as client:
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                items = []
-                for it in data:
-                    # Apenas municípios (administrative)
-                    if it.get("type") not in ("administrative", "city", "town", "municipality"):
-                        continue
-                    bbox = it.get("boundingbox")
-                    bbox_num = [float(bbox[2]), float(bbox[0]), float(bbox[3]), float(bbox[1])] if bbox else None  # [minx,miny,maxx,maxy]
-                    items.append({
-                        "name": it.get("display_name", "").split(",")[0],
-                        "ibge_code": None,
-                        "state": (it.get("address", {}).get("state_code") or ""),
-                        "bbox": bbox_num,
-                        "osm_id": it.get("osm_id"),
-                        "source": "osm",
-                    })
-                cache.set(cache_key, items, ttl_seconds=1800)
-                return items
+            # Cliente compartilhado: limite de 1 req/s, coalescing e cache em disco
+            data = await nominatim_client.search(
+                q, format="jsonv2", limit=limit, addressdetails=1, polygon_geojson=0
+            )
+            items = []
+            for it in data:
+                # Apenas municípios (administrative)
+                if it.get("type") not in ("administrative", "city", "town", "municipality"):
+                    continue
+                bbox = it.get("boundingbox")
+                bbox_num = [float(bbox[2]), float(bbox[0]), float(bbox[3]), float(bbox[1])] if bbox else None  # [minx,miny,maxx,maxy]
+                items.append({
+                    "name": it.get("display_name", "").split(",")[0],
+                    "ibge_code": None,
+                    "state": (it.get("address", {}).get("state_code") or ""),
+                    "bbox": bbox_num,
+                    "osm_id": it.get("osm_id"),
+                    "source": "osm",
+                })
+            cache.set(cache_key, items, ttl_seconds=1800)
+            return items
         except Exception:
             pass
 
-    # Local fallback
-    results = [m for m in _MUNICIPALITIES if q_lower in m["name"].lower()]
-    cache.set(cache_key, results, ttl_seconds=3600)
-    return results
+    # Fallback: gazetteer local
+    return [m.to_dict() for m in gazetteer.search(q, limit=limit, state=state)]
 
 
 @router.get("/municipalities/{code}/geometry")
-async def get_municipality_geometry(code: str, source: str = Query("local"), q: str | None = Query(None)) -> Dict[str, Any]:
-    cache_key = f"geo_geom:{code}:{source}:{q or ''}"
-    cached = cache.get(cache_key)
-    if cached is not None:
-        return cached
+async def get_municipality_geometry(
+    code: str,
+    source: str = Query("local"),
+    q: str | None = Query(None),
+    resolution: str | None = Query(None, description="full | high | medium | low | minimal"),
+    zoom: int | None = Query(None, ge=0, le=22),
+    format: str = Query("geojson", description="geojson | topojson"),
+) -> Dict[str, Any]:
+    # Resolução explícita > derivada do zoom > padrão (medium)
+    if resolution is None:
+        resolution = resolution_for_zoom(zoom) if zoom is not None else "medium"
+    if resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=400, detail=f"Resolução inválida. Use: {', '.join(RESOLUTIONS)}")
+    if format not in GEOMETRY_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Formato inválido. Use: {', '.join(GEOMETRY_FORMATS)}")
+
+    # Geometria já armazenada (todas as resoluções pré-computadas)
+    stored = geometry_store.get(code, resolution, format)
+    if stored is not None:
+        return stored
 
     # Geometria via OSM/Nominatim (preferível pois retorna GeoJSON pronto)
     if source in ("osm", "nominatim"):
         try:
-            # Se "q" for fornecido, usar busca direta; senão tentar pelo code como texto de busca
-            search_q = q or code
-            url = "https://nominatim.openstreetmap.org/search"
-            params = {
-                "q": search_q,
-                "format": "jsonv2",
-                "limit": 1,
+            # Sem "q": busca pelo nome oficial do gazetteer (o código como texto livre casa com qualquer lugar)
+            local = gazetteer.get(code)
+            search_q = q or (f"{local.name}, {local.state}, Brasil" if local else code)
+            data = await nominatim_client.request("search", {
+                "format": "json",
                 "polygon_geojson": 1,
-                "addressdetails": 1,
+                "extratags": 1,
+                "dedupe": 0,
+                "limit": 5,
+                "q": search_q,
+            })
+            if not data:
+                raise HTTPException(status_code=404, detail="Geometria não encontrada no OSM")
+            # Só é persistido sob o código IBGE o resultado cuja tag IBGE:GEOCODIGO (ou ref) confirma o código
+            verified = next((
+                it for it in data
+                if code in ((it.get("extratags") or {}).get("IBGE:GEOCODIGO"), (it.get("extratags") or {}).get("ref"))
+            ), None)
+            it = verified or data[0]
+            geom = it.get("geojson")
+            if not geom:
+                raise HTTPException(status_code=404, detail="GeoJSON ausente no OSM")
+            properties = {
+                "name": it.get("display_name", "").split(",")[0],
+                "ibge_code": code if verified else None,
+                "source": "osm",
             }
-            headers = {"User-Agent": "orbee.online/1.0 (contact: admin@orbee.online)"}
-            async with httpx.AsyncClient(timeout=15.0, headers=headers) as client:
-                resp = await client.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                if not data:
-                    raise HTTPException(status_code=404, detail="Geometria não encontrada no OSM")
-                it = data[0]
-                geom = it.get("geojson")
-                if not geom:
-                    raise HTTPException(status_code=404, detail="GeoJSON ausente no OSM")
-                feature = {
-                    "type": "Feature",
-                    "properties": {
-                        "name": it.get("display_name", "").split(",")[0],
-                        "ibge_code": code if code.isdigit() else None,
-                        "source": "osm",
-                    },
-                    "geometry": geom,
-                }
-                fc = {"type": "FeatureCollection", "features": [feature]}
-                cache.set(cache_key, fc, ttl_seconds=3600)
-                return fc
+            if verified and geom.get("type") in ("Polygon", "MultiPolygon"):
+                # Persiste e serve a resolução pedida
+                geometry_store.put(code, geom, properties)
+                return geometry_store.get(code, resolution, format)
+            # Não confirmado (ou não poligonal): devolve como veio, sem persistir
+            feature = {"type": "Feature", "properties": properties, "geometry": geom}
+            if format == "topojson" and geom.get("type") in ("Polygon", "MultiPolygon"):
+                return encode_topojson(feature)
+            return {"type": "FeatureCollection", "features": [feature]}
         except HTTPException:
             raise
         except Exception:
             pass
 
-    # Fallback local (bbox aproximado do mock)
-    m = next((m for m in _MUNICIPALITIES if m["ibge_code"] == code), None)
+    # Fallback local (bbox do gazetteer IBGE)
+    m = gazetteer.get(code)
     if not m:
         raise HTTPException(status_code=404, detail="Município não encontrado")
 
-    minx, miny, maxx, maxy = m["bbox"]
+    minx, miny, maxx, maxy = m.bbox
     feature = {
         "type": "Feature",
         "properties": {
-            "name": m["name"],
-            "ibge_code": m["ibge_code"],
-            "state": m["state"],
+            "name": m.name,
+            "ibge_code": m.ibge_code,
+            "state": m.state,
+            "centroid": list(m.centroid),
             "source": "placeholder",
+            "resolution": resolution,
         },
         "geometry": {
             "type": "Polygon",
             "coordinates": [[[minx, miny], [maxx, miny], [maxx, maxy], [minx, maxy], [minx, miny]]],
         },
     }
-    fc = {"type": "FeatureCollection", "features": [feature]}
-    cache.set(cache_key, fc, ttl_seconds=3600)
-    return fc
-
-
+    if format == "topojson":
+        return encode_topojson(feature)
+    return {"type": "FeatureCollection", "features": [feature]}
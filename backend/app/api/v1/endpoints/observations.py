@@ -1,4 +1,5 @@
 from typing import List, Optional
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer
 
@@ -72,12 +73,17 @@ async def create_observation(
 async def get_observations(
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior (substitui skip)"),
     observation_type: Optional[ObservationType] = None,
-    status: Optional[ObservationStatus] = None,
+    status_filter: Optional[ObservationStatus] = Query(None, alias="status"),
     user_id: Optional[str] = None,
     lat: Optional[float] = Query(None, ge=-90, le=90),
     lon: Optional[float] = Query(None, ge=-180, le=180),
     radius_km: Optional[float] = Query(None, gt=0, le=100),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    has_images: Optional[bool] = None,
+    min_validations: Optional[int] = Query(None, ge=0),
     current_user: Optional[User] = Depends(get_current_user_optional),
     observation_service: ObservationService = Depends(get_observation_service)
 ):
@@ -85,21 +91,31 @@ async def get_observations(
     try:
         filters = ObservationFilter(
             observation_type=observation_type,
-            status=status,
+            status=status_filter,
             user_id=user_id,
             latitude=lat,
             longitude=lon,
-            radius_km=radius_km
+            radius_km=radius_km,
+            date_from=date_from,
+            date_to=date_to,
+            has_images=has_images,
+            min_validations=min_validations
         )
         
         response = await observation_service.get_observations(
             filters=filters,
             user_id=current_user.id if current_user else None,
             skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor
         )
         
         return response
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -110,21 +126,28 @@ async def get_observations(
 @router.get("/search", response_model=ObservationResponse)
 async def search_observations(
     q: str = Query(..., min_length=3),
-    skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor da página anterior"),
+    observation_type: Optional[ObservationType] = None,
     current_user: Optional[User] = Depends(get_current_user_optional),
     observation_service: ObservationService = Depends(get_observation_service)
 ):
-    """Busca observações por texto"""
+    """Busca observações por texto (ranqueada, com trechos destacados)"""
     try:
         response = await observation_service.search_observations(
             query=q,
             user_id=current_user.id if current_user else None,
-            skip=skip,
-            limit=limit
+            limit=limit,
+            cursor=cursor,
+            observation_type=observation_type.value if observation_type else None
         )
         
         return response
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except DatabaseError as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -40,7 +40,9 @@ async def get_action_plan_for_municipality(
 ):
     try:
         # 1) Geometria do município (GeoJSON)
-        geometry_fc = await get_municipality_geometry(code=code, source=source, q=None)
+        geometry_fc = await get_municipality_geometry(
+            code=code, source=source, q=None, resolution="high", zoom=None, format="geojson"
+        )
 
         # 2) NDVI para a AOI do município
         ndvi_service = NDVIService()
@@ -146,7 +148,9 @@ async def get_action_plan_for_municipality_test(
 ):
     try:
         # 1) Geometria do município (GeoJSON)
-        geometry_fc = await get_municipality_geometry(code=code, source=source, q=None)
+        geometry_fc = await get_municipality_geometry(
+            code=code, source=source, q=None, resolution="high", zoom=None, format="geojson"
+        )
 
         # 2) NDVI para a AOI do município
         ndvi_service = NDVIService()
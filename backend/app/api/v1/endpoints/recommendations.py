@@ -2,7 +2,7 @@ from typing import List, Optional
 from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.security import HTTPBearer
 
-from app.models.schemas import Recommendation
+from app.models.schemas import Recommendation, RecommendationBatchRequest, RecommendationBatchResult
 from app.models.user import User
 from app.services.recommendation_service import RecommendationService
 from app.api.deps import get_current_user, get_supabase_client
@@ -95,6 +95,35 @@ async def get_recommendations_by_ndvi(
         )
 
 
+@router.post("/batch", response_model=RecommendationBatchResult)
+async def get_recommendations_batch(
+    batch: RecommendationBatchRequest,
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
+):
+    """Recomendações para muitos pontos (point_ids HLS e/ou coordenadas + NDVI)
+
+    Resposta colunar: o ponto i usa groups[group[i]] (IDs de recomendação),
+    cada recomendação aparece uma única vez em recommendations
+    """
+    if not batch.point_ids and not batch.points:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Informe point_ids e/ou points"
+        )
+    try:
+        return await recommendation_service.get_recommendations_for_points(
+            point_ids=batch.point_ids,
+            points=batch.points,
+            target_audience=batch.target_audience,
+            limit=batch.limit
+        )
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @router.get("/categories", response_model=List[str])
 async def get_recommendation_categories(
     recommendation_service: RecommendationService = Depends(get_recommendation_service)
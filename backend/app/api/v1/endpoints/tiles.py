@@ -0,0 +1,57 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+
+from app.api.deps import get_supabase_client
+from app.services.tile_service import TileService, LAYERS
+from app.core.exceptions import ValidationError, DatabaseError
+
+import gzip
+
+router = APIRouter()
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+def get_tile_service(supabase=Depends(get_supabase_client)) -> TileService:
+    """Dependency para obter o serviço de tiles"""
+    return TileService(supabase)
+
+
+@router.get("/{layer}/{z}/{x}/{y}.mvt")
+async def get_vector_tile(
+    layer: str,
+    z: int,
+    x: int,
+    y: int,
+    request: Request,
+    severity: Optional[str] = Query(None, description="Filtro (lista separada por vírgula)"),
+    status: Optional[str] = Query(None, description="Filtro (lista separada por vírgula)"),
+    type: Optional[str] = Query(None, description="hls-points: level; observations: observation_type"),
+    tile_service: TileService = Depends(get_tile_service),
+):
+    """Tile vetorial (MVT) com os pontos da camada recortados ao tile"""
+    if layer not in LAYERS:
+        raise HTTPException(status_code=404, detail=f"Camada desconhecida. Use: {', '.join(LAYERS)}")
+
+    try:
+        tile, etag = tile_service.get_tile(
+            layer, z, x, y, {"severity": severity, "status": status, "type": type}
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except DatabaseError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": "public, max-age=60",
+        "Vary": "Accept-Encoding",
+    }
+    if request.headers.get("if-none-match") == f'"{etag}"':
+        return Response(status_code=304, headers=headers)
+
+    # Tiles ficam armazenados comprimidos; descomprime só para clientes sem gzip
+    if "gzip" in request.headers.get("accept-encoding", ""):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
+    return Response(content=gzip.decompress(tile), media_type=MVT_MEDIA_TYPE, headers=headers)
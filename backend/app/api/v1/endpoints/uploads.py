@@ -0,0 +1,38 @@
+from typing import Any, Dict
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+
+from app.models.user import User
+from app.api.deps import get_current_user
+from app.services.image_upload_service import image_upload_service, FileTooLargeError
+from app.core.exceptions import FileUploadError
+
+router = APIRouter()
+
+
+@router.post("/images", status_code=status.HTTP_201_CREATED)
+async def upload_image(
+    request: Request,
+    current_user: User = Depends(get_current_user)
+) -> Dict[str, Any]:
+    """Upload de imagem (corpo bruto, ex.: Content-Type: image/jpeg)
+
+    O corpo é lido em streaming: o limite de tamanho é aplicado antes de o
+    arquivo inteiro chegar e nada é mantido em memória. Retorna as URLs do
+    original, da versão WebP e da miniatura (endereçadas pelo SHA-256)
+    """
+    declared = request.headers.get("content-length")
+    try:
+        return await image_upload_service.save_stream(
+            request.stream(),
+            declared_size=int(declared) if declared and declared.isdigit() else None
+        )
+    except FileTooLargeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=str(e)
+        )
+    except FileUploadError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -6,7 +6,9 @@ from app.models.observation import (
     Validation,
     ValidationCreate,
     ValidationUpdate,
-    ValidationStats
+    ValidationStats,
+    ValidationBatchCreate,
+    ValidationBatchResult
 )
 from app.models.validation import ValidationSummary
 from app.models.user import User
@@ -61,6 +63,22 @@ async def create_validation(
         )
 
 
+@router.post("/batch", response_model=ValidationBatchResult)
+async def create_validations_batch(
+    batch: ValidationBatchCreate,
+    current_user: User = Depends(get_current_user),
+    validation_service: ValidationService = Depends(get_validation_service)
+):
+    """Cria várias validações de uma vez; retorna o resultado de cada item"""
+    try:
+        return await validation_service.create_validations_batch(batch, current_user.id)
+    except DatabaseError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+
 @router.get("/", response_model=List[Validation])
 async def get_validations(
     skip: int = Query(0, ge=0),
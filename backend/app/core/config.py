@@ -34,6 +34,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    # bcrypt runs in a bounded thread pool off the event loop; beyond MAX_PENDING queued calls logins get 503
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
     
     # External APIs
     SENTINEL_HUB_CLIENT_ID: str = os.getenv("SENTINEL_HUB_CLIENT_ID", "")
@@ -43,10 +47,41 @@ class Settings(BaseSettings):
     NDVI_PROVIDER: str = os.getenv("NDVI_PROVIDER", "sentinel_hub")  # options: sentinel_hub | earth_engine | sentinel_hub_mock
     ENABLE_SUPER_RESOLUTION: bool = os.getenv("ENABLE_SUPER_RESOLUTION", "false").lower() == "true"
     SUPER_RES_MODEL: str = os.getenv("SUPER_RES_MODEL", "bicubic")  # options: bicubic | dr-3.0 | esrgan
+
+    # Geo / IBGE gazetteer (empty = bundled app/data/ibge_municipalities.csv)
+    IBGE_GAZETTEER_FILE: str = os.getenv("IBGE_GAZETTEER_FILE", "")
+    # Opt-in: regenerates an incomplete gazetteer from the IBGE APIs on startup (writes IBGE_GAZETTEER_FILE)
+    IBGE_GAZETTEER_AUTO_BUILD: bool = os.getenv("IBGE_GAZETTEER_AUTO_BUILD", "false").lower() == "true"
+    # IBGE biome boundaries (empty = bundled app/data/ibge_biomes.geojson); lookup memo grid cell in degrees
+    IBGE_BIOMES_FILE: str = os.getenv("IBGE_BIOMES_FILE", "")
+    BIOME_GRID_CELL_DEG: float = float(os.getenv("BIOME_GRID_CELL_DEG", "0.1"))
+    # Opt-in: builds the missing biome boundaries from IBGE on startup (downloads ~100 MB, needs geopandas)
+    IBGE_BIOMES_AUTO_BUILD: bool = os.getenv("IBGE_BIOMES_AUTO_BUILD", "false").lower() == "true"
+    # Multi-resolution geometry store (empty = app/data/geometry_store)
+    GEOMETRY_STORE_DIR: str = os.getenv("GEOMETRY_STORE_DIR", "")
+    # Nominatim (shared client; cache dir empty = hls_analysis/cache, same as osmnx)
+    NOMINATIM_URL: str = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org/")
+    NOMINATIM_CACHE_DIR: str = os.getenv("NOMINATIM_CACHE_DIR", "")
+    NOMINATIM_RATE_LIMIT: float = float(os.getenv("NOMINATIM_RATE_LIMIT", "1.0"))  # req/s
+
+    # Validation leaderboard (materialized view) max age before the API refreshes it; 0 = pg_cron only
+    VALIDATION_LEADERBOARD_REFRESH_SECONDS: int = int(os.getenv("VALIDATION_LEADERBOARD_REFRESH_SECONDS", "300"))
+    # In-process spatial index for /observations/nearby (grid cell in degrees, full reload interval)
+    SPATIAL_INDEX_CELL_DEG: float = float(os.getenv("SPATIAL_INDEX_CELL_DEG", "0.05"))
+    SPATIAL_INDEX_TTL_SECONDS: int = int(os.getenv("SPATIAL_INDEX_TTL_SECONDS", "300"))
+    
+    # In-memory recommendation catalog: how often to compare its version with the database
+    RECOMMENDATION_CATALOG_CHECK_SECONDS: int = int(os.getenv("RECOMMENDATION_CATALOG_CHECK_SECONDS", "60"))
     
     # File Upload
     MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
     ALLOWED_IMAGE_TYPES: List[str] = ["image/jpeg", "image/png", "image/webp"]
+    # Content-addressed image store (empty = app/data/uploads), served under MEDIA_URL
+    UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "")
+    MEDIA_URL: str = os.getenv("MEDIA_URL", "/media")
+    IMAGE_PROCESS_WORKERS: int = int(os.getenv("IMAGE_PROCESS_WORKERS", "2"))
+    IMAGE_THUMBNAIL_SIZE: int = int(os.getenv("IMAGE_THUMBNAIL_SIZE", "320"))  # px, longest side
+    IMAGE_DISPLAY_SIZE: int = int(os.getenv("IMAGE_DISPLAY_SIZE", "1600"))  # px, longest side
     
     # Environment
     ENVIRONMENT: str = os.getenv("ENVIRONMENT", "development")
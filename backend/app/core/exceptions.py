@@ -62,6 +62,11 @@ class FileUploadError(OrBeeException):
     def __init__(self, message: str = "File upload error"):
         super().__init__(message, status.HTTP_400_BAD_REQUEST)
 
+class ServiceOverloadedError(OrBeeException):
+    """Service temporarily overloaded"""
+    def __init__(self, message: str = "Service temporarily overloaded"):
+        super().__init__(message, status.HTTP_503_SERVICE_UNAVAILABLE)
+
 class DatabaseError(OrBeeException):
     """Database error"""
     def __init__(self, message: str = "Internal server error"):
@@ -0,0 +1,137 @@
+"""
+Off-event-loop password hashing
+bcrypt is deliberately slow (tens of ms per call) and would block the uvicorn
+event loop if run inline. Hash/verify run in a bounded thread pool (bcrypt
+releases the GIL), with an admission limit on queued work and queue-depth /
+latency metrics.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+import bcrypt
+
+from app.core.config import settings
+from app.core.exceptions import ServiceOverloadedError
+
+# bcrypt considera apenas os primeiros 72 bytes
+BCRYPT_MAX_BYTES = 72
+
+
+def _password_bytes(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def hash_password_sync(password: str) -> str:
+    return bcrypt.hashpw(_password_bytes(password), bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)).decode("utf-8")
+
+
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode("utf-8"))
+    except (ValueError, TypeError, AttributeError):
+        # Hash ausente ou malformado
+        return False
+
+
+class PasswordHasher:
+    """Executor limitado para bcrypt com métricas de fila"""
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        self.workers = workers or settings.PASSWORD_HASH_WORKERS
+        self.max_pending = max_pending if max_pending is not None else settings.PASSWORD_HASH_MAX_PENDING
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        # Métricas
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._max_queued = 0
+        self._wait_total = 0.0
+        self._run_total = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="bcrypt")
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, func: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            pending = self._queued + self._running
+            if self.max_pending and pending >= self.max_pending:
+                self._rejected += 1
+                raise ServiceOverloadedError("Too many concurrent authentication requests, try again shortly")
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+        submitted = time.perf_counter()
+        queued = True
+
+        def dequeue() -> None:
+            # Chamado com o lock: libera a vaga na fila uma única vez
+            nonlocal queued
+            if queued:
+                queued = False
+                self._queued -= 1
+
+        def run():
+            started = time.perf_counter()
+            with self._lock:
+                dequeue()
+                self._running += 1
+                self._wait_total += started - submitted
+            try:
+                return func(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._completed += 1
+                    self._run_total += time.perf_counter() - started
+
+        def release(_future) -> None:
+            # Cancelada antes de começar (request cancelado, shutdown): run() nunca roda
+            with self._lock:
+                dequeue()
+
+        try:
+            future = self._get_executor().submit(run)
+        except BaseException:
+            with self._lock:
+                dequeue()
+            raise
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(hash_password_sync, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password_sync, plain_password, hashed_password)
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._completed
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "queued": self._queued,
+                "running": self._running,
+                "max_queued": self._max_queued,
+                "completed": completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._wait_total / completed * 1000, 2) if completed else 0.0,
+                "avg_run_ms": round(self._run_total / completed * 1000, 2) if completed else 0.0,
+            }
+
+
+password_hasher = PasswordHasher()
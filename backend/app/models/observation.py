@@ -94,6 +94,8 @@ class Observation(ObservationInDB):
     user_can_validate: bool = False  # If current user can validate
     confirmed_validations: int = 0  # Computed from validations
     disputed_validations: int = 0  # Computed from validations
+    search_rank: Optional[float] = None  # Text search relevance (search results only)
+    search_snippet: Optional[str] = None  # Description excerpt with <mark> highlights
 
 
 class ValidationBase(BaseModel):
@@ -110,6 +112,27 @@ class ValidationCreate(ValidationBase):
     pass
 
 
+class ValidationBatchCreate(BaseModel):
+    """Many validations submitted at once"""
+    validations: List[ValidationCreate] = Field(..., min_items=1, max_items=100)
+
+
+class ValidationBatchItemResult(BaseModel):
+    """Outcome of one item of a validation batch"""
+    index: int
+    observation_id: str
+    status: str  # created | invalid | observation_not_found | own_observation | duplicate
+    validation_id: Optional[str] = None
+    detail: Optional[str] = None
+
+
+class ValidationBatchResult(BaseModel):
+    """Validation batch outcome"""
+    created: int
+    failed: int
+    results: List[ValidationBatchItemResult]
+
+
 class ValidationUpdate(BaseModel):
     """Model for validation update"""
     status: Optional[ValidationStatus] = None
@@ -175,6 +198,8 @@ class ObservationResponse(BaseModel):
     per_page: int
     has_next: bool
     has_prev: bool
+    next_cursor: Optional[str] = None  # Keyset cursor for the next page
+    total_is_estimate: bool = False  # True when total comes from the planner estimate
 
 
 class NearbyObservation(BaseModel):
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional, List
+from typing import Optional, List, Dict
 from datetime import datetime, date
 from enum import Enum
 from uuid import UUID
@@ -161,6 +161,33 @@ class Recommendation(BaseModel):
     created_at: datetime
 
 
+class RecommendationPointInput(BaseModel):
+    """Coordinate/NDVI tuple for batch recommendations"""
+    id: Optional[str] = None
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    ndvi_value: float = Field(..., ge=-1, le=1)
+
+
+class RecommendationBatchRequest(BaseModel):
+    """Points (HLS point_ids and/or coordinates) to attach recommendations to"""
+    point_ids: List[str] = Field(default_factory=list, max_items=5000)
+    points: List[RecommendationPointInput] = Field(default_factory=list, max_items=5000)
+    target_audience: str = "citizen"
+    limit: int = Field(3, ge=1, le=10)
+
+
+class RecommendationBatchResult(BaseModel):
+    """Columnar batch result: point i uses groups[group[i]]; recommendations holds each item once"""
+    point_ids: List[str]
+    biome: List[Optional[str]]
+    ndvi_value: List[float]
+    group: List[int]
+    groups: List[List[str]]
+    recommendations: Dict[str, Recommendation]
+    not_found: List[str] = []
+
+
 # Notification Models
 class NotificationPreferences(BaseModel):
     email_alerts: bool = True
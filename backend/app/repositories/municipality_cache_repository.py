@@ -0,0 +1,86 @@
+from typing import List, Optional, Dict, Any
+from supabase import Client
+import logging
+
+from app.core.exceptions import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+CACHE_TABLES = {
+    "geometry": "municipality_geometry_cache",
+    "plan": "municipality_plan_cache",
+    "ndvi": "municipality_ndvi_cache",
+}
+
+
+class MunicipalityCacheRepository:
+    """Repositório do cache municipal (geometria, plano e série NDVI) via RPC"""
+
+    def __init__(self, supabase: Client):
+        self.supabase = supabase
+
+    def _check_supabase(self):
+        """Verifica se o Supabase está configurado"""
+        if self.supabase is None:
+            raise DatabaseError("Supabase não configurado - modo de desenvolvimento")
+
+    def get_cached_data(
+        self,
+        codes: List[str],
+        include_geometry: bool = True,
+        include_plan: bool = True,
+        include_ndvi: bool = True,
+        ndvi_limit: int = 30
+    ) -> Dict[str, Dict[str, Any]]:
+        """Geometria + plano + série NDVI de um ou vários municípios em uma única chamada"""
+        self._check_supabase()
+        try:
+            result = self.supabase.rpc("get_municipality_cache_bulk", {
+                "p_codes": codes,
+                "p_include_geometry": include_geometry,
+                "p_include_plan": include_plan,
+                "p_include_ndvi": include_ndvi,
+                "p_ndvi_limit": ndvi_limit,
+            }).execute()
+            return {row["municipality_code"]: row for row in (result.data or [])}
+        except Exception as e:
+            logger.error(f"Erro ao buscar cache municipal {codes}: {e}")
+            raise DatabaseError(f"Erro ao buscar cache municipal: {str(e)}")
+
+    def get_status(self, codes: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Disponibilidade do cache de um ou vários municípios"""
+        self._check_supabase()
+        try:
+            result = self.supabase.rpc("get_municipality_cache_status", {"p_codes": codes}).execute()
+            return {row["municipality_code"]: row for row in (result.data or [])}
+        except Exception as e:
+            logger.error(f"Erro ao verificar status do cache municipal {codes}: {e}")
+            raise DatabaseError(f"Erro ao verificar status do cache: {str(e)}")
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Estatísticas gerais (total/ativo/expirado por tipo)"""
+        self._check_supabase()
+        try:
+            result = self.supabase.rpc("get_municipality_cache_statistics", {}).execute()
+            return result.data or {}
+        except Exception as e:
+            logger.error(f"Erro ao buscar estatísticas do cache: {e}")
+            raise DatabaseError(f"Erro ao buscar estatísticas do cache: {str(e)}")
+
+    def clear(self, code: str, cache_types: List[str]) -> int:
+        """Remove o cache de um município; retorna o número de registros removidos"""
+        self._check_supabase()
+        deleted = 0
+        try:
+            for cache_type in cache_types:
+                result = (
+                    self.supabase.table(CACHE_TABLES[cache_type])
+                    .delete(count="exact")
+                    .eq("municipality_code", code)
+                    .execute()
+                )
+                deleted += result.count if result.count is not None else len(result.data or [])
+            return deleted
+        except Exception as e:
+            logger.error(f"Erro ao limpar cache do município {code}: {e}")
+            raise DatabaseError(f"Erro ao limpar cache: {str(e)}")
@@ -1,8 +1,11 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
 from supabase import Client
+import asyncio
 import logging
 
+import numpy as np
+
 from app.models.observation import (
     Observation,
     ObservationCreate,
@@ -24,6 +27,8 @@ from app.core.exceptions import (
     ValidationError,
     DatabaseError
 )
+from app.services.spatial_index import haversine_km
+from app.services.search_index import observation_search_index
 
 logger = logging.getLogger(__name__)
 
@@ -94,22 +99,11 @@ class ObservationRepository:
             
             obs_data = result.data[0]
             
-            # Calcular se o usuário pode validar
-            user_can_validate = False
-            if user_id and user_id != obs_data["user_id"]:
-                # Verificar se já validou
-                validation_check = self.supabase.table(self.validations_table).select("id").eq(
-                    "observation_id", observation_id
-                ).eq("user_id", user_id).execute()
-                
-                user_can_validate = len(validation_check.data) == 0
-            
-            # Construir objeto Observation
+            # user_can_validate é resolvido em lote pelo ViewerContextLoader do serviço
             observation = Observation(
                 **obs_data,
                 user_name=obs_data.get("users", {}).get("name") if obs_data.get("users") else None,
-                user_avatar=obs_data.get("users", {}).get("avatar_url") if obs_data.get("users") else None,
-                user_can_validate=user_can_validate
+                user_avatar=obs_data.get("users", {}).get("avatar_url") if obs_data.get("users") else None
             )
             
             return observation
@@ -170,25 +164,53 @@ class ObservationRepository:
             logger.error(f"Erro ao buscar observações por localização: {e}")
             pass
         
-        # Fallback: busca simples por proximidade
+        # Fallback: busca simples por proximidade (distâncias calculadas uma vez, vetorizado)
         mock_observations = self._get_mock_observations()
-        nearby_observations = []
-        
-        for obs in mock_observations:
-            distance = self._calculate_distance(
-                latitude, longitude, obs.latitude, obs.longitude
-            )
-            if distance <= radius_km:
-                nearby_observations.append(obs)
-        
-        # Ordena por distância
-        nearby_observations.sort(
-            key=lambda obs: self._calculate_distance(
-                latitude, longitude, obs.latitude, obs.longitude
-            )
+        if not mock_observations:
+            return []
+        distances = haversine_km(
+            latitude, longitude,
+            np.array([obs.latitude for obs in mock_observations]),
+            np.array([obs.longitude for obs in mock_observations])
         )
-        
-        return nearby_observations[:limit]
+        order = [i for i in np.argsort(distances, kind="stable") if distances[i] <= radius_km]
+        return [mock_observations[i] for i in order[:limit]]
+    
+    async def get_all_for_index(self, batch_size: int = 1000) -> List[Observation]:
+        """Todas as observações ativas, em lotes por (created_at, id), para o índice espacial"""
+        if self.supabase is None:
+            # Dados mockados para desenvolvimento
+            return self._get_mock_observations()
+
+        # Falhas do banco sobem: o serviço cai para a RPC em vez de indexar dados falsos
+        try:
+            loop = asyncio.get_running_loop()
+            observations: List[Observation] = []
+            last: Optional[Dict[str, Any]] = None
+            while True:
+                query = (
+                    self.supabase.table(self.observations_table)
+                    .select("*")
+                    .is_("deleted_at", "null")
+                    .order("created_at", desc=True)
+                    .order("id", desc=True)
+                    .limit(batch_size)
+                )
+                if last:
+                    query = query.or_(
+                        f'created_at.lt."{last["created_at"]}",'
+                        f'and(created_at.eq."{last["created_at"]}",id.lt.{last["id"]})'
+                    )
+                # Carga em massa: cada lote é buscado fora do event loop
+                response = await loop.run_in_executor(None, query.execute)
+                rows = response.data or []
+                observations.extend(Observation(**obs) for obs in rows)
+                if len(rows) < batch_size:
+                    return observations
+                last = rows[-1]
+        except Exception as e:
+            logger.error(f"Erro ao carregar observações para o índice espacial: {e}")
+            raise DatabaseError(f"Erro ao carregar observações para o índice espacial: {str(e)}")
     
     async def update(self, observation_id: str, update_data: Dict[str, Any]) -> Optional[Observation]:
         """Atualiza dados da observação"""
@@ -262,6 +284,94 @@ class ObservationRepository:
         mock_observations = self._get_mock_observations()
         return sorted(mock_observations, key=lambda x: x.created_at, reverse=True)[:limit]
     
+    async def list_observations(
+        self,
+        filters: ObservationFilter,
+        cursor: Optional[Tuple[datetime, str]] = None,
+        offset: int = 0,
+        limit: int = 20
+    ) -> Tuple[List[Observation], int, bool, bool]:
+        """Lista observações filtradas no banco (RPC list_observations, migração 008)
+        
+        Retorna (observações, total, total_é_estimado, há_próxima_página)
+        """
+        if self.supabase is None:
+            return self._list_mock_observations(filters, cursor, offset, limit)
+
+        # Falhas do RPC sobem como DatabaseError: nunca devolver dados mockados em produção
+        try:
+            response = self.supabase.rpc("list_observations", {
+                "p_observation_type": filters.observation_type.value if filters.observation_type else None,
+                "p_status": filters.status.value if filters.status else None,
+                "p_user_id": filters.user_id,
+                "p_lat": filters.latitude,
+                "p_lng": filters.longitude,
+                "p_radius_km": filters.radius_km,
+                "p_date_from": filters.date_from.isoformat() if filters.date_from else None,
+                "p_date_to": filters.date_to.isoformat() if filters.date_to else None,
+                "p_has_images": filters.has_images,
+                "p_min_validations": filters.min_validations,
+                "p_cursor_created_at": cursor[0].isoformat() if cursor else None,
+                "p_cursor_id": cursor[1] if cursor else None,
+                "p_offset": offset,
+                "p_limit": limit
+            }).execute()
+            data = response.data or {}
+            rows = data.get("observations") or []
+            observations = [Observation(**obs) for obs in rows[:limit]]
+            return (
+                observations,
+                data.get("total", len(observations)),
+                bool(data.get("total_is_estimate")),
+                len(rows) > limit
+            )
+        except Exception as e:
+            logger.error(f"Erro ao listar observações: {e}")
+            raise DatabaseError(f"Erro ao listar observações: {str(e)}")
+
+    def _list_mock_observations(
+        self,
+        filters: ObservationFilter,
+        cursor: Optional[Tuple[datetime, str]],
+        offset: int,
+        limit: int
+    ) -> Tuple[List[Observation], int, bool, bool]:
+        """Filtragem em memória para desenvolvimento (mesma semântica do RPC)"""
+        filtered = [obs for obs in self._get_mock_observations() if self._matches_filter(obs, filters)]
+        filtered.sort(key=lambda obs: (obs.created_at, obs.id), reverse=True)
+        total = len(filtered)
+        if cursor:
+            filtered = [obs for obs in filtered if (obs.created_at, obs.id) < cursor]
+            offset = 0
+        page = filtered[offset:offset + limit + 1]
+        return page[:limit], total, False, len(page) > limit
+    
+    def _matches_filter(self, obs: Observation, filters: ObservationFilter) -> bool:
+        """Aplica ObservationFilter a uma observação em memória"""
+        if filters.observation_type and obs.observation_type != filters.observation_type:
+            return False
+        if filters.status and obs.status != filters.status:
+            return False
+        if filters.user_id and obs.user_id != filters.user_id:
+            return False
+        if filters.date_from and obs.created_at < filters.date_from:
+            return False
+        if filters.date_to and obs.created_at > filters.date_to:
+            return False
+        if filters.has_images is not None and bool(obs.images) != filters.has_images:
+            return False
+        if filters.min_validations is not None and obs.validation_count < filters.min_validations:
+            return False
+        if filters.tags and not set(filters.tags).issubset(obs.tags or []):
+            return False
+        if filters.latitude is not None and filters.longitude is not None and filters.radius_km:
+            distance = self._calculate_distance(
+                filters.latitude, filters.longitude, obs.latitude, obs.longitude
+            )
+            if distance > filters.radius_km:
+                return False
+        return True
+    
     async def get_validated(self, limit: int = 50) -> List[Observation]:
         """Retorna observações validadas"""
         try:
@@ -288,96 +398,53 @@ class ObservationRepository:
         self, 
         query: str, 
         observation_type: Optional[str] = None,
-        limit: int = 20
-    ) -> List[Observation]:
-        """Busca observações por texto"""
+        limit: int = 20,
+        cursor: Optional[Tuple[float, str]] = None
+    ) -> Tuple[List[Observation], bool]:
+        """Busca textual ranqueada (RPC search_observations, migração 009)
+        
+        Retorna (observações com search_rank/search_snippet, há_próxima_página)
+        """
+        if self.supabase is None:
+            return self._search_mock_observations(query, observation_type, limit, cursor)
+
+        # Falhas do RPC sobem como DatabaseError: nunca ranquear dados mockados em produção
         try:
-            query_builder = (
-                self.supabase.table(self.observations_table)
-                .select("*")
-                .or_(f"description.ilike.%{query}%,location_name.ilike.%{query}%")
-            )
-            
-            if observation_type:
-                query_builder = query_builder.eq("observation_type", observation_type)
-            
-            response = query_builder.limit(limit).execute()
-            
-            if response.data:
-                return [Observation(**obs) for obs in response.data]
+            response = self.supabase.rpc("search_observations", {
+                "p_query": query,
+                "p_observation_type": observation_type,
+                "p_cursor_rank": cursor[0] if cursor else None,
+                "p_cursor_id": cursor[1] if cursor else None,
+                "p_limit": limit
+            }).execute()
+            rows = response.data or []
+            return [Observation(**obs) for obs in rows[:limit]], len(rows) > limit
         except Exception as e:
             logger.error(f"Erro ao buscar observações: {e}")
-            pass
-        
-        # Busca mockada para desenvolvimento
-        mock_observations = self._get_mock_observations()
-        query_lower = query.lower()
-        
-        filtered = [
-            obs for obs in mock_observations
-            if (query_lower in obs.description.lower() or 
-                (obs.location_name and query_lower in obs.location_name.lower())) and
-               (not observation_type or obs.observation_type == observation_type)
+            raise DatabaseError(f"Erro ao buscar observações: {str(e)}")
+
+    def _search_mock_observations(
+        self,
+        query: str,
+        observation_type: Optional[str],
+        limit: int,
+        cursor: Optional[Tuple[float, str]]
+    ) -> Tuple[List[Observation], bool]:
+        """Índice invertido em memória para desenvolvimento"""
+        if not observation_search_index.loaded:
+            observation_search_index.rebuild(self._get_mock_observations())
+        results, has_next = observation_search_index.search(query, observation_type, limit, cursor)
+        observations = [
+            obs.model_copy(update={"search_rank": rank, "search_snippet": snippet})
+            for obs, rank, snippet in results
         ]
-        
-        return filtered[:limit]
+        return observations, has_next
     
     async def get_global_stats(self) -> ObservationStats:
         """Retorna estatísticas globais"""
         try:
-            # Queries para estatísticas reais
-            total_response = self.supabase.table(self.observations_table).select("id", count="exact").execute()
-            validated_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("is_validated", True)
-                .execute()
-            )
-            pending_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("status", ObservationStatus.PENDING.value)
-                .execute()
-            )
-            rejected_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("status", ObservationStatus.REJECTED.value)
-                .execute()
-            )
-            
-            # Buscar observações por tipo
-            type_response = self.supabase.table(self.observations_table).select("observation_type").execute()
-            observations_by_type = {}
-            if type_response.data:
-                for obs in type_response.data:
-                    obs_type = obs.get("observation_type", "other")
-                    observations_by_type[obs_type] = observations_by_type.get(obs_type, 0) + 1
-            
-            # Buscar observações recentes (últimos 7 dias)
-            from datetime import datetime, timedelta
-            week_ago = (datetime.utcnow() - timedelta(days=7)).isoformat()
-            recent_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .gte("created_at", week_ago)
-                .execute()
-            )
-            
-            total_count = total_response.count if total_response.count else 0
-            validated_count = validated_response.count if validated_response.count else 0
-            pending_count = pending_response.count if pending_response.count else 0
-            rejected_count = rejected_response.count if rejected_response.count else 0
-            recent_count = recent_response.count if recent_response.count else 0
-            
-            return ObservationStats(
-                total_observations=total_count,
-                pending_observations=pending_count,
-                validated_observations=validated_count,
-                rejected_observations=rejected_count,
-                observations_by_type=observations_by_type,
-                recent_observations=recent_count
-            )
+            # Contadores mantidos por trigger (migração 005): uma única leitura
+            return self._get_stats_from_counters(None, 7)
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas globais: {e}")
             pass
@@ -412,78 +479,8 @@ class ObservationRepository:
     async def get_user_stats(self, user_id: str, days: Optional[int] = None) -> ObservationStats:
         """Retorna estatísticas de um usuário específico"""
         try:
-            # Query base para observações do usuário
-            base_query = self.supabase.table(self.observations_table).select("id", count="exact").eq("user_id", user_id)
-            
-            # Total de observações do usuário
-            total_response = base_query.execute()
-            
-            # Observações validadas
-            validated_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("user_id", user_id)
-                .eq("is_validated", True)
-                .execute()
-            )
-            
-            # Observações pendentes
-            pending_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("user_id", user_id)
-                .eq("status", ObservationStatus.PENDING.value)
-                .execute()
-            )
-            
-            # Observações rejeitadas
-            rejected_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("user_id", user_id)
-                .eq("status", ObservationStatus.REJECTED.value)
-                .execute()
-            )
-            
-            # Buscar observações por tipo do usuário
-            type_response = (
-                self.supabase.table(self.observations_table)
-                .select("observation_type")
-                .eq("user_id", user_id)
-                .execute()
-            )
-            observations_by_type = {}
-            if type_response.data:
-                for obs in type_response.data:
-                    obs_type = obs.get("observation_type", "other")
-                    observations_by_type[obs_type] = observations_by_type.get(obs_type, 0) + 1
-            
-            # Observações recentes (últimos N dias ou 7 dias por padrão)
-            days_filter = days if days else 7
-            from datetime import datetime, timedelta
-            days_ago = (datetime.utcnow() - timedelta(days=days_filter)).isoformat()
-            recent_response = (
-                self.supabase.table(self.observations_table)
-                .select("id", count="exact")
-                .eq("user_id", user_id)
-                .gte("created_at", days_ago)
-                .execute()
-            )
-            
-            total_count = total_response.count if total_response.count else 0
-            validated_count = validated_response.count if validated_response.count else 0
-            pending_count = pending_response.count if pending_response.count else 0
-            rejected_count = rejected_response.count if rejected_response.count else 0
-            recent_count = recent_response.count if recent_response.count else 0
-            
-            return ObservationStats(
-                total_observations=total_count,
-                pending_observations=pending_count,
-                validated_observations=validated_count,
-                rejected_observations=rejected_count,
-                observations_by_type=observations_by_type,
-                recent_observations=recent_count
-            )
+            # Contadores mantidos por trigger (migração 005): uma única leitura
+            return self._get_stats_from_counters(user_id, days if days else 7)
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas do usuário {user_id}: {e}")
             pass
@@ -518,13 +515,23 @@ class ObservationRepository:
             recent_observations=recent
         )
     
+    def _get_stats_from_counters(self, user_id: Optional[str], days: int) -> ObservationStats:
+        """Lê as estatísticas pré-agregadas (RPC get_observation_stats)"""
+        response = self.supabase.rpc(
+            "get_observation_stats",
+            {"p_user_id": user_id, "p_days": days}
+        ).execute()
+        if not response.data:
+            raise DatabaseError("RPC get_observation_stats sem retorno")
+        return ObservationStats(**response.data)
+    
     def _get_mock_observations(self) -> List[Observation]:
         """Retorna observações mockadas para desenvolvimento"""
         from datetime import datetime
         
         return [
             Observation(
-                id="obs-1",
+                id="6f1c2a3e-8b4d-4c7a-9e21-3d5f7a9b1c01",
                 user_id="mock-user-id",
                 title="Vegetação ciliar em bom estado",
                 description="Vegetação ciliar em bom estado, com presença de espécies nativas.",
@@ -546,7 +553,7 @@ class ObservationRepository:
                 user_can_validate=False
             ),
             Observation(
-                id="obs-2",
+                id="6f1c2a3e-8b4d-4c7a-9e21-3d5f7a9b1c02",
                 user_id="maria-user-id",
                 title="Poluição no Rio Tietê",
                 description="Água com coloração escura e presença de lixo nas margens.",
@@ -568,7 +575,7 @@ class ObservationRepository:
                 user_can_validate=False
             ),
             Observation(
-                id="obs-3",
+                id="6f1c2a3e-8b4d-4c7a-9e21-3d5f7a9b1c03",
                 user_id="joao-user-id",
                 title="Erosão nas margens do córrego",
                 description="Erosão visível nas margens, necessita intervenção urgente.",
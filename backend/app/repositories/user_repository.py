@@ -2,11 +2,11 @@ from typing import Optional, List, Dict, Any
 from datetime import datetime
 from supabase import Client
 from passlib.context import CryptContext
-import bcrypt
 import logging
 
 from app.models.user import UserCreate, UserUpdate, UserInDB, User
 from app.core.exceptions import UserNotFoundError, UserAlreadyExistsError
+from app.core.password_hashing import password_hasher
 
 def get_pwd_context():
     """Returns configured password context"""
@@ -29,44 +29,13 @@ class UserRepository:
         if self.supabase is None:
             raise Exception("Supabase not configured - development mode")
     
-    def _hash_password(self, password: str) -> str:
-        """Hash password using bcrypt directly"""
-        try:
-            print(f"DEBUG: _hash_password called with password: {repr(password)}")
-            print(f"DEBUG: Size in bytes: {len(password.encode('utf-8'))}")
-            
-            # Truncate password to maximum 72 bytes (bcrypt limitation)
-            password_bytes = password.encode('utf-8')
-            if len(password_bytes) > 72:
-                print(f"DEBUG: Password truncated from {len(password_bytes)} to 72 bytes")
-                password_bytes = password_bytes[:72]
-            
-            print(f"DEBUG: Final password for hash: {password_bytes}")
-            
-            # Use bcrypt directly
-            salt = bcrypt.gensalt()
-            result = bcrypt.hashpw(password_bytes, salt)
-            
-            print(f"DEBUG: Hash generated successfully: {result[:20]}...")
-            return result.decode('utf-8')
-            
-        except Exception as e:
-            print(f"DEBUG: Error in _hash_password: {e}")
-            raise e
+    async def _hash_password(self, password: str) -> str:
+        """Hash bcrypt fora do event loop (pool limitado)"""
+        return await password_hasher.hash(password)
     
-    def verify_password(self, plain_password: str, hashed_password: str) -> bool:
-        """Verifies if password is correct using bcrypt directly"""
-        try:
-            # Truncate password to maximum 72 bytes (bcrypt limitation)
-            password_bytes = plain_password.encode('utf-8')
-            if len(password_bytes) > 72:
-                password_bytes = password_bytes[:72]
-            
-            # Use bcrypt directly
-            return bcrypt.checkpw(password_bytes, hashed_password.encode('utf-8'))
-        except Exception as e:
-            print(f"DEBUG: Error in verify_password: {e}")
-            return False
+    async def verify_password(self, plain_password: str, hashed_password: str) -> bool:
+        """Verifies if password is correct (bcrypt off the event loop)"""
+        return await password_hasher.verify(plain_password, hashed_password)
     
     async def create_user(self, user_data: UserCreate) -> UserInDB:
         """Cria um novo usuário"""
@@ -83,7 +52,7 @@ class UserRepository:
             user_dict = {
                 "email": user_data.email,
                 "full_name": user_data.full_name,
-                "password_hash": self._hash_password(user_data.password),
+                "password_hash": await self._hash_password(user_data.password),
                 "username": user_data.email.split("@")[0],  # Username baseado no email
                 "role": "citizen",  # Role padrão
                 "is_active": True
@@ -1,6 +1,7 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from supabase import Client
+from postgrest.exceptions import APIError
 import logging
 
 from app.models.observation import (
@@ -16,6 +17,7 @@ from app.core.exceptions import (
     DatabaseError,
     ObservationNotFoundError
 )
+from app.core.database import get_supabase_service_client
 
 logger = logging.getLogger(__name__)
 
@@ -32,26 +34,6 @@ class ValidationRepository:
     async def create_validation(self, validation_data: ValidationCreate, user_id: str) -> ValidationInDB:
         """Cria nova validação"""
         try:
-            # Verificar se a observação existe
-            obs_check = self.supabase.table(self.observations_table).select("id, user_id").eq(
-                "id", validation_data.observation_id
-            ).execute()
-            
-            if not obs_check.data:
-                raise ObservationNotFoundError("Observação não encontrada")
-            
-            # Verificar se o usuário não é o autor da observação
-            if obs_check.data[0]["user_id"] == user_id:
-                raise ValidationError("Não é possível validar sua própria observação")
-            
-            # Verificar se o usuário já validou esta observação
-            existing_validation = self.supabase.table(self.validations_table).select("id").eq(
-                "observation_id", validation_data.observation_id
-            ).eq("user_id", user_id).execute()
-            
-            if existing_validation.data:
-                raise ValidationError("Usuário já validou esta observação")
-            
             # Preparar dados para inserção
             insert_data = {
                 "observation_id": validation_data.observation_id,
@@ -62,14 +44,16 @@ class ValidationRepository:
                 "evidence_images": validation_data.evidence_images or []
             }
             
-            result = self.supabase.table(self.validations_table).insert(insert_data).execute()
+            # Existência da observação, autoria e duplicidade são garantidas pelo banco
+            # (FK, trigger e índice único - migração 006); contadores via trigger
+            try:
+                result = self.supabase.table(self.validations_table).insert(insert_data).execute()
+            except APIError as e:
+                raise self._map_constraint_error(e)
             
             if not result.data:
                 raise DatabaseError("Falha ao criar validação")
             
-            # Atualizar contadores na observação
-            await self._update_observation_validation_counts(validation_data.observation_id)
-            
             return ValidationInDB(**result.data[0])
             
         except (ObservationNotFoundError, ValidationError):
@@ -78,6 +62,36 @@ class ValidationRepository:
             logger.error(f"Erro ao criar validação: {e}")
             raise DatabaseError(f"Erro ao criar validação: {str(e)}")
     
+    async def create_validations_batch(
+        self,
+        validations: List[ValidationCreate],
+        user_id: str
+    ) -> List[Dict[str, Any]]:
+        """Cria várias validações em uma chamada (RPC create_validations_batch, migração 010)
+        
+        Retorna um resultado por item, na ordem de entrada
+        """
+        try:
+            items = [
+                {
+                    "observation_id": val.observation_id,
+                    "status": val.status.value,
+                    "comment": val.comment,
+                    "confidence_level": val.confidence_level,
+                    "evidence_images": val.evidence_images or []
+                }
+                for val in validations
+            ]
+            result = self.supabase.rpc(
+                "create_validations_batch",
+                {"p_user_id": user_id, "p_items": items}
+            ).execute()
+            return result.data or []
+            
+        except Exception as e:
+            logger.error(f"Erro ao criar lote de validações: {e}")
+            raise DatabaseError(f"Erro ao criar lote de validações: {str(e)}")
+    
     async def get_validation_by_id(self, validation_id: str) -> Validation:
         """Busca validação por ID"""
         try:
@@ -193,10 +207,6 @@ class ValidationRepository:
             if not result.data:
                 raise DatabaseError("Falha ao atualizar validação")
             
-            # Atualizar contadores na observação se o status mudou
-            if "status" in update_data:
-                await self._update_observation_validation_counts(existing.observation_id)
-            
             return await self.get_validation_by_id(validation_id)
             
         except ValidationError:
@@ -217,9 +227,6 @@ class ValidationRepository:
                 "id", validation_id
             ).execute()
             
-            # Atualizar contadores na observação
-            await self._update_observation_validation_counts(existing.observation_id)
-            
             return len(result.data) > 0
             
         except ValidationError:
@@ -229,89 +236,86 @@ class ValidationRepository:
             raise DatabaseError(f"Erro ao remover validação: {str(e)}")
     
     async def get_validation_stats(self, user_id: Optional[str] = None) -> ValidationStats:
-        """Obtém estatísticas de validações"""
+        """Obtém estatísticas de validações (contadores pré-agregados, migração 007)"""
         try:
-            query = self.supabase.table(self.validations_table).select(
-                "status, confidence_level, user_id, users(name)"
-            )
-            
-            if user_id:
-                query = query.eq("user_id", user_id)
-            
-            result = query.execute()
-            
-            total = len(result.data)
-            confirmed = len([val for val in result.data if val["status"] == ValidationStatus.CONFIRMED.value])
-            disputed = len([val for val in result.data if val["status"] == ValidationStatus.DISPUTED.value])
-            
-            # Calcular confiança média
-            if total > 0:
-                avg_confidence = sum(val["confidence_level"] for val in result.data) / total
-            else:
-                avg_confidence = 0.0
-            
-            # Contar validações por usuário
-            validations_by_user = {}
-            for val in result.data:
-                user_name = val.get("users", {}).get("name", "Usuário Anônimo") if val.get("users") else "Usuário Anônimo"
-                validations_by_user[user_name] = validations_by_user.get(user_name, 0) + 1
-            
-            return ValidationStats(
-                total_validations=total,
-                confirmed_validations=confirmed,
-                disputed_validations=disputed,
-                average_confidence=round(avg_confidence, 2),
-                validations_by_user=validations_by_user
-            )
+            result = self.supabase.rpc(
+                "get_validation_stats",
+                {"p_user_id": user_id}
+            ).execute()
+            if not result.data:
+                raise DatabaseError("RPC get_validation_stats sem retorno")
+            return ValidationStats(**result.data)
             
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas de validações: {e}")
             raise DatabaseError(f"Erro ao obter estatísticas: {str(e)}")
     
-    async def _update_observation_validation_counts(self, observation_id: str):
-        """Atualiza contadores de validação na observação"""
+    async def get_validation_summary(self, days: int = 7, top: int = 5) -> Dict[str, Any]:
+        """Resumo geral (contadores, série diária e ranking) em uma única chamada"""
         try:
-            # Contar validações por status
-            validations = self.supabase.table(self.validations_table).select("status").eq(
-                "observation_id", observation_id
+            result = self.supabase.rpc(
+                "get_validation_summary",
+                {"p_days": days, "p_top": top}
             ).execute()
+            if not result.data:
+                raise DatabaseError("RPC get_validation_summary sem retorno")
+            return result.data
             
-            total_validations = len(validations.data)
-            confirmed_validations = len([
-                val for val in validations.data 
-                if val["status"] == ValidationStatus.CONFIRMED.value
-            ])
-            disputed_validations = len([
-                val for val in validations.data 
-                if val["status"] == ValidationStatus.DISPUTED.value
-            ])
-            
-            # Determinar status da observação baseado nas validações
-            observation_status = "pending"
-            if total_validations >= 3:  # Mínimo de 3 validações
-                if confirmed_validations >= (total_validations * 0.7):  # 70% confirmadas
-                    observation_status = "validated"
-                elif disputed_validations >= (total_validations * 0.7):  # 70% disputadas
-                    observation_status = "rejected"
-                else:
-                    observation_status = "under_review"
-            
-            # Atualizar observação
-            update_data = {
-                "validation_count": total_validations,
-                "confirmed_validations": confirmed_validations,
-                "disputed_validations": disputed_validations,
-                "status": observation_status,
-                "updated_at": datetime.utcnow().isoformat()
-            }
+        except Exception as e:
+            logger.error(f"Erro ao obter resumo de validações: {e}")
+            raise DatabaseError(f"Erro ao obter resumo: {str(e)}")
+    
+    async def refresh_leaderboard(self) -> Optional[str]:
+        """Atualiza o ranking de validadores; retorna o horário da atualização"""
+        try:
+            # EXECUTE concedido só ao service_role (migração 007)
+            client = get_supabase_service_client()
+            if client is None:
+                raise DatabaseError("Service role key not configured")
+            result = client.rpc("refresh_validation_leaderboard", {}).execute()
+            return result.data
             
-            self.supabase.table(self.observations_table).update(update_data).eq(
-                "id", observation_id
-            ).execute()
+        except Exception as e:
+            logger.error(f"Erro ao atualizar ranking de validadores: {e}")
+            raise DatabaseError(f"Erro ao atualizar ranking: {str(e)}")
+    
+    async def get_recent_validations(self, days: int = 7, limit: int = 20) -> List[Validation]:
+        """Busca validações recentes de todos os usuários (usa o índice em created_at)"""
+        try:
+            since_date = (datetime.utcnow() - timedelta(days=days)).isoformat()
+            result = self.supabase.table(self.validations_table).select(
+                "*, users(full_name, username, avatar_url, level)"
+            ).gte("created_at", since_date).order("created_at", desc=True).limit(limit).execute()
+            
+            validations = []
+            for val_data in result.data:
+                validation = Validation(
+                    **val_data,
+                    user_name=(val_data["users"].get("full_name") or val_data["users"].get("username"))
+                    if val_data.get("users") else None,
+                    user_avatar=val_data.get("users", {}).get("avatar_url") if val_data.get("users") else None,
+                    user_level=val_data.get("users", {}).get("level") if val_data.get("users") else None
+                )
+                validations.append(validation)
+            
+            return validations
             
         except Exception as e:
-            logger.error(f"Erro ao atualizar contadores de validação: {e}")
-            # Não propagar erro para não quebrar o fluxo principal
+            logger.error(f"Erro ao buscar validações recentes: {e}")
+            raise DatabaseError(f"Erro ao buscar validações recentes: {str(e)}")
+    
+    @staticmethod
+    def _map_constraint_error(error: APIError) -> Exception:
+        """Converte violações de restrição do Postgres em erros de domínio"""
+        code = getattr(error, "code", None)
+        message = f"{getattr(error, 'message', '')} {getattr(error, 'hint', '')}"
+        if code == "23503":  # foreign_key_violation
+            return ObservationNotFoundError("Observação não encontrada")
+        if code == "23505":  # unique_violation
+            return ValidationError("Usuário já validou esta observação")
+        if code == "23514" and "own_observation" in message:  # check_violation (trigger)
+            return ValidationError("Não é possível validar sua própria observação")
+        return DatabaseError(f"Erro ao criar validação: {error}")
     
     async def check_user_can_validate(self, observation_id: str, user_id: str) -> bool:
         """Verifica se o usuário pode validar uma observação"""
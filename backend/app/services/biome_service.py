@@ -0,0 +1,229 @@
+"""
+Brazilian biome lookup
+Point-in-polygon against the IBGE biome boundaries (app/data/ibge_biomes.geojson,
+built by app/utils/build_ibge_biomes.py) through a shapely STRtree of prepared
+geometries. Results are memoized per grid cell: a cell that lies entirely
+inside one biome (or outside all of them) answers every later point with a
+dict lookup; only cells crossed by a boundary fall through to the tree.
+Without the dataset (or shapely) it degrades to the old bounding-box heuristic.
+"""
+
+import json
+import logging
+import math
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BIOMES_FILE = Path(__file__).resolve().parent.parent / "data" / "ibge_biomes.geojson"
+
+# Nome IBGE -> identificador usado em recommendations.biome
+BIOME_SLUGS = {
+    "amazonia": "amazonia",
+    "caatinga": "caatinga",
+    "cerrado": "cerrado",
+    "mata atlantica": "mata_atlantica",
+    "pampa": "pampa",
+    "pantanal": "pantanal",
+}
+
+# Marcador de célula cortada por limite de bioma (exige consulta ponto a ponto)
+_BOUNDARY = object()
+
+
+# Limite norte aproximado do Pampa no RS (lon, lat), do rio Uruguai ao litoral:
+# ao sul da linha ficam São Borja, Santiago, Santa Maria, Rio Pardo e Palmares do Sul;
+# ao norte, Santo Ângelo, Santa Cruz do Sul e Osório (Mata Atlântica)
+PAMPA_NORTH_LIMIT = (
+    (-56.2, -28.0),
+    (-55.0, -28.6),
+    (-54.5, -29.0),
+    (-53.8, -29.6),
+    (-52.5, -29.8),
+    (-51.5, -29.95),
+    (-50.4, -30.2),
+)
+
+
+def heuristic_biome(latitude: float, longitude: float) -> Optional[str]:
+    """Aproximação por retângulos e pelo limite do Pampa (usada apenas sem a malha de biomas)"""
+    if not (-34.0 <= latitude <= 5.5 and -74.0 <= longitude <= -34.0):
+        return None
+    if longitude < -50.0 and latitude < float(np.interp(
+        longitude, [lon for lon, _ in PAMPA_NORTH_LIMIT], [lat for _, lat in PAMPA_NORTH_LIMIT]
+    )):
+        return "pampa"
+    if latitude > -15.0:
+        return "cerrado" if longitude > -50.0 else "amazonia"
+    if latitude < -24.0:
+        # Região Sul fora do Pampa
+        return "mata_atlantica"
+    return "mata_atlantica" if longitude > -50.0 else "cerrado"
+
+
+class BiomeLocator:
+    """STRtree de polígonos preparados com memoização por célula da grade"""
+
+    def __init__(self, path: Optional[Path] = None, cell_size_deg: Optional[float] = None):
+        self.path = Path(path) if path else None
+        self.cell_size_deg = cell_size_deg or settings.BIOME_GRID_CELL_DEG
+        self._lock = threading.Lock()
+        self._tree = None
+        self._geometries: List = []
+        self._biomes: List[str] = []
+        self._cells: Dict[Tuple[int, int], object] = {}
+        self.loaded = False
+
+    @property
+    def size(self) -> int:
+        return len(self._geometries)
+
+    def load(self, path: Optional[Path] = None) -> int:
+        """Carrega a malha de biomas e monta a STRtree. Retorna o número de polígonos"""
+        source = Path(path or self.path or settings.IBGE_BIOMES_FILE or DEFAULT_BIOMES_FILE)
+        try:
+            import shapely
+            from shapely.geometry import shape
+
+            with open(source, "r", encoding="utf-8") as f:
+                features = json.load(f).get("features", [])
+
+            geometries, biomes = [], []
+            for feature in features:
+                biome = (feature.get("properties") or {}).get("biome")
+                if not biome or not feature.get("geometry"):
+                    continue
+                geometry = shape(feature["geometry"])
+                # Um item por polígono: caixas menores na árvore
+                for part in getattr(geometry, "geoms", [geometry]):
+                    shapely.prepare(part)
+                    geometries.append(part)
+                    biomes.append(biome)
+        except FileNotFoundError:
+            logger.warning(f"Malha de biomas não encontrada em {source}; usando aproximação por retângulos")
+            return 0
+        except ImportError:
+            logger.warning("shapely não instalado; usando aproximação por retângulos para biomas")
+            return 0
+        except Exception as e:
+            logger.error(f"Erro ao carregar malha de biomas {source}: {e}")
+            return 0
+
+        with self._lock:
+            self._geometries = geometries
+            self._biomes = biomes
+            self._tree = shapely.STRtree(geometries) if geometries else None
+            self._cells = {}
+            self.loaded = bool(geometries)
+        logger.info(f"Malha de biomas carregada: {len(geometries)} polígonos de {source}")
+        return len(geometries)
+
+    def ensure_loaded(self) -> int:
+        """
+        Gera a malha a partir do IBGE quando ela não existe e a carrega.
+        Opt-in (IBGE_BIOMES_AUTO_BUILD); bloqueante (download + geopandas):
+        rodar fora do event loop
+        """
+        if self.loaded:
+            return self.size
+        if not settings.IBGE_BIOMES_AUTO_BUILD:
+            logger.warning(
+                "Gere a malha de biomas com python app/utils/build_ibge_biomes.py "
+                "(ou defina IBGE_BIOMES_AUTO_BUILD=true)"
+            )
+            return self.size
+
+        from app.utils.build_ibge_biomes import build_biomes
+
+        target = Path(self.path or settings.IBGE_BIOMES_FILE or DEFAULT_BIOMES_FILE)
+        logger.info(f"Malha de biomas ausente; gerando {target} a partir do IBGE")
+        try:
+            build_biomes(target)
+        except Exception as e:
+            logger.error(f"Não foi possível gerar a malha de biomas: {e}")
+            return self.size
+        return self.load(target)
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return (
+            int(math.floor(latitude / self.cell_size_deg)),
+            int(math.floor(longitude / self.cell_size_deg)),
+        )
+
+    def _classify_cell(self, cell: Tuple[int, int]) -> object:
+        """Bioma da célula inteira, None (fora de todos) ou _BOUNDARY"""
+        from shapely.geometry import box
+
+        size = self.cell_size_deg
+        cell_box = box(cell[1] * size, cell[0] * size, (cell[1] + 1) * size, (cell[0] + 1) * size)
+        candidates = self._tree.query(cell_box, predicate="intersects")
+        if len(candidates) == 0:
+            return None
+        for index in candidates:
+            if self._geometries[index].contains(cell_box):
+                return self._biomes[index]
+        return _BOUNDARY
+
+    def _cell_value(self, cell: Tuple[int, int]) -> object:
+        try:
+            return self._cells[cell]
+        except KeyError:
+            value = self._cells[cell] = self._classify_cell(cell)
+            return value
+
+    def _point_lookup(self, latitude: float, longitude: float) -> Optional[str]:
+        from shapely.geometry import Point
+
+        candidates = self._tree.query(Point(longitude, latitude), predicate="intersects")
+        # Pontos exatamente no limite: menor índice, determinístico
+        return self._biomes[min(candidates)] if len(candidates) else None
+
+    def lookup(self, latitude: float, longitude: float) -> Optional[str]:
+        """Bioma (slug) de um ponto WGS84, ou None fora do Brasil"""
+        if not self.loaded:
+            return heuristic_biome(latitude, longitude)
+        value = self._cell_value(self._cell(latitude, longitude))
+        if value is _BOUNDARY:
+            return self._point_lookup(latitude, longitude)
+        return value
+
+    def lookup_many(self, latitudes: Sequence[float], longitudes: Sequence[float]) -> List[Optional[str]]:
+        """Versão em lote: células memoizadas e uma única consulta em massa à árvore para o resto"""
+        lats = np.asarray(latitudes, dtype=np.float64)
+        lons = np.asarray(longitudes, dtype=np.float64)
+        if not self.loaded:
+            return [heuristic_biome(lat, lon) for lat, lon in zip(lats.tolist(), lons.tolist())]
+
+        import shapely
+
+        rows = np.floor(lats / self.cell_size_deg).astype(np.int64)
+        cols = np.floor(lons / self.cell_size_deg).astype(np.int64)
+        results: List[Optional[str]] = [None] * len(lats)
+        pending: List[int] = []
+        for i, cell in enumerate(zip(rows.tolist(), cols.tolist())):
+            value = self._cell_value(cell)
+            if value is _BOUNDARY:
+                pending.append(i)
+            else:
+                results[i] = value
+
+        if pending:
+            points = shapely.points(lons[pending], lats[pending])
+            point_idx, geom_idx = self._tree.query(points, predicate="intersects")
+            # Para cada ponto, o menor índice de polígono (mesmo critério de lookup)
+            matched: Dict[int, int] = {}
+            for p, g in zip(point_idx.tolist(), geom_idx.tolist()):
+                if p not in matched or g < matched[p]:
+                    matched[p] = g
+            for p, g in matched.items():
+                results[pending[p]] = self._biomes[g]
+        return results
+
+
+biome_locator = BiomeLocator()
@@ -0,0 +1,238 @@
+"""
+IBGE municipality gazetteer
+Offline index of Brazilian municipalities (IBGE code, name, UF, bbox, centroid)
+used by /geo/search and by NDVI AOI lookups without any upstream call.
+"""
+
+import csv
+import logging
+import unicodedata
+from bisect import bisect_left
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GAZETTEER_FILE = Path(__file__).resolve().parent.parent / "data" / "ibge_municipalities.csv"
+
+GAZETTEER_COLUMNS = [
+    "ibge_code", "name", "state",
+    "min_lon", "min_lat", "max_lon", "max_lat",
+    "centroid_lon", "centroid_lat",
+]
+
+# The full IBGE table has 5,570 municipalities; fewer rows means a partial/sample file
+COMPLETE_GAZETTEER_MIN_ROWS = 5500
+
+
+def normalize_name(text: str) -> str:
+    """Lowercases, strips accents and collapses separators ("São-Paulo" -> "sao paulo")"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    for sep in ("-", "'", "’", ","):
+        stripped = stripped.replace(sep, " ")
+    return " ".join(stripped.lower().split())
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass(frozen=True)
+class Municipality:
+    """Gazetteer entry. bbox is [minx, miny, maxx, maxy] and centroid is [lon, lat] (EPSG:4326)"""
+    ibge_code: str
+    name: str
+    state: str
+    bbox: Tuple[float, float, float, float]
+    centroid: Tuple[float, float]
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "ibge_code": self.ibge_code,
+            "state": self.state,
+            "bbox": list(self.bbox),
+            "centroid": list(self.centroid),
+            "source": "ibge_local",
+        }
+
+
+class MunicipalityGazetteer:
+    """In-memory prefix/trigram index over the bundled IBGE municipality table"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        self._loaded = False
+        self._municipalities: List[Municipality] = []
+        self._normalized: List[str] = []
+        self._by_code: Dict[str, int] = {}
+        # Sorted (key, index) pairs; each name contributes one key per word start,
+        # so "cruz" matches "Santa Cruz do Sul" with a plain prefix lookup
+        self._prefix_keys: List[Tuple[str, int]] = []
+        self._trigram_index: Dict[str, List[int]] = {}
+        self._trigram_counts: List[int] = []
+
+    @property
+    def size(self) -> int:
+        return len(self._municipalities)
+
+    def load(self, path: Optional[Path] = None) -> int:
+        """Loads the gazetteer file and builds the indexes. Returns the number of entries"""
+        source = Path(path or self.path or settings.IBGE_GAZETTEER_FILE or DEFAULT_GAZETTEER_FILE)
+
+        municipalities: List[Municipality] = []
+        try:
+            with open(source, "r", encoding="utf-8", newline="") as f:
+                for row in csv.DictReader(f):
+                    try:
+                        municipalities.append(Municipality(
+                            ibge_code=row["ibge_code"].strip(),
+                            name=row["name"].strip(),
+                            state=row["state"].strip().upper(),
+                            bbox=(
+                                float(row["min_lon"]), float(row["min_lat"]),
+                                float(row["max_lon"]), float(row["max_lat"]),
+                            ),
+                            centroid=(float(row["centroid_lon"]), float(row["centroid_lat"])),
+                        ))
+                    except (KeyError, ValueError) as e:
+                        logger.warning(f"Invalid gazetteer row skipped ({e}): {row}")
+        except FileNotFoundError:
+            logger.warning(f"IBGE gazetteer file not found: {source}")
+
+        self._build_indexes(municipalities)
+        self.path = source
+        self._loaded = True
+        logger.info(f"IBGE gazetteer loaded: {self.size} municipalities from {source}")
+        return self.size
+
+    def ensure_complete(self) -> int:
+        """
+        Regenerates the gazetteer file from the IBGE APIs when it is missing or
+        incomplete, then reloads it. Opt-in (IBGE_GAZETTEER_AUTO_BUILD); blocking:
+        run it off the event loop.
+        """
+        self._ensure_loaded()
+        if self.size >= COMPLETE_GAZETTEER_MIN_ROWS:
+            return self.size
+        if not settings.IBGE_GAZETTEER_AUTO_BUILD:
+            logger.warning(
+                f"IBGE gazetteer has only {self.size} rows; generate the full table with "
+                "python app/utils/build_ibge_gazetteer.py"
+            )
+            return self.size
+
+        from app.utils.build_ibge_gazetteer import build_gazetteer
+
+        logger.info(f"IBGE gazetteer incomplete ({self.size} rows); rebuilding from the IBGE APIs")
+        try:
+            build_gazetteer(self.path)
+        except Exception as e:
+            logger.error(f"Could not rebuild the IBGE gazetteer: {e}")
+            return self.size
+        return self.load(self.path)
+
+    def _build_indexes(self, municipalities: List[Municipality]) -> None:
+        normalized = [normalize_name(m.name) for m in municipalities]
+
+        prefix_keys: List[Tuple[str, int]] = []
+        trigram_index: Dict[str, List[int]] = {}
+        trigram_counts: List[int] = []
+        for idx, name in enumerate(normalized):
+            words = name.split(" ")
+            for w in range(len(words)):
+                prefix_keys.append((" ".join(words[w:]), idx))
+            grams = _trigrams(name)
+            trigram_counts.append(len(grams))
+            for gram in grams:
+                trigram_index.setdefault(gram, []).append(idx)
+        prefix_keys.sort()
+
+        self._municipalities = municipalities
+        self._normalized = normalized
+        self._by_code = {m.ibge_code: i for i, m in enumerate(municipalities)}
+        self._prefix_keys = prefix_keys
+        self._trigram_index = trigram_index
+        self._trigram_counts = trigram_counts
+
+    def _ensure_loaded(self) -> None:
+        if not self._loaded:
+            self.load()
+
+    def get(self, ibge_code: str) -> Optional[Municipality]:
+        """Looks up a municipality by IBGE code"""
+        self._ensure_loaded()
+        idx = self._by_code.get(str(ibge_code).strip())
+        return self._municipalities[idx] if idx is not None else None
+
+    def get_bbox(self, ibge_code: str) -> Optional[List[float]]:
+        """Returns [minx, miny, maxx, maxy] for an IBGE code"""
+        municipality = self.get(ibge_code)
+        return list(municipality.bbox) if municipality else None
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        state: Optional[str] = None,
+        min_similarity: float = 0.3
+    ) -> List[Municipality]:
+        """
+        Accent/case-insensitive search.
+        Ranking: exact name, name prefix, word prefix, then trigram similarity (typos).
+        """
+        self._ensure_loaded()
+        q = normalize_name(query)
+        if not q or limit <= 0:
+            return []
+        uf = state.strip().upper() if state else None
+
+        def accepted(idx: int) -> bool:
+            return uf is None or self._municipalities[idx].state == uf
+
+        ranked: Dict[int, Tuple[int, float]] = {}
+
+        # Prefix matches over every word start
+        pos = bisect_left(self._prefix_keys, (q, -1))
+        while pos < len(self._prefix_keys):
+            key, idx = self._prefix_keys[pos]
+            if not key.startswith(q):
+                break
+            pos += 1
+            if not accepted(idx):
+                continue
+            name = self._normalized[idx]
+            if name == q:
+                rank = 0
+            elif key == name:
+                rank = 1
+            else:
+                rank = 2
+            if idx not in ranked or ranked[idx][0] > rank:
+                ranked[idx] = (rank, len(name))
+
+        # Trigram fallback only when prefix matches do not fill the page
+        if len(ranked) < limit and len(q) >= 3:
+            q_grams = _trigrams(q)
+            shared: Dict[int, int] = {}
+            for gram in q_grams:
+                for idx in self._trigram_index.get(gram, ()):
+                    shared[idx] = shared.get(idx, 0) + 1
+            for idx, count in shared.items():
+                if idx in ranked or not accepted(idx):
+                    continue
+                similarity = count / (len(q_grams) + self._trigram_counts[idx] - count)
+                if similarity >= min_similarity:
+                    ranked[idx] = (3, -similarity)
+
+        ordered = sorted(ranked.items(), key=lambda kv: (kv[1], self._normalized[kv[0]]))
+        return [self._municipalities[idx] for idx, _ in ordered[:limit]]
+
+
+# Shared instance (loaded on startup, lazily otherwise)
+gazetteer = MunicipalityGazetteer()
@@ -0,0 +1,281 @@
+"""
+Municipality geometry store
+Precomputes simplified + coordinate-quantized versions of each municipality
+boundary at several tolerances and persists them locally, so map/AOI requests
+receive a geometry sized for their zoom level instead of the full polygon.
+"""
+
+import json
+import logging
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GEOMETRY_STORE_DIR = Path(__file__).resolve().parent.parent / "data" / "geometry_store"
+
+# nome -> (tolerância Douglas-Peucker em graus, casas decimais)
+# 1e-4° ≈ 11 m; 5 casas ≈ 1.1 m, 4 ≈ 11 m, 3 ≈ 110 m
+RESOLUTIONS: Dict[str, Tuple[float, int]] = {
+    "full": (0.0, 7),
+    "high": (0.0001, 5),
+    "medium": (0.0005, 4),
+    "low": (0.002, 4),
+    "minimal": (0.01, 3),
+}
+
+GEOMETRY_FORMATS = ("geojson", "topojson")
+
+TOPOJSON_QUANTIZATION = 100_000
+
+
+def resolution_for_zoom(zoom: int) -> str:
+    """Map zoom level (web mercator) -> stored resolution"""
+    if zoom >= 13:
+        return "high"
+    if zoom >= 10:
+        return "medium"
+    if zoom >= 7:
+        return "low"
+    return "minimal"
+
+
+def _simplify_line(coords: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker iterativo (sem recursão) sobre um array Nx2"""
+    n = len(coords)
+    if tolerance <= 0 or n < 3:
+        return coords
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a = coords[start]
+        b = coords[end]
+        segment = coords[start + 1:end]
+        ab = b - a
+        norm = np.hypot(ab[0], ab[1])
+        if norm == 0:
+            dists = np.hypot(segment[:, 0] - a[0], segment[:, 1] - a[1])
+        else:
+            dists = np.abs(ab[0] * (segment[:, 1] - a[1]) - ab[1] * (segment[:, 0] - a[0])) / norm
+        idx = int(np.argmax(dists))
+        if dists[idx] > tolerance:
+            split = start + 1 + idx
+            keep[split] = True
+            stack.append((start, split))
+            stack.append((split, end))
+    return coords[keep]
+
+
+def _simplify_ring(ring: List[List[float]], tolerance: float, decimals: int) -> Optional[List[List[float]]]:
+    """Simplifica e quantiza um anel fechado; None se o anel colapsar"""
+    coords = np.asarray(ring, dtype=float)[:, :2]
+    if len(coords) < 4:
+        return None
+
+    # Divide o anel no vértice mais distante do início para que o DP não
+    # trate o anel fechado como um segmento de comprimento zero
+    far = int(np.argmax(np.hypot(coords[:, 0] - coords[0, 0], coords[:, 1] - coords[0, 1])))
+    if 0 < far < len(coords) - 1:
+        first = _simplify_line(coords[:far + 1], tolerance)
+        second = _simplify_line(coords[far:], tolerance)
+        simplified = np.vstack([first, second[1:]])
+    else:
+        simplified = _simplify_line(coords, tolerance)
+
+    simplified = np.round(simplified, decimals)
+    # Remove vértices repetidos após a quantização
+    if len(simplified) > 1:
+        dup = np.all(simplified[1:] == simplified[:-1], axis=1)
+        simplified = np.vstack([simplified[:1], simplified[1:][~dup]])
+    if len(simplified) < 4:
+        return None
+    if not np.array_equal(simplified[0], simplified[-1]):
+        simplified = np.vstack([simplified, simplified[:1]])
+    return simplified.tolist()
+
+
+def _simplify_polygon(rings: List[List[List[float]]], tolerance: float, decimals: int) -> Optional[List]:
+    if not rings:
+        return None
+    outer = _simplify_ring(rings[0], tolerance, decimals)
+    if outer is None:
+        return None
+    holes = [h for h in (_simplify_ring(r, tolerance, decimals) for r in rings[1:]) if h is not None]
+    return [outer] + holes
+
+
+def simplify_geometry(geometry: Dict[str, Any], tolerance: float, decimals: int) -> Dict[str, Any]:
+    """Simplifica (Douglas-Peucker) e quantiza um Polygon/MultiPolygon GeoJSON"""
+    gtype = geometry.get("type")
+    if gtype == "Polygon":
+        polygon = _simplify_polygon(geometry["coordinates"], tolerance, decimals)
+        if polygon is None:
+            # Anel colapsou nesta tolerância: mantém apenas a quantização
+            polygon = _simplify_polygon(geometry["coordinates"], 0.0, decimals)
+        return {"type": "Polygon", "coordinates": polygon}
+
+    if gtype == "MultiPolygon":
+        polygons = [p for p in (_simplify_polygon(rings, tolerance, decimals) for rings in geometry["coordinates"]) if p]
+        if not polygons:
+            # Todas as partes colapsaram (ilhas pequenas): mantém a maior parte
+            largest = max(geometry["coordinates"], key=lambda rings: len(rings[0]))
+            polygons = [_simplify_polygon(largest, 0.0, decimals)]
+        if len(polygons) == 1:
+            return {"type": "Polygon", "coordinates": polygons[0]}
+        return {"type": "MultiPolygon", "coordinates": polygons}
+
+    return geometry
+
+
+def encode_topojson(feature: Dict[str, Any], quantization: int = TOPOJSON_QUANTIZATION) -> Dict[str, Any]:
+    """Codifica uma Feature Polygon/MultiPolygon como TopoJSON quantizado (arcos delta-codificados)"""
+    geometry = feature["geometry"]
+    polygons = [geometry["coordinates"]] if geometry["type"] == "Polygon" else geometry["coordinates"]
+
+    all_coords = np.asarray([c[:2] for rings in polygons for ring in rings for c in ring], dtype=float)
+    minx, miny = all_coords.min(axis=0)
+    maxx, maxy = all_coords.max(axis=0)
+    kx = (maxx - minx) / (quantization - 1) if maxx > minx else 1.0
+    ky = (maxy - miny) / (quantization - 1) if maxy > miny else 1.0
+
+    arcs: List[List[List[int]]] = []
+    polygon_arcs: List[List[List[int]]] = []
+    for rings in polygons:
+        ring_arcs = []
+        for ring in rings:
+            coords = np.asarray(ring, dtype=float)[:, :2]
+            q = np.empty((len(coords), 2), dtype=np.int64)
+            q[:, 0] = np.round((coords[:, 0] - minx) / kx)
+            q[:, 1] = np.round((coords[:, 1] - miny) / ky)
+            delta = np.vstack([q[:1], np.diff(q, axis=0)])
+            # Descarta deltas nulos (pontos que caíram na mesma célula)
+            nonzero = np.concatenate([[True], np.any(delta[1:] != 0, axis=1)])
+            ring_arcs.append([len(arcs)])
+            arcs.append(delta[nonzero].tolist())
+        polygon_arcs.append(ring_arcs)
+
+    if geometry["type"] == "Polygon":
+        topo_geometry = {"type": "Polygon", "arcs": polygon_arcs[0]}
+    else:
+        topo_geometry = {"type": "MultiPolygon", "arcs": polygon_arcs}
+    topo_geometry["properties"] = feature.get("properties", {})
+
+    return {
+        "type": "Topology",
+        "transform": {"scale": [kx, ky], "translate": [float(minx), float(miny)]},
+        "objects": {
+            "municipality": {"type": "GeometryCollection", "geometries": [topo_geometry]},
+        },
+        "arcs": arcs,
+        "bbox": [float(minx), float(miny), float(maxx), float(maxy)],
+    }
+
+
+class MunicipalityGeometryStore:
+    """Persists each municipality boundary at every resolution in RESOLUTIONS (one JSON file per code)"""
+
+    def __init__(self, base_dir: Optional[Path] = None):
+        self.base_dir = Path(base_dir or settings.GEOMETRY_STORE_DIR or DEFAULT_GEOMETRY_STORE_DIR)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._encoded: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _path(self, code: str) -> Path:
+        safe = "".join(c for c in str(code) if c.isalnum() or c in "-_")
+        return self.base_dir / f"{safe}.json"
+
+    def _load_entry(self, code: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(code)
+        if entry is not None:
+            return entry
+        path = self._path(code)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except Exception as e:
+            logger.warning(f"Arquivo de geometria inválido {path}: {e}")
+            return None
+        with self._lock:
+            self._entries[code] = entry
+        return entry
+
+    def has(self, code: str) -> bool:
+        return self._load_entry(code) is not None
+
+    def put(self, code: str, geometry: Dict[str, Any], properties: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Precomputa todas as resoluções de uma geometria e persiste em disco"""
+        levels = {
+            name: simplify_geometry(geometry, tolerance, decimals)
+            for name, (tolerance, decimals) in RESOLUTIONS.items()
+        }
+        entry = {
+            "code": code,
+            "properties": properties or {},
+            "levels": levels,
+            "created_at": datetime.utcnow().isoformat(),
+        }
+
+        try:
+            self.base_dir.mkdir(parents=True, exist_ok=True)
+            path = self._path(code)
+            tmp = path.with_suffix(".json.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, separators=(",", ":"))
+            os.replace(tmp, path)
+        except Exception as e:
+            # Sem disco gravável: mantém apenas em memória
+            logger.warning(f"Não foi possível persistir geometria {code}: {e}")
+
+        with self._lock:
+            self._entries[code] = entry
+            for key in [k for k in self._encoded if k[0] == code]:
+                del self._encoded[key]
+        return entry
+
+    def get(self, code: str, resolution: str = "medium", fmt: str = "geojson") -> Optional[Dict[str, Any]]:
+        """Retorna FeatureCollection (geojson) ou Topology (topojson) na resolução pedida"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Resolução inválida: {resolution}")
+        if fmt not in GEOMETRY_FORMATS:
+            raise ValueError(f"Formato inválido: {fmt}")
+
+        key = (code, resolution, fmt)
+        encoded = self._encoded.get(key)
+        if encoded is not None:
+            return encoded
+
+        entry = self._load_entry(code)
+        if entry is None:
+            return None
+
+        feature = {
+            "type": "Feature",
+            "properties": {**entry.get("properties", {}), "resolution": resolution},
+            "geometry": entry["levels"][resolution],
+        }
+        if fmt == "topojson":
+            encoded = encode_topojson(feature)
+        else:
+            encoded = {"type": "FeatureCollection", "features": [feature]}
+
+        with self._lock:
+            self._encoded[key] = encoded
+        return encoded
+
+
+# Shared instance
+geometry_store = MunicipalityGeometryStore()
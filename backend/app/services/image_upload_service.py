@@ -0,0 +1,207 @@
+"""
+Observation image upload pipeline
+Streams the request body to disk while hashing and enforcing MAX_FILE_SIZE,
+stores files content-addressed by SHA-256 (duplicate uploads reuse the stored
+copy) and builds the thumbnail + WebP derivatives with PIL in a process pool,
+off the event loop.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app.core.config import settings
+from app.core.exceptions import FileUploadError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_UPLOAD_DIR = Path(__file__).resolve().parent.parent / "data" / "uploads"
+
+# Assinaturas (magic bytes) -> content type; o header do cliente não é confiável
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+)
+_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+ORIGINAL_NAME = "original"
+THUMBNAIL_NAME = "thumb.webp"
+DISPLAY_NAME = "display.webp"
+METADATA_NAME = "meta.json"
+
+
+class FileTooLargeError(FileUploadError):
+    """Upload excede MAX_FILE_SIZE"""
+
+
+def sniff_content_type(head: bytes) -> Optional[str]:
+    for signature, content_type in _SIGNATURES:
+        if head.startswith(signature):
+            return content_type
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+def build_derivatives(source: str, target_dir: str, thumbnail_size: int, display_size: int) -> Dict[str, Any]:
+    """Gera miniatura e versão WebP (executado no pool de processos)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+
+        for name, size, quality in ((DISPLAY_NAME, display_size, 82), (THUMBNAIL_NAME, thumbnail_size, 75)):
+            derivative = image.copy()
+            derivative.thumbnail((size, size), Image.LANCZOS)
+            tmp_path = os.path.join(target_dir, f".{name}.{os.getpid()}.tmp")
+            derivative.save(tmp_path, "WEBP", quality=quality, method=4)
+            os.replace(tmp_path, os.path.join(target_dir, name))
+
+    return {"width": width, "height": height}
+
+
+class ImageUploadService:
+    """Armazenamento endereçado por conteúdo de imagens de observações"""
+
+    def __init__(self, upload_dir: Optional[str] = None, workers: Optional[int] = None):
+        self.upload_dir = Path(upload_dir or settings.UPLOAD_DIR or DEFAULT_UPLOAD_DIR)
+        self.workers = workers or settings.IMAGE_PROCESS_WORKERS
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _target_dir(self, digest: str) -> Path:
+        return self.upload_dir / digest[:2] / digest
+
+    def _url(self, digest: str, name: str) -> str:
+        return f"{settings.MEDIA_URL.rstrip('/')}/{digest[:2]}/{digest}/{name}"
+
+    def _describe(self, digest: str, content_type: str, size: int, deduplicated: bool) -> Dict[str, Any]:
+        target = self._target_dir(digest)
+        with open(target / METADATA_NAME) as f:
+            metadata = json.load(f)
+        original = f"{ORIGINAL_NAME}.{_EXTENSIONS[content_type]}"
+        return {
+            "hash": digest,
+            "content_type": content_type,
+            "size": size,
+            "width": metadata.get("width"),
+            "height": metadata.get("height"),
+            "url": self._url(digest, original),
+            "webp_url": self._url(digest, DISPLAY_NAME),
+            "thumbnail_url": self._url(digest, THUMBNAIL_NAME),
+            "deduplicated": deduplicated
+        }
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], declared_size: Optional[int] = None) -> Dict[str, Any]:
+        """Grava o corpo em streaming; erro assim que o limite é ultrapassado"""
+        max_size = settings.MAX_FILE_SIZE
+        if declared_size is not None and declared_size > max_size:
+            raise FileTooLargeError(f"Arquivo excede o limite de {max_size // (1024 * 1024)} MB")
+
+        self.upload_dir.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        size = 0
+        head = b""
+        fd, tmp_path = tempfile.mkstemp(dir=self.upload_dir, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as tmp:
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    size += len(chunk)
+                    if size > max_size:
+                        raise FileTooLargeError(f"Arquivo excede o limite de {max_size // (1024 * 1024)} MB")
+                    if len(head) < 16:
+                        head += chunk[:16 - len(head)]
+                    hasher.update(chunk)
+                    tmp.write(chunk)
+
+            if size == 0:
+                raise FileUploadError("Arquivo vazio")
+            content_type = sniff_content_type(head)
+            if content_type not in settings.ALLOWED_IMAGE_TYPES:
+                raise FileUploadError(f"Tipo de arquivo não permitido. Aceitos: {', '.join(settings.ALLOWED_IMAGE_TYPES)}")
+
+            digest = hasher.hexdigest()
+            return await self._store(digest, tmp_path, content_type, size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    async def _store(self, digest: str, tmp_path: str, content_type: str, size: int) -> Dict[str, Any]:
+        target = self._target_dir(digest)
+        if (target / METADATA_NAME).exists():
+            return self._describe(digest, content_type, size, deduplicated=True)
+
+        # Uploads simultâneos do mesmo conteúdo esperam o primeiro processamento
+        inflight = self._inflight.get(digest)
+        if inflight is not None:
+            try:
+                await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # O primeiro upload foi cancelado (ex.: cliente desconectou): processa este
+                return await self._store(digest, tmp_path, content_type, size)
+            except Exception:
+                raise FileUploadError("Imagem inválida ou corrompida")
+            return self._describe(digest, content_type, size, deduplicated=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[digest] = future
+        original = target / f"{ORIGINAL_NAME}.{_EXTENSIONS[content_type]}"
+        try:
+            target.mkdir(parents=True, exist_ok=True)
+            loop = asyncio.get_running_loop()
+            metadata = await loop.run_in_executor(
+                self._get_pool(),
+                build_derivatives,
+                tmp_path,
+                str(target),
+                settings.IMAGE_THUMBNAIL_SIZE,
+                settings.IMAGE_DISPLAY_SIZE
+            )
+
+            # Original e meta.json (marcador de conclusão) só entram no diretório
+            # depois das derivadas: falha ou cancelamento não deixa upload pela metade
+            os.replace(tmp_path, original)
+            tmp_meta = target / f".{METADATA_NAME}.tmp"
+            with open(tmp_meta, "w") as f:
+                json.dump(metadata, f)
+            os.replace(tmp_meta, target / METADATA_NAME)
+
+            future.set_result(True)
+            logger.info(f"Imagem armazenada: {digest} ({size} bytes)")
+            return self._describe(digest, content_type, size, deduplicated=False)
+        except Exception as e:
+            original.unlink(missing_ok=True)
+            future.set_exception(e)
+            future.exception()  # evita aviso de exceção não consumida
+            logger.error(f"Erro ao processar imagem {digest}: {e}")
+            raise FileUploadError("Imagem inválida ou corrompida")
+        finally:
+            self._inflight.pop(digest, None)
+            # Cancelamento (BaseException) do dono: libera quem está aguardando
+            if not future.done():
+                future.cancel()
+
+image_upload_service = ImageUploadService()
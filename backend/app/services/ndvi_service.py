@@ -9,6 +9,7 @@ import base64
 from app.models.schemas import NDVIDataPoint, NDVIRequest, NDVIResponse
 from app.core.config import settings
 from app.core.cache import cache
+from app.services.gazetteer_service import gazetteer
 
 
 class NDVIService:
@@ -203,9 +204,10 @@ class NDVIService:
                 print(f"Falha ao derivar bbox da geometria: {e}")
 
         elif municipality_code:
-            # Placeholder: mapear código conhecido para bbox (substituir por lookup em /geo)
-            if municipality_code == "4320676":
-                bbox = [-52.60, -29.75, -52.30, -29.45]
+            # Lookup offline no gazetteer IBGE (código -> bbox)
+            municipality_bbox = gazetteer.get_bbox(municipality_code)
+            if municipality_bbox:
+                bbox = municipality_bbox
 
         # Converter bbox em request aproximado: usar centro para compat com NDVIRequest atual
         cx = (bbox[0] + bbox[2]) / 2
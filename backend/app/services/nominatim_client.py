@@ -0,0 +1,261 @@
+"""
+Nominatim client
+Shared, rate-limited Nominatim access for the API and the HLS scripts:
+token-bucket throttling (usage policy: max 1 req/s), coalescing of identical
+in-flight requests and a durable on-disk response cache that uses the same
+layout as osmnx (sha1(prepared URL).json), so both read each other's entries.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+from urllib.parse import urlencode
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NOMINATIM_CACHE_DIR = Path(__file__).resolve().parent.parent.parent / "hls_analysis" / "cache"
+
+USER_AGENT = "orbee.online/1.0 (contact: admin@orbee.online)"
+
+NominatimResponse = Union[List[Dict[str, Any]], Dict[str, Any]]
+
+
+class TokenBucket:
+    """Thread-safe token bucket; callers reserve a slot and wait the returned delay"""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Consumes one token and returns how long (s) the caller must wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def acquire(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    async def acquire_async(self) -> None:
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+class NominatimClient:
+    """Nominatim search/lookup/reverse with throttling, coalescing and disk cache"""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        cache_dir: Optional[Path] = None,
+        rate_per_second: Optional[float] = None,
+        timeout: float = 15.0,
+        max_retries: int = 2,
+        memory_entries: int = 256,
+    ):
+        self.base_url = (base_url or settings.NOMINATIM_URL).rstrip("/")
+        self.cache_dir = Path(cache_dir or settings.NOMINATIM_CACHE_DIR or DEFAULT_NOMINATIM_CACHE_DIR)
+        self.bucket = TokenBucket(rate_per_second or settings.NOMINATIM_RATE_LIMIT)
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, NominatimResponse]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        # Requisições em andamento (coalescing): url -> Future / Event
+        self._inflight_async: Dict[str, asyncio.Future] = {}
+        self._inflight_sync: Dict[str, threading.Event] = {}
+        self._inflight_lock = threading.Lock()
+
+    # ---- URL / cache ------------------------------------------------------
+
+    def prepared_url(self, request_type: str, params: Dict[str, Any]) -> str:
+        """URL exatamente como o osmnx a monta (a ordem dos params faz parte da chave)"""
+        return f"{self.base_url}/{request_type}?{urlencode(params)}"
+
+    def _cache_path(self, url: str) -> Path:
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    def _remember(self, url: str, data: NominatimResponse) -> None:
+        with self._memory_lock:
+            self._memory[url] = data
+            self._memory.move_to_end(url)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_cached(self, url: str) -> Optional[NominatimResponse]:
+        with self._memory_lock:
+            data = self._memory.get(url)
+            if data is not None:
+                self._memory.move_to_end(url)
+                return data
+        path = self._cache_path(url)
+        if not path.exists():
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            logger.warning(f"Nominatim cache entry unreadable {path}: {e}")
+            return None
+        self._remember(url, data)
+        return data
+
+    def _store(self, url: str, data: NominatimResponse) -> None:
+        self._remember(url, data)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self._cache_path(url)
+            tmp = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except Exception as e:
+            logger.warning(f"Could not persist Nominatim response: {e}")
+
+    @staticmethod
+    def _retry_delay(response: httpx.Response, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return 5.0 * (attempt + 1)
+
+    # ---- Async (API) ------------------------------------------------------
+
+    async def request(self, request_type: str, params: Dict[str, Any]) -> NominatimResponse:
+        """GET /{request_type} respeitando o limite; respostas idênticas concorrentes são compartilhadas"""
+        url = self.prepared_url(request_type, params)
+        cached = self.get_cached(url)
+        if cached is not None:
+            return cached
+
+        inflight = self._inflight_async.get(url)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    raise
+                # A requisição original foi cancelada (ex.: cliente desconectou): busca por conta própria
+                return await self.request(request_type, params)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight_async[url] = future
+        try:
+            data = await self._fetch_async(url)
+            future.set_result(data)
+            return data
+        except Exception as e:
+            future.set_exception(e)
+            # Evita "exception was never retrieved" quando não há outros aguardando
+            future.exception()
+            raise
+        finally:
+            self._inflight_async.pop(url, None)
+            # Cancelamento (BaseException) do dono: libera quem está aguardando
+            if not future.done():
+                future.cancel()
+
+    async def _fetch_async(self, url: str) -> NominatimResponse:
+        async with httpx.AsyncClient(timeout=self.timeout, headers={"User-Agent": USER_AGENT}) as client:
+            for attempt in range(self.max_retries + 1):
+                await self.bucket.acquire_async()
+                resp = await client.get(url)
+                if resp.status_code in (429, 503, 504) and attempt < self.max_retries:
+                    delay = self._retry_delay(resp, attempt)
+                    logger.warning(f"Nominatim respondeu {resp.status_code}; nova tentativa em {delay:.0f}s")
+                    await asyncio.sleep(delay)
+                    continue
+                resp.raise_for_status()
+                data = resp.json()
+                self._store(url, data)
+                return data
+        raise httpx.HTTPError("Nominatim request failed")
+
+    async def search(self, q: str, **params: Any) -> List[Dict[str, Any]]:
+        return await self.request("search", {**params, "q": q})
+
+    # ---- Sync (HLS scripts) -----------------------------------------------
+
+    def request_sync(self, request_type: str, params: Dict[str, Any]) -> NominatimResponse:
+        """Versão síncrona de request() (mesmo cache e mesmo token bucket)"""
+        url = self.prepared_url(request_type, params)
+        cached = self.get_cached(url)
+        if cached is not None:
+            return cached
+
+        with self._inflight_lock:
+            event = self._inflight_sync.get(url)
+            owner = event is None
+            if owner:
+                event = threading.Event()
+                self._inflight_sync[url] = event
+
+        if not owner:
+            event.wait(self.timeout * (self.max_retries + 1))
+            cached = self.get_cached(url)
+            if cached is not None:
+                return cached
+            # A requisição original falhou: tenta por conta própria
+
+        try:
+            return self._fetch_sync(url)
+        finally:
+            if owner:
+                with self._inflight_lock:
+                    self._inflight_sync.pop(url, None)
+                event.set()
+
+    def _fetch_sync(self, url: str) -> NominatimResponse:
+        with httpx.Client(timeout=self.timeout, headers={"User-Agent": USER_AGENT}) as client:
+            for attempt in range(self.max_retries + 1):
+                self.bucket.acquire()
+                resp = client.get(url)
+                if resp.status_code in (429, 503, 504) and attempt < self.max_retries:
+                    delay = self._retry_delay(resp, attempt)
+                    logger.warning(f"Nominatim respondeu {resp.status_code}; nova tentativa em {delay:.0f}s")
+                    time.sleep(delay)
+                    continue
+                resp.raise_for_status()
+                data = resp.json()
+                self._store(url, data)
+                return data
+        raise httpx.HTTPError("Nominatim request failed")
+
+    def geocode_sync(self, query: str, limit: int = 50, polygon_geojson: bool = True) -> List[Dict[str, Any]]:
+        """
+        Geocodifica com os mesmos parâmetros e a mesma ordem de osmnx.geocode_to_gdf
+        (limit=50, para escolher o primeiro (Multi)Polygon): mesma URL, mesmo cache do osmnx
+        """
+        params: Dict[str, Any] = {
+            "format": "json",
+            "polygon_geojson": int(polygon_geojson),
+            "dedupe": 0,
+            "limit": limit,
+            "q": query,
+        }
+        return self.request_sync("search", params)
+
+
+# Shared instance (API + HLS scripts)
+nominatim_client = NominatimClient()
@@ -1,8 +1,13 @@
 from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime, timedelta
+import asyncio
+import base64
 import logging
+import uuid
 from math import radians, cos, sin, asin, sqrt
 
+import numpy as np
+
 from app.models.observation import (
     Observation,
     ObservationCreate,
@@ -22,9 +27,16 @@ from app.core.exceptions import (
     DatabaseError
 )
 from app.core.config import settings
+from app.services.tile_service import TileService
+from app.core.cache import cache
+from app.services.spatial_index import ObservationSpatialIndex, haversine_km, observation_index
+from app.services.search_index import observation_search_index
+from app.services.viewer_context import ViewerContextLoader
 
 logger = logging.getLogger(__name__)
 
+STATS_CACHE_TTL_SECONDS = 30
+
 
 class ObservationService:
     """Service for observation business logic"""
@@ -36,6 +48,8 @@ class ObservationService:
     ):
         self.observation_repo = observation_repo
         self.validation_repo = validation_repo
+        # Serviço é criado por request: os loaders (e sua memória) vivem só neste request
+        self._viewer_loaders: Dict[Optional[str], ViewerContextLoader] = {}
     
     async def create_observation(
         self, 
@@ -72,6 +86,10 @@ class ObservationService:
                 observation_data, user_id, user_token
             )
             
+            TileService.invalidate_layer("observations")
+            observation_index.upsert(observation)
+            observation_search_index.upsert(observation)
+            self._invalidate_stats(user_id)
             logger.info(f"Observation created: {observation.id} by user {user_id}")
             return observation
             
@@ -91,6 +109,7 @@ class ObservationService:
             observation = await self.observation_repo.get_observation_by_id(
                 observation_id, user_id
             )
+            observation = (await self._viewer_context(user_id).attach([observation]))[0]
             
             # Get observation validations
             validations = await self.validation_repo.get_validations_by_observation(
@@ -113,29 +132,63 @@ class ObservationService:
         filters: ObservationFilter,
         user_id: Optional[str] = None,
         skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None
     ) -> ObservationResponse:
-        """Busca observações com filtros"""
+        """Busca observações com filtros (cursor em (created_at, id); skip mantido por compatibilidade)"""
+        decoded_cursor = self._decode_cursor(cursor) if cursor else None
         try:
-            # TODO: Implement proper filtering in repository
-            observations = await self.observation_repo.get_recent(limit=limit)
+            observations, total, total_is_estimate, has_next = await self.observation_repo.list_observations(
+                filters=filters,
+                cursor=decoded_cursor,
+                offset=skip,
+                limit=limit
+            )
+            observations = await self._viewer_context(user_id).attach(observations)
             
-            # TODO: Implement proper counting in repository
-            total = len(observations)
+            next_cursor = None
+            if has_next and observations:
+                last = observations[-1]
+                next_cursor = self._encode_cursor(last.created_at, last.id)
             
             return ObservationResponse(
                 observations=observations,
                 total=total,
                 page=(skip // limit) + 1,
                 per_page=limit,
-                has_next=skip + limit < total,
-                has_prev=skip > 0
+                has_next=has_next,
+                has_prev=bool(cursor) or skip > 0,
+                next_cursor=next_cursor,
+                total_is_estimate=total_is_estimate
             )
             
         except Exception as e:
             logger.error(f"Erro ao buscar observações: {e}")
             raise DatabaseError(f"Erro ao buscar observações: {str(e)}")
     
+    def _viewer_context(self, viewer_id: Optional[str]) -> ViewerContextLoader:
+        """Loader de contexto do visualizador (um por visualizador, por request)"""
+        loader = self._viewer_loaders.get(viewer_id)
+        if loader is None:
+            loader = ViewerContextLoader(self.observation_repo.supabase, viewer_id)
+            self._viewer_loaders[viewer_id] = loader
+        return loader
+    
+    @staticmethod
+    def _encode_cursor(created_at: datetime, observation_id: str) -> str:
+        raw = f"{created_at.isoformat()}|{observation_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[datetime, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            created_at, observation_id = raw.split("|", 1)
+            # O id vai para a RPC como UUID: cursor adulterado é erro do cliente, não do banco
+            return datetime.fromisoformat(created_at), str(uuid.UUID(observation_id))
+        except Exception:
+            raise ValidationError("Cursor de paginação inválido")
+    
     async def get_nearby_observations(
         self,
         lat: float,
@@ -146,32 +199,54 @@ class ObservationService:
     ) -> List[NearbyObservation]:
         """Busca observações próximas a uma localização"""
         try:
-            observations = await self.observation_repo.get_by_location(
-                latitude=lat,
-                longitude=lon,
-                radius_km=radius_km,
-                limit=limit
-            )
-            
-            nearby_observations = []
-            for obs in observations:
-                distance = self._calculate_distance(lat, lon, obs.latitude, obs.longitude)
-                
-                nearby_obs = NearbyObservation(
-                    **obs.dict(),
-                    distance_km=round(distance, 2)
+            index = await self._get_spatial_index()
+            if index is not None:
+                matches = index.within_radius(lat, lon, radius_km, limit=limit)
+            else:
+                # Índice indisponível: RPC PostGIS, distâncias calculadas uma vez (vetorizado)
+                observations = await self.observation_repo.get_by_location(
+                    latitude=lat,
+                    longitude=lon,
+                    radius_km=radius_km,
+                    limit=limit
+                )
+                distances = haversine_km(
+                    lat, lon,
+                    np.array([obs.latitude for obs in observations], dtype=np.float64),
+                    np.array([obs.longitude for obs in observations], dtype=np.float64)
                 )
-                nearby_observations.append(nearby_obs)
+                matches = sorted(zip(observations, distances.tolist()), key=lambda item: item[1])
             
-            # Ordenar por distância
-            nearby_observations.sort(key=lambda x: x.distance_km)
+            attached = await self._viewer_context(user_id).attach([obs for obs, _ in matches])
+            matches = zip(attached, [distance for _, distance in matches])
             
-            return nearby_observations
+            return [
+                NearbyObservation(**obs.dict(exclude={"distance_km"}), distance_km=round(distance, 2))
+                for obs, distance in matches
+            ]
             
         except Exception as e:
             logger.error(f"Erro ao buscar observações próximas: {e}")
             raise DatabaseError(f"Erro ao buscar observações próximas: {str(e)}")
     
+    async def _get_spatial_index(self) -> Optional[ObservationSpatialIndex]:
+        """Índice espacial em memória, recarregado a cada SPATIAL_INDEX_TTL_SECONDS"""
+        if not observation_index.is_stale(settings.SPATIAL_INDEX_TTL_SECONDS):
+            return observation_index
+        async with observation_index.rebuild_lock:
+            if observation_index.is_stale(settings.SPATIAL_INDEX_TTL_SECONDS):
+                observation_index.begin_rebuild()
+                try:
+                    observations = await self.observation_repo.get_all_for_index()
+                    await asyncio.get_running_loop().run_in_executor(None, observation_index.rebuild, observations)
+                except Exception as e:
+                    logger.error(f"Erro ao carregar índice espacial: {e}")
+                    return None
+                finally:
+                    # Sem efeito após a troca; em falha ou cancelamento encerra o registro
+                    observation_index.cancel_rebuild()
+        return observation_index
+    
     async def update_observation(
         self,
         observation_id: str,
@@ -198,6 +273,10 @@ class ObservationService:
             if not observation:
                 raise ObservationNotFoundError(f"Observação {observation_id} não encontrada")
             
+            TileService.invalidate_layer("observations")
+            observation_index.upsert(observation)
+            observation_search_index.upsert(observation)
+            self._invalidate_stats(user_id)
             logger.info(f"Observação atualizada: {observation_id} por usuário {user_id}")
             return observation
             
@@ -218,6 +297,10 @@ class ObservationService:
             success = await self.observation_repo.delete(observation_id)
             
             if success:
+                TileService.invalidate_layer("observations")
+                observation_index.remove(observation_id)
+                observation_search_index.remove(observation_id)
+                self._invalidate_stats(user_id)
                 logger.info(f"Observação removida: {observation_id} por usuário {user_id}")
             
             return success
@@ -241,6 +324,7 @@ class ObservationService:
                 limit=limit,
                 offset=skip
             )
+            observations = await self._viewer_context(user_id).attach(observations)
             
             # TODO: Implement proper counting in repository
             total = len(observations)
@@ -268,6 +352,7 @@ class ObservationService:
             since_date = datetime.utcnow() - timedelta(days=days)
             
             observations = await self.observation_repo.get_recent(limit=limit)
+            observations = await self._viewer_context(None).attach(observations)
             
             return observations
             
@@ -301,6 +386,12 @@ class ObservationService:
     ) -> ObservationStats:
         """Obtém estatísticas de observações"""
         try:
+            # Cache curto na frente dos contadores pré-agregados
+            cache_key = self._stats_cache_key(user_id, days)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
             # Se user_id fornecido, buscar estatísticas específicas do usuário
             if user_id:
                 stats = await self.observation_repo.get_user_stats(user_id, days)
@@ -308,6 +399,7 @@ class ObservationService:
                 # Estatísticas globais
                 stats = await self.observation_repo.get_global_stats()
             
+            cache.set(cache_key, stats, ttl_seconds=STATS_CACHE_TTL_SECONDS)
             return stats
             
         except Exception as e:
@@ -318,30 +410,56 @@ class ObservationService:
         self,
         query: str,
         user_id: Optional[str] = None,
-        skip: int = 0,
-        limit: int = 20
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        observation_type: Optional[str] = None
     ) -> ObservationResponse:
-        """Busca observações por texto"""
+        """Busca observações por texto (ranqueada; cursor em (rank, id))"""
+        decoded_cursor = self._decode_search_cursor(cursor) if cursor else None
         try:
-            observations = await self.observation_repo.search(
+            observations, has_next = await self.observation_repo.search(
                 query=query,
-                limit=limit
+                observation_type=observation_type,
+                limit=limit,
+                cursor=decoded_cursor
             )
+            observations = await self._viewer_context(user_id).attach(observations)
+            
+            next_cursor = None
+            if has_next and observations:
+                last = observations[-1]
+                next_cursor = self._encode_search_cursor(last.search_rank or 0.0, last.id)
             
             # Para busca, não temos contagem total precisa
             return ObservationResponse(
                 observations=observations,
                 total=len(observations),
-                page=(skip // limit) + 1,
+                page=1,
                 per_page=limit,
-                has_next=len(observations) == limit,
-                has_prev=skip > 0
+                has_next=has_next,
+                has_prev=bool(cursor),
+                next_cursor=next_cursor,
+                total_is_estimate=True
             )
             
         except Exception as e:
             logger.error(f"Erro ao buscar observações por texto: {e}")
             raise DatabaseError(f"Erro na busca: {str(e)}")
     
+    @staticmethod
+    def _encode_search_cursor(rank: float, observation_id: str) -> str:
+        raw = f"{rank!r}|{observation_id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def _decode_search_cursor(cursor: str) -> Tuple[float, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            rank, observation_id = raw.split("|", 1)
+            return float(rank), str(uuid.UUID(observation_id))
+        except Exception:
+            raise ValidationError("Cursor de paginação inválido")
+    
     def _calculate_distance(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """Calcula distância entre dois pontos usando fórmula de Haversine"""
         # Converter para radianos
@@ -358,6 +476,15 @@ class ObservationService:
         
         return c * r
     
+    @staticmethod
+    def _stats_cache_key(user_id: Optional[str] = None, days: Optional[int] = None) -> str:
+        return f"observation_stats:{user_id or 'global'}:{days or 7}"
+    
+    def _invalidate_stats(self, user_id: str) -> None:
+        """Descarta as estatísticas em cache afetadas por uma escrita deste processo"""
+        cache.delete(self._stats_cache_key())
+        cache.delete(self._stats_cache_key(user_id))
+    
     async def _validate_observation_data(self, observation_data: ObservationCreate):
         """Valida dados da observação"""
         # Validar coordenadas
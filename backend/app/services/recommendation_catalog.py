@@ -0,0 +1,204 @@
+"""
+In-memory recommendation catalog
+The recommendations table is small and rarely changes, so it is loaded once
+into an immutable snapshot: parsed Recommendation models, per (biome, audience)
+groups holding [min_ndvi, max_ndvi] as numpy arrays in ranking order (priority,
+effectiveness) and precomputed facets. Lookups are answered in-process; the
+snapshot is swapped only when recommendation_catalog_version (migration 011)
+changes.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from supabase import Client
+
+from app.core.config import settings
+from app.core.exceptions import DatabaseError
+from app.models.schemas import Recommendation
+
+logger = logging.getLogger(__name__)
+
+# Chave curinga dos grupos (filtro não informado)
+ANY = None
+
+
+def _parse_action_items(value: Any) -> List[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return []
+    return value if isinstance(value, list) else []
+
+
+def _to_recommendation(row: Dict[str, Any]) -> Recommendation:
+    return Recommendation(
+        id=row["id"],
+        title=row["title"],
+        description=row["description"],
+        priority=str(row["priority"]),
+        category=row["recommendation_type"],
+        applicable_regions=_parse_action_items(row.get("action_items", [])),  # action_items como regiões aplicáveis
+        created_at=datetime.fromisoformat(row["created_at"].replace("Z", "+00:00"))
+    )
+
+
+def _ndvi(value: Any) -> float:
+    # NULL nunca casa com um filtro de NDVI (como lte/gte no PostgREST): NaN falha nas comparações
+    return float(value) if value is not None else np.nan
+
+
+@dataclass
+class _IntervalGroup:
+    """Recomendações de um grupo em ordem de ranking, com os intervalos de NDVI em arrays"""
+    positions: np.ndarray
+    min_ndvi: np.ndarray
+    max_ndvi: np.ndarray
+
+    def stab(self, ndvi_value: Optional[float], limit: int) -> np.ndarray:
+        if ndvi_value is None:
+            return self.positions[:limit]
+        mask = (self.min_ndvi <= ndvi_value) & (self.max_ndvi >= ndvi_value)
+        return self.positions[mask][:limit]
+
+
+@dataclass
+class CatalogSnapshot:
+    version: Optional[int]
+    recommendations: List[Recommendation]
+    groups: Dict[Tuple[Optional[str], Optional[str]], _IntervalGroup]
+    # Extremidades distintas dos intervalos: entre duas consecutivas o conjunto de itens casados não muda
+    breakpoints: np.ndarray = field(default_factory=lambda: np.empty(0))
+    categories: List[str] = field(default_factory=list)
+    biomes: List[str] = field(default_factory=list)
+    audiences: List[str] = field(default_factory=list)
+
+    @classmethod
+    def build(cls, rows: List[Dict[str, Any]], version: Optional[int]) -> "CatalogSnapshot":
+        # Mesma ordem do ORDER BY priority DESC, effectiveness_score DESC (id como desempate estável)
+        rows = sorted(
+            rows,
+            key=lambda r: (-(r.get("priority") or 0), -float(r.get("effectiveness_score") or 0), str(r["id"]))
+        )
+        recommendations = [_to_recommendation(row) for row in rows]
+        min_ndvi = np.array([_ndvi(row.get("min_ndvi")) for row in rows], dtype=np.float64)
+        max_ndvi = np.array([_ndvi(row.get("max_ndvi")) for row in rows], dtype=np.float64)
+
+        members: Dict[Tuple[Optional[str], Optional[str]], List[int]] = {}
+        for position, row in enumerate(rows):
+            biome, audience = row.get("biome"), row.get("target_audience")
+            for key in {(biome, audience), (biome, ANY), (ANY, audience), (ANY, ANY)}:
+                members.setdefault(key, []).append(position)
+
+        groups = {}
+        for key, positions in members.items():
+            index = np.array(sorted(positions), dtype=np.int64)
+            groups[key] = _IntervalGroup(index, min_ndvi[index], max_ndvi[index])
+
+        bounds = np.concatenate([min_ndvi, max_ndvi])
+        return cls(
+            version=version,
+            recommendations=recommendations,
+            groups=groups,
+            breakpoints=np.unique(bounds[~np.isnan(bounds)]),
+            categories=sorted({row["recommendation_type"] for row in rows}),
+            biomes=sorted({row["biome"] for row in rows if row.get("biome")}),
+            audiences=sorted({row["target_audience"] for row in rows})
+        )
+
+    def ndvi_bands(self, values: np.ndarray) -> np.ndarray:
+        """Faixa de NDVI de cada valor: mesma faixa => mesmas recomendações
+
+        Faixa 2k = aberto entre breakpoints k-1 e k; 2k + 1 = exatamente no breakpoint k
+        """
+        values = np.asarray(values, dtype=np.float64)
+        index = np.searchsorted(self.breakpoints, values, side="left")
+        on_breakpoint = np.zeros(len(values), dtype=bool)
+        inside = index < len(self.breakpoints)
+        on_breakpoint[inside] = self.breakpoints[index[inside]] == values[inside]
+        return 2 * index + on_breakpoint
+
+    def query(
+        self,
+        ndvi_value: Optional[float] = None,
+        biome: Optional[str] = None,
+        target_audience: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Recommendation]:
+        group = self.groups.get((biome or ANY, target_audience or ANY))
+        if group is None:
+            return []
+        return [self.recommendations[position] for position in group.stab(ndvi_value, limit)]
+
+
+class RecommendationCatalog:
+    """Snapshot do catálogo com verificação periódica de versão"""
+
+    def __init__(self):
+        self.recommendations_table = "recommendations"
+        self.version_table = "recommendation_catalog_version"
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._checked_at = 0.0
+
+    @property
+    def loaded(self) -> bool:
+        return self._snapshot is not None
+
+    def _fetch_version(self, supabase: Client) -> Optional[int]:
+        try:
+            result = supabase.table(self.version_table).select("version").eq("id", 1).limit(1).execute()
+            return int(result.data[0]["version"]) if result.data else None
+        except Exception as e:
+            # Sem a migração 011: recarrega a cada intervalo de verificação
+            logger.warning(f"Versão do catálogo de recomendações indisponível: {e}")
+            return None
+
+    def refresh(self, supabase: Optional[Client], force: bool = False) -> CatalogSnapshot:
+        """Recarrega o catálogo se a versão mudou (ou sempre, com force)"""
+        with self._lock:
+            current = self._snapshot
+            if supabase is None:
+                if current is None:
+                    raise DatabaseError("Catálogo de recomendações indisponível: Supabase não configurado")
+                return current
+            # Outra thread acabou de verificar
+            if not force and current is not None and time.monotonic() - self._checked_at < settings.RECOMMENDATION_CATALOG_CHECK_SECONDS:
+                return current
+
+            self._checked_at = time.monotonic()
+            version = self._fetch_version(supabase)
+            if not force and current is not None and version is not None and version == current.version:
+                return current
+
+            try:
+                result = supabase.table(self.recommendations_table).select("*").execute()
+                snapshot = CatalogSnapshot.build(result.data or [], version)
+            except Exception as e:
+                logger.error(f"Erro ao carregar catálogo de recomendações: {e}")
+                if current is None:
+                    raise DatabaseError(f"Erro ao carregar catálogo de recomendações: {str(e)}")
+                return current
+
+            self._snapshot = snapshot
+            logger.info(
+                f"Catálogo de recomendações carregado: {len(snapshot.recommendations)} itens (versão {version})"
+            )
+            return snapshot
+
+    def get(self, supabase: Optional[Client]) -> CatalogSnapshot:
+        """Snapshot atual; verifica a versão no banco no máximo a cada RECOMMENDATION_CATALOG_CHECK_SECONDS"""
+        snapshot = self._snapshot
+        if snapshot is not None and time.monotonic() - self._checked_at < settings.RECOMMENDATION_CATALOG_CHECK_SECONDS:
+            return snapshot
+        return self.refresh(supabase)
+
+
+recommendation_catalog = RecommendationCatalog()
@@ -1,13 +1,17 @@
 from typing import List, Optional, Dict, Any
-from datetime import datetime
 import logging
 from supabase import Client
 
-from app.models.schemas import Recommendation
+from app.models.schemas import Recommendation, RecommendationPointInput, RecommendationBatchResult
 from app.core.exceptions import DatabaseError
+from app.services.recommendation_catalog import recommendation_catalog, CatalogSnapshot
+from app.services.biome_service import biome_locator
 
 logger = logging.getLogger(__name__)
 
+# point_ids por consulta .in_() (limite prático de tamanho da URL do PostgREST)
+HLS_POINT_ID_CHUNK = 200
+
 
 class RecommendationService:
     """Serviço para lógica de negócio das recomendações"""
@@ -15,6 +19,11 @@ class RecommendationService:
     def __init__(self, supabase: Client):
         self.supabase = supabase
         self.recommendations_table = "recommendations"
+        self.hls_points_table = "hls_analysis_points"
+    
+    def _catalog(self) -> CatalogSnapshot:
+        """Snapshot do catálogo em memória (recarregado quando a versão no banco muda)"""
+        return recommendation_catalog.get(self.supabase)
     
     async def get_recommendations(
         self,
@@ -25,57 +34,13 @@ class RecommendationService:
         target_audience: Optional[str] = None,
         limit: int = 10
     ) -> List[Recommendation]:
-        """Busca recomendações baseadas em critérios"""
-        try:
-            query = self.supabase.table(self.recommendations_table).select("*")
-            
-            # Filtrar por valor NDVI se fornecido
-            if ndvi_value is not None:
-                query = query.lte("min_ndvi", ndvi_value).gte("max_ndvi", ndvi_value)
-            
-            # Filtrar por bioma se fornecido
-            if biome:
-                query = query.eq("biome", biome)
-            
-            # Filtrar por público-alvo se fornecido
-            if target_audience:
-                query = query.eq("target_audience", target_audience)
-            
-            # Ordenar por prioridade e efetividade
-            query = query.order("priority", desc=True).order("effectiveness_score", desc=True)
-            
-            # Limitar resultados
-            query = query.limit(limit)
-            
-            result = query.execute()
-            
-            recommendations = []
-            for rec_data in result.data:
-                # Converter action_items de JSON string para lista
-                action_items = rec_data.get("action_items", [])
-                if isinstance(action_items, str):
-                    import json
-                    try:
-                        action_items = json.loads(action_items)
-                    except json.JSONDecodeError:
-                        action_items = []
-                
-                recommendation = Recommendation(
-                    id=rec_data["id"],
-                    title=rec_data["title"],
-                    description=rec_data["description"],
-                    priority=str(rec_data["priority"]),
-                    category=rec_data["recommendation_type"],
-                    applicable_regions=action_items,  # Usando action_items como regiões aplicáveis
-                    created_at=datetime.fromisoformat(rec_data["created_at"].replace("Z", "+00:00"))
-                )
-                recommendations.append(recommendation)
-            
-            return recommendations
-            
-        except Exception as e:
-            logger.error(f"Erro ao buscar recomendações: {e}")
-            raise DatabaseError(f"Erro ao buscar recomendações: {str(e)}")
+        """Busca recomendações baseadas em critérios (catálogo em memória)"""
+        return self._catalog().query(
+            ndvi_value=ndvi_value,
+            biome=biome,
+            target_audience=target_audience,
+            limit=limit
+        )
     
     async def get_personalized_recommendations(
         self,
@@ -129,67 +94,117 @@ class RecommendationService:
             logger.error(f"Erro ao buscar recomendações por NDVI: {e}")
             raise DatabaseError(f"Erro ao buscar recomendações por NDVI: {str(e)}")
     
-    async def get_categories(self) -> List[str]:
-        """Lista todas as categorias de recomendações"""
+    async def get_recommendations_for_points(
+        self,
+        point_ids: List[str],
+        points: List[RecommendationPointInput],
+        target_audience: str = "citizen",
+        limit: int = 3
+    ) -> RecommendationBatchResult:
+        """Recomendações para muitos pontos de uma vez
+
+        Os pontos são agrupados por (bioma, faixa de NDVI, público-alvo) e cada grupo
+        é resolvido uma única vez no catálogo em memória
+        """
+        catalog = self._catalog()
+        unique_ids = list(dict.fromkeys(point_ids))
+        rows = self._fetch_hls_points(unique_ids) if unique_ids else {}
+
+        ids: List[str] = []
+        lats: List[float] = []
+        lons: List[float] = []
+        ndvis: List[float] = []
+        not_found: List[str] = []
+        for point_id in unique_ids:
+            row = rows.get(point_id)
+            if row is None:
+                not_found.append(point_id)
+                continue
+            ids.append(point_id)
+            lats.append(float(row["latitude"]))
+            lons.append(float(row["longitude"]))
+            ndvis.append(float(row["ndvi_value"]))
+        for position, point in enumerate(points):
+            ids.append(point.id or f"point_{position}")
+            lats.append(point.latitude)
+            lons.append(point.longitude)
+            ndvis.append(point.ndvi_value)
+
+        biomes = biome_locator.lookup_many(lats, lons)
+        bands = catalog.ndvi_bands(ndvis).tolist()
+
+        group_by_key: Dict[tuple, int] = {}
+        group_index: List[int] = []
+        groups: List[List[str]] = []
+        recommendations: Dict[str, Recommendation] = {}
+        for i in range(len(ids)):
+            key = (biomes[i], bands[i], target_audience)
+            group = group_by_key.get(key)
+            if group is None:
+                matched = catalog.query(
+                    ndvi_value=ndvis[i],
+                    biome=biomes[i],
+                    target_audience=target_audience,
+                    limit=limit
+                )
+                group = group_by_key[key] = len(groups)
+                groups.append([rec.id for rec in matched])
+                for rec in matched:
+                    recommendations.setdefault(rec.id, rec)
+            group_index.append(group)
+
+        return RecommendationBatchResult(
+            point_ids=ids,
+            biome=biomes,
+            ndvi_value=ndvis,
+            group=group_index,
+            groups=groups,
+            recommendations=recommendations,
+            not_found=not_found
+        )
+    
+    def _fetch_hls_points(self, point_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Coordenadas e NDVI dos pontos HLS, em lotes de HLS_POINT_ID_CHUNK"""
+        if self.supabase is None:
+            # Desenvolvimento: GeoJSON local dos pontos críticos
+            from app.services.tile_service import TileService
+            wanted = set(point_ids)
+            return {
+                row["point_id"]: row for row in TileService(None)._dev_rows("hls-points")
+                if row["point_id"] in wanted
+            }
+
+        found: Dict[str, Dict[str, Any]] = {}
         try:
-            result = self.supabase.table(self.recommendations_table).select(
-                "recommendation_type"
-            ).execute()
-            
-            categories = list(set(rec["recommendation_type"] for rec in result.data))
-            return sorted(categories)
-            
+            for start in range(0, len(point_ids), HLS_POINT_ID_CHUNK):
+                result = (
+                    self.supabase.table(self.hls_points_table)
+                    .select("point_id, latitude, longitude, ndvi_value")
+                    .in_("point_id", point_ids[start:start + HLS_POINT_ID_CHUNK])
+                    .execute()
+                )
+                for row in result.data or []:
+                    found[row["point_id"]] = row
         except Exception as e:
-            logger.error(f"Erro ao buscar categorias: {e}")
-            raise DatabaseError(f"Erro ao buscar categorias: {str(e)}")
+            logger.error(f"Erro ao buscar pontos HLS: {e}")
+            raise DatabaseError(f"Erro ao buscar pontos HLS: {str(e)}")
+        return found
+    
+    async def get_categories(self) -> List[str]:
+        """Lista todas as categorias de recomendações"""
+        return list(self._catalog().categories)
     
     async def get_biomes(self) -> List[str]:
         """Lista todos os biomas disponíveis"""
-        try:
-            result = self.supabase.table(self.recommendations_table).select(
-                "biome"
-            ).execute()
-            
-            biomes = list(set(rec["biome"] for rec in result.data if rec["biome"]))
-            return sorted(biomes)
-            
-        except Exception as e:
-            logger.error(f"Erro ao buscar biomas: {e}")
-            raise DatabaseError(f"Erro ao buscar biomas: {str(e)}")
+        return list(self._catalog().biomes)
     
     async def get_target_audiences(self) -> List[str]:
         """Lista todos os públicos-alvo disponíveis"""
-        try:
-            result = self.supabase.table(self.recommendations_table).select(
-                "target_audience"
-            ).execute()
-            
-            audiences = list(set(rec["target_audience"] for rec in result.data))
-            return sorted(audiences)
-            
-        except Exception as e:
-            logger.error(f"Erro ao buscar públicos-alvo: {e}")
-            raise DatabaseError(f"Erro ao buscar públicos-alvo: {str(e)}")
+        return list(self._catalog().audiences)
     
-    async def _determine_biome(self, latitude: float, longitude: float) -> str:
-        """Determina o bioma baseado na localização (implementação simplificada)"""
-        # Implementação simplificada baseada em coordenadas
-        # Em uma implementação real, isso seria feito com dados geoespaciais
-        
-        if -33.0 <= latitude <= 5.0 and -73.0 <= longitude <= -34.0:
-            # Região do Brasil
-            if latitude > -15.0:
-                if longitude > -50.0:
-                    return "cerrado"
-                else:
-                    return "amazonia"
-            else:
-                if longitude > -50.0:
-                    return "mata_atlantica"
-                else:
-                    return "cerrado"
-        
-        return "cerrado"  # Padrão
+    async def _determine_biome(self, latitude: float, longitude: float) -> Optional[str]:
+        """Determina o bioma pela malha de biomas do IBGE (None fora do Brasil)"""
+        return biome_locator.lookup(latitude, longitude)
     
     def get_health_recommendations(self, ndvi_value: float) -> List[str]:
         """Gera recomendações baseadas na saúde da vegetação (método síncrono para compatibilidade)"""
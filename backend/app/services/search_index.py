@@ -0,0 +1,181 @@
+"""
+In-process full-text index for observations (development fallback)
+Mirrors the database search (migration 009): accent-insensitive tokens with
+field weights title=A, description=B, address/location=C, AND semantics,
+ranked results with highlighted snippets and (rank, id) keyset pagination.
+"""
+
+import logging
+import math
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.models.observation import Observation
+
+logger = logging.getLogger(__name__)
+
+# Pesos padrão do ts_rank do Postgres para {A, B, C}
+FIELD_WEIGHTS = {"title": 1.0, "description": 0.4, "location": 0.2}
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos (equivalente ao unaccent + lower do banco)"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).lower()
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall(normalize_text(text))
+
+
+def _matches(word: str, terms: Set[str]) -> bool:
+    return any(token.startswith(term) for token in tokenize(word) for term in terms)
+
+
+def highlight_snippet(text: str, terms: Set[str], max_words: int = 30) -> Optional[str]:
+    """Trecho de até max_words palavras em torno do primeiro termo encontrado, termos marcados"""
+    if not text:
+        return None
+    words = text.split()
+    hits = [i for i, word in enumerate(words) if _matches(word, terms)]
+    if not hits:
+        return " ".join(words[:max_words]) + (" ..." if len(words) > max_words else "")
+
+    start = max(hits[0] - max_words // 3, 0)
+    end = min(start + max_words, len(words))
+    snippet = [
+        f"{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}" if _matches(word, terms) else word
+        for word in words[start:end]
+    ]
+    return ("... " if start > 0 else "") + " ".join(snippet) + (" ..." if end < len(words) else "")
+
+
+class ObservationSearchIndex:
+    """Índice invertido token -> {observation_id: peso} com ranking tf-idf por campo"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._documents: Dict[str, Observation] = {}
+        self._doc_tokens: Dict[str, Set[str]] = {}
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def rebuild(self, observations: Iterable[Observation]) -> None:
+        with self._lock:
+            self._postings.clear()
+            self._documents.clear()
+            self._doc_tokens.clear()
+            for obs in observations:
+                self._add(obs)
+            self.loaded = True
+        logger.info(f"Índice de busca de observações carregado: {len(self)} documentos")
+
+    def upsert(self, obs: Observation) -> None:
+        """Mantém o índice atualizado nas escritas (apenas depois de carregado)"""
+        if not self.loaded:
+            return
+        with self._lock:
+            self._remove(obs.id)
+            self._add(obs)
+
+    def remove(self, observation_id: str) -> None:
+        with self._lock:
+            self._remove(observation_id)
+
+    def _add(self, obs: Observation) -> None:
+        fields = {
+            "title": obs.title,
+            "description": obs.description,
+            "location": getattr(obs, "location_name", None) or "",
+        }
+        weights: Dict[str, float] = defaultdict(float)
+        for field, text in fields.items():
+            tokens = tokenize(text)
+            if not tokens:
+                continue
+            # tf normalizado pelo tamanho do campo (como a normalização 1 do ts_rank)
+            norm = 1.0 / (1.0 + math.log(len(tokens)))
+            for token in tokens:
+                weights[token] += FIELD_WEIGHTS[field] * norm
+
+        for token, weight in weights.items():
+            self._postings[token][obs.id] = weight
+        self._documents[obs.id] = obs
+        self._doc_tokens[obs.id] = set(weights)
+
+    def _remove(self, observation_id: str) -> None:
+        for token in self._doc_tokens.pop(observation_id, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(observation_id, None)
+                if not postings:
+                    del self._postings[token]
+        self._documents.pop(observation_id, None)
+
+    def search(
+        self,
+        query: str,
+        observation_type: Optional[str] = None,
+        limit: int = 20,
+        cursor: Optional[Tuple[float, str]] = None
+    ) -> Tuple[List[Tuple[Observation, float, Optional[str]]], bool]:
+        """Busca AND dos termos; retorna ([(observação, rank, trecho)], há_próxima)"""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return [], False
+
+        with self._lock:
+            total_docs = max(len(self._documents), 1)
+            scores: Optional[Dict[str, float]] = None
+            for position, term in enumerate(terms):
+                postings = dict(self._postings.get(term, {}))
+                # Último termo também casa como prefixo (busca enquanto digita)
+                if position == len(terms) - 1:
+                    for token, token_postings in self._postings.items():
+                        if token != term and token.startswith(term):
+                            for doc_id, weight in token_postings.items():
+                                postings[doc_id] = max(postings.get(doc_id, 0.0), weight * 0.5)
+                if not postings:
+                    return [], False
+
+                idf = math.log(1.0 + total_docs / len(postings))
+                term_scores = {doc_id: weight * idf for doc_id, weight in postings.items()}
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {doc_id: score + term_scores[doc_id] for doc_id, score in scores.items() if doc_id in term_scores}
+                if not scores:
+                    return [], False
+
+            ranked = []
+            for doc_id, score in scores.items():
+                obs = self._documents[doc_id]
+                obs_type = obs.observation_type.value if hasattr(obs.observation_type, "value") else obs.observation_type
+                if observation_type and obs_type != observation_type:
+                    continue
+                rank = round(score, 6)
+                if cursor and (rank, doc_id) >= cursor:
+                    continue
+                ranked.append((rank, doc_id))
+
+            ranked.sort(reverse=True)
+            term_set = set(terms)
+            results = [
+                (self._documents[doc_id], rank, highlight_snippet(self._documents[doc_id].description, term_set))
+                for rank, doc_id in ranked[:limit]
+            ]
+        return results, len(ranked) > limit
+
+
+observation_search_index = ObservationSearchIndex()
@@ -0,0 +1,226 @@
+"""
+In-process spatial index for observations
+Uniform lat/lon grid (cell -> slots) over numpy coordinate arrays. Radius and
+k-nearest queries gather candidates from the covered cells only and refine
+them with a vectorized haversine, so each distance is computed once.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+from app.models.observation import Observation
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Distância (km) de um ponto até arrays de pontos (fórmula de Haversine, vetorizada)"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class ObservationSpatialIndex:
+    """Grade uniforme de células sobre as coordenadas das observações"""
+
+    def __init__(self, cell_size_deg: float = 0.05):
+        self.cell_size_deg = cell_size_deg
+        self._cols = int(math.ceil(360.0 / cell_size_deg))
+        self._lock = threading.RLock()
+        self.rebuild_lock = asyncio.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._lats = np.empty(0, dtype=np.float64)
+        self._lons = np.empty(0, dtype=np.float64)
+        self._observations: List[Optional[Observation]] = []
+        self._slots: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        # Escritas feitas durante um rebuild, reaplicadas na grade nova antes da troca
+        self._pending: Optional[List[Tuple[str, Any]]] = None
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return self.loaded_at is None or (time.monotonic() - self.loaded_at) > max_age_seconds
+
+    def _cell(self, lat: float, lon: float) -> Tuple[int, int]:
+        row = int(math.floor((lat + 90.0) / self.cell_size_deg))
+        col = int(math.floor((lon + 180.0) / self.cell_size_deg)) % self._cols
+        return row, col
+
+    def _ensure_capacity(self, size: int) -> None:
+        if size <= len(self._lats):
+            return
+        capacity = max(size, 2 * len(self._lats), 64)
+        for name in ("_lats", "_lons"):
+            grown = np.full(capacity, np.nan, dtype=np.float64)
+            current = getattr(self, name)
+            grown[:len(current)] = current
+            setattr(self, name, grown)
+
+    # Escritas
+
+    def begin_rebuild(self) -> None:
+        """
+        Começa a registrar upsert/remove para o próximo rebuild. Chamar antes de
+        ler as observações do banco: escritas entre a leitura e a troca não se perdem
+        """
+        with self._lock:
+            self._pending = []
+
+    def cancel_rebuild(self) -> None:
+        """Descarta o registro quando a carga falha"""
+        with self._lock:
+            self._pending = None
+
+    def rebuild(self, observations: Iterable[Observation]) -> None:
+        """
+        Recarrega o índice inteiro (carga inicial / reconciliação periódica).
+        A grade nova é montada sem o lock (roda em thread) e só a troca é
+        feita sob o lock, para as consultas não esperarem a carga
+        """
+        fresh = ObservationSpatialIndex(self.cell_size_deg)
+        for obs in observations:
+            fresh._upsert(obs)
+        with self._lock:
+            for op, arg in self._pending or ():
+                if op == "upsert":
+                    fresh._upsert(arg)
+                else:
+                    fresh._remove(arg)
+            self._pending = None
+            for name in ("_lats", "_lons", "_observations", "_slots", "_free", "_cells"):
+                setattr(self, name, getattr(fresh, name))
+            self.loaded_at = time.monotonic()
+        logger.info(f"Índice espacial de observações carregado: {len(self)} pontos")
+
+    def upsert(self, obs: Observation) -> None:
+        """Insere ou move uma observação (chamado nas escritas deste processo)"""
+        with self._lock:
+            self._upsert(obs)
+            if self._pending is not None:
+                self._pending.append(("upsert", obs))
+
+    def remove(self, observation_id: str) -> None:
+        with self._lock:
+            self._remove(observation_id)
+            if self._pending is not None:
+                self._pending.append(("remove", observation_id))
+
+    def _remove(self, observation_id: str) -> None:
+        slot = self._slots.pop(observation_id, None)
+        if slot is None:
+            return
+        self._detach(slot)
+        self._free.append(slot)
+
+    def _upsert(self, obs: Observation) -> None:
+        slot = self._slots.get(obs.id)
+        if slot is not None:
+            self._detach(slot)
+        else:
+            slot = self._free.pop() if self._free else len(self._observations)
+            if slot == len(self._observations):
+                self._observations.append(None)
+                self._ensure_capacity(slot + 1)
+            self._slots[obs.id] = slot
+
+        self._lats[slot] = obs.latitude
+        self._lons[slot] = obs.longitude
+        self._observations[slot] = obs
+        self._cells.setdefault(self._cell(obs.latitude, obs.longitude), set()).add(slot)
+
+    def _detach(self, slot: int) -> None:
+        cell = self._cell(self._lats[slot], self._lons[slot])
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(slot)
+            if not members:
+                del self._cells[cell]
+        self._lats[slot] = np.nan
+        self._lons[slot] = np.nan
+        self._observations[slot] = None
+
+    # Consultas
+
+    def _candidate_slots(self, lat: float, lon: float, radius_km: float) -> np.ndarray:
+        """Slots das células que cobrem o bbox do círculo (lat, lon, raio)"""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = math.cos(math.radians(min(abs(lat) + dlat, 90.0)))
+        dlon = 180.0 if cos_lat < 1e-6 else min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+
+        row_min, col_min = self._cell(max(lat - dlat, -90.0), lon - dlon)
+        row_max, col_max = self._cell(min(lat + dlat, 90.0), lon + dlon)
+        col_span = self._cols if dlon >= 180.0 else (col_max - col_min) % self._cols + 1
+        covered = (row_max - row_min + 1) * col_span
+
+        slots: List[int] = []
+        if covered > len(self._cells):
+            # Raio grande: mais barato percorrer as células ocupadas
+            for (row, col), members in self._cells.items():
+                if row_min <= row <= row_max and (col_span == self._cols or (col - col_min) % self._cols < col_span):
+                    slots.extend(members)
+        else:
+            for row in range(row_min, row_max + 1):
+                for offset in range(col_span):
+                    members = self._cells.get((row, (col_min + offset) % self._cols))
+                    if members:
+                        slots.extend(members)
+        return np.fromiter(slots, dtype=np.int64, count=len(slots))
+
+    def within_radius(
+        self,
+        lat: float,
+        lon: float,
+        radius_km: float,
+        limit: Optional[int] = None
+    ) -> List[Tuple[Observation, float]]:
+        """Observações a até radius_km, ordenadas por distância: [(observação, distância_km)]"""
+        with self._lock:
+            slots = self._candidate_slots(lat, lon, radius_km)
+            if slots.size == 0:
+                return []
+
+            distances = haversine_km(lat, lon, self._lats[slots], self._lons[slots])
+            inside = distances <= radius_km
+            slots, distances = slots[inside], distances[inside]
+
+            if limit is not None and slots.size > limit:
+                nearest = np.argpartition(distances, limit - 1)[:limit]
+                slots, distances = slots[nearest], distances[nearest]
+            order = np.argsort(distances, kind="stable")
+            return [(self._observations[slots[i]], float(distances[i])) for i in order]
+
+    def nearest(
+        self,
+        lat: float,
+        lon: float,
+        k: int,
+        max_radius_km: float = 100.0
+    ) -> List[Tuple[Observation, float]]:
+        """k observações mais próximas (até max_radius_km), expandindo o raio por dobra"""
+        radius = self.cell_size_deg * KM_PER_DEGREE_LAT
+        while True:
+            radius = min(radius, max_radius_km)
+            results = self.within_radius(lat, lon, radius, limit=k)
+            if len(results) >= k or radius >= max_radius_km:
+                return results
+            radius *= 2
+
+
+observation_index = ObservationSpatialIndex(settings.SPATIAL_INDEX_CELL_DEG)
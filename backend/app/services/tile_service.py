@@ -0,0 +1,218 @@
+"""
+Vector tile service
+Builds gzipped Mapbox Vector Tiles for point layers (HLS critical points and
+observations), clipped to the tile bounds, with a per-tile cache keyed by the
+layer's data version.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from supabase import Client
+
+from app.core.cache import cache
+from app.core.exceptions import DatabaseError, ValidationError
+from app.utils.mvt import PointLayer, buffered_tile_bounds, encode_tile, project_to_tile
+
+logger = logging.getLogger(__name__)
+
+HLS_POINTS_GEOJSON = Path(__file__).resolve().parent.parent.parent / "hls_analysis" / "critical_points_mata_ciliar.geojson"
+
+TILE_TTL_SECONDS = 3600
+VERSION_TTL_SECONDS = 15
+MAX_FEATURES_PER_TILE = 20000
+
+# Camadas publicadas: tabela, colunas e mapeamento dos filtros da URL -> colunas
+LAYERS: Dict[str, Dict[str, Any]] = {
+    "hls-points": {
+        "table": "hls_analysis_points",
+        "columns": "point_id,latitude,longitude,ndvi_value,severity,level,status,distance_to_river_m,analysis_date",
+        "filters": {"severity": "severity", "status": "status", "type": "level"},
+        "id_field": "point_id",
+    },
+    "observations": {
+        "table": "observations",
+        "columns": "id,latitude,longitude,observation_type,severity_level,status,title,validation_count,created_at",
+        "filters": {"severity": "severity_level", "status": "status", "type": "observation_type"},
+        "id_field": "id",
+    },
+}
+
+
+class TileService:
+    """Encodes point layers as MVT"""
+
+    def __init__(self, supabase: Optional[Client]):
+        self.supabase = supabase
+
+    # ---- data version ------------------------------------------------------
+
+    def get_data_version(self, layer: str) -> str:
+        """
+        Versão dos dados da camada (último updated_at + total de linhas).
+        Revalidada a cada VERSION_TTL_SECONDS; invalidate_layer() força a troca.
+        """
+        cache_key = f"tiles_version:{layer}"
+        version = cache.get(cache_key)
+        if version is not None:
+            return version
+
+        if self.supabase is None:
+            version = "dev"
+        else:
+            table = LAYERS[layer]["table"]
+            try:
+                latest = (
+                    self.supabase.table(table)
+                    .select("updated_at", count="exact")
+                    .order("updated_at", desc=True)
+                    .limit(1)
+                    .execute()
+                )
+                updated_at = latest.data[0]["updated_at"] if latest.data else ""
+                version = hashlib.sha1(f"{updated_at}:{latest.count}".encode()).hexdigest()[:16]
+            except Exception as e:
+                logger.warning(f"Erro ao obter versão da camada {layer}: {e}")
+                version = "unknown"
+
+        cache.set(cache_key, version, ttl_seconds=VERSION_TTL_SECONDS)
+        return version
+
+    @staticmethod
+    def invalidate_layer(layer: str) -> None:
+        """Descarta a versão em cache para que o próximo tile reflita escritas recentes"""
+        cache.delete(f"tiles_version:{layer}")
+
+    # ---- tiles -------------------------------------------------------------
+
+    @staticmethod
+    def _parse_filters(filters: Dict[str, Optional[str]]) -> Dict[str, List[str]]:
+        parsed = {}
+        for name, raw in filters.items():
+            if raw:
+                values = [v.strip() for v in raw.split(",") if v.strip()]
+                if values:
+                    parsed[name] = sorted(values)
+        return parsed
+
+    def get_tile(self, layer: str, z: int, x: int, y: int, filters: Dict[str, Optional[str]]) -> Tuple[bytes, str]:
+        """Returns (gzipped MVT bytes, etag)"""
+        if layer not in LAYERS:
+            raise ValidationError(f"Camada inválida: {layer}")
+        if z < 0 or z > 22 or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+            raise ValidationError("Coordenadas de tile inválidas")
+
+        parsed = self._parse_filters(filters)
+        version = self.get_data_version(layer)
+        filter_key = json.dumps(parsed, sort_keys=True)
+        etag = hashlib.sha1(f"{layer}:{version}:{z}/{x}/{y}:{filter_key}".encode()).hexdigest()
+
+        cache_key = f"tile:{etag}"
+        cached = cache.get(cache_key)
+        if cached is not None:
+            return cached, etag
+
+        rows = self._fetch_rows(layer, z, x, y, parsed)
+        tile = gzip.compress(self._encode(layer, rows, z, x, y), compresslevel=6)
+        cache.set(cache_key, tile, ttl_seconds=TILE_TTL_SECONDS)
+        return tile, etag
+
+    def _fetch_rows(self, layer: str, z: int, x: int, y: int, filters: Dict[str, List[str]]) -> List[Dict[str, Any]]:
+        min_lon, min_lat, max_lon, max_lat = buffered_tile_bounds(z, x, y)
+        spec = LAYERS[layer]
+
+        if self.supabase is None:
+            rows = self._dev_rows(layer)
+            return [
+                r for r in rows
+                if min_lon <= r["longitude"] <= max_lon and min_lat <= r["latitude"] <= max_lat
+                and all(str(r.get(spec["filters"][name])) in values for name, values in filters.items())
+            ]
+
+        try:
+            query = (
+                self.supabase.table(spec["table"])
+                .select(spec["columns"])
+                .gte("longitude", min_lon)
+                .lte("longitude", max_lon)
+                .gte("latitude", min_lat)
+                .lte("latitude", max_lat)
+                .is_("deleted_at", "null")
+            )
+            if layer == "observations":
+                query = query.eq("visibility", "public")
+            for name, values in filters.items():
+                query = query.in_(spec["filters"][name], values)
+            result = query.limit(MAX_FEATURES_PER_TILE).execute()
+            return result.data or []
+        except Exception as e:
+            logger.error(f"Erro ao buscar pontos do tile {layer}/{z}/{x}/{y}: {e}")
+            raise DatabaseError(f"Erro ao buscar pontos do tile: {str(e)}")
+
+    def _dev_rows(self, layer: str) -> List[Dict[str, Any]]:
+        """Dados locais para desenvolvimento (sem Supabase)"""
+        cache_key = f"tiles_dev_rows:{layer}"
+        rows = cache.get(cache_key)
+        if rows is not None:
+            return rows
+
+        rows = []
+        if layer == "hls-points":
+            try:
+                with open(HLS_POINTS_GEOJSON, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for feature in data.get("features", []):
+                    props = feature.get("properties", {})
+                    lon, lat = feature["geometry"]["coordinates"][:2]
+                    rows.append({
+                        "point_id": props.get("id"),
+                        "latitude": lat,
+                        "longitude": lon,
+                        "ndvi_value": props.get("ndvi"),
+                        "severity": props.get("severity"),
+                        "level": props.get("level"),
+                        "status": "active",
+                        "distance_to_river_m": props.get("distance_to_river_m"),
+                    })
+            except Exception as e:
+                logger.warning(f"GeoJSON de pontos HLS indisponível: {e}")
+        else:
+            from app.repositories.observation_repository import ObservationRepository
+            for obs in ObservationRepository(None)._get_mock_observations():
+                rows.append({
+                    "id": obs.id,
+                    "latitude": obs.latitude,
+                    "longitude": obs.longitude,
+                    "observation_type": getattr(obs.observation_type, "value", obs.observation_type),
+                    "status": getattr(obs.status, "value", obs.status),
+                    "title": obs.title,
+                    "validation_count": obs.validation_count,
+                    "created_at": obs.created_at.isoformat(),
+                })
+
+        cache.set(cache_key, rows, ttl_seconds=TILE_TTL_SECONDS)
+        return rows
+
+    @staticmethod
+    def _encode(layer: str, rows: List[Dict[str, Any]], z: int, x: int, y: int) -> bytes:
+        mvt_layer = PointLayer(layer)
+        if rows:
+            coords = project_to_tile(
+                [float(r["longitude"]) for r in rows],
+                [float(r["latitude"]) for r in rows],
+                z, x, y,
+            )
+            id_field = LAYERS[layer]["id_field"]
+            for row, (tx, ty) in zip(rows, coords):
+                properties = {
+                    k: (float(v) if k in ("ndvi_value", "distance_to_river_m") and v is not None else v)
+                    for k, v in row.items()
+                    if k not in ("latitude", "longitude")
+                }
+                properties["id"] = properties.pop(id_field, None)
+                mvt_layer.add_point(tx, ty, properties)
+        return encode_tile([mvt_layer])
@@ -60,7 +60,7 @@ class UserService:
         user = await self.user_repo.get_user_by_email(email)
         if not user:
             return None
-        if not self.user_repo.verify_password(password, user.password_hash):
+        if not await self.user_repo.verify_password(password, user.password_hash):
             return None
         return user
     
@@ -7,6 +7,9 @@ from app.models.observation import (
     ValidationCreate,
     ValidationUpdate,
     ValidationStats,
+    ValidationBatchCreate,
+    ValidationBatchItemResult,
+    ValidationBatchResult,
     ValidationStatus
 )
 from app.models.validation import ValidationSummary
@@ -18,9 +21,13 @@ from app.core.exceptions import (
     DatabaseError
 )
 from app.core.config import settings
+from app.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+STATS_CACHE_TTL_SECONDS = 30
+SUMMARY_CACHE_KEY = "validation_summary"
+
 
 class ValidationService:
     """Serviço para lógica de negócio das validações"""
@@ -53,6 +60,7 @@ class ValidationService:
                 validation_in_db.id
             )
             
+            self._invalidate_stats(user_id)
             logger.info(f"Validação criada: {validation.id} por usuário {user_id}")
             return validation
             
@@ -62,6 +70,57 @@ class ValidationService:
             logger.error(f"Erro ao criar validação: {e}")
             raise DatabaseError(f"Erro ao criar validação: {str(e)}")
     
+    async def create_validations_batch(
+        self,
+        batch: ValidationBatchCreate,
+        user_id: str
+    ) -> ValidationBatchResult:
+        """Cria um lote de validações; itens inválidos não impedem os demais"""
+        try:
+            results: Dict[int, ValidationBatchItemResult] = {}
+            accepted: List[int] = []
+            for index, validation_data in enumerate(batch.validations):
+                try:
+                    await self._validate_validation_data(validation_data, user_id)
+                    accepted.append(index)
+                except ValidationError as e:
+                    results[index] = ValidationBatchItemResult(
+                        index=index,
+                        observation_id=validation_data.observation_id,
+                        status="invalid",
+                        detail=str(e)
+                    )
+            
+            if accepted:
+                # Existência, autoria e duplicidade verificadas por conjunto no banco
+                outcomes = await self.validation_repo.create_validations_batch(
+                    [batch.validations[i] for i in accepted], user_id
+                )
+                for outcome in outcomes:
+                    index = accepted[outcome["index"]]
+                    results[index] = ValidationBatchItemResult(
+                        index=index,
+                        observation_id=outcome["observation_id"],
+                        status=outcome["status"],
+                        validation_id=outcome.get("validation_id")
+                    )
+            
+            ordered = [results[i] for i in sorted(results)]
+            created = sum(1 for item in ordered if item.status == "created")
+            if created:
+                self._invalidate_stats(user_id)
+            
+            logger.info(f"Lote de validações: {created}/{len(ordered)} criadas por usuário {user_id}")
+            return ValidationBatchResult(
+                created=created,
+                failed=len(ordered) - created,
+                results=ordered
+            )
+            
+        except Exception as e:
+            logger.error(f"Erro ao criar lote de validações: {e}")
+            raise DatabaseError(f"Erro ao criar lote de validações: {str(e)}")
+    
     async def get_validation_by_id(self, validation_id: str) -> Validation:
         """Busca validação por ID"""
         try:
@@ -119,6 +178,7 @@ class ValidationService:
                 validation_id, validation_data, user_id
             )
             
+            self._invalidate_stats(user_id)
             logger.info(f"Validação atualizada: {validation_id} por usuário {user_id}")
             return validation
             
@@ -136,6 +196,7 @@ class ValidationService:
             )
             
             if success:
+                self._invalidate_stats(user_id)
                 logger.info(f"Validação removida: {validation_id} por usuário {user_id}")
             
             return success
@@ -152,7 +213,14 @@ class ValidationService:
     ) -> ValidationStats:
         """Obtém estatísticas de validações"""
         try:
-            return await self.validation_repo.get_validation_stats(user_id)
+            cache_key = self._stats_cache_key(user_id)
+            cached = cache.get(cache_key)
+            if cached is not None:
+                return cached
+            
+            stats = await self.validation_repo.get_validation_stats(user_id)
+            cache.set(cache_key, stats, ttl_seconds=STATS_CACHE_TTL_SECONDS)
+            return stats
             
         except Exception as e:
             logger.error(f"Erro ao obter estatísticas de validações: {e}")
@@ -180,24 +248,7 @@ class ValidationService:
     ) -> List[Validation]:
         """Busca validações recentes"""
         try:
-            # Buscar todas as validações recentes (simplificado)
-            # Em uma implementação mais robusta, isso seria feito no repositório
-            validations = await self.validation_repo.get_validations_by_user(
-                user_id="",  # Buscar todas
-                skip=0,
-                limit=limit * 5  # Buscar mais para filtrar por data
-            )
-            
-            # Filtrar por data
-            since_date = datetime.utcnow() - timedelta(days=days)
-            recent_validations = [
-                val for val in validations 
-                if val.created_at >= since_date
-            ]
-            
-            # Ordenar por data e limitar
-            recent_validations.sort(key=lambda x: x.created_at, reverse=True)
-            return recent_validations[:limit]
+            return await self.validation_repo.get_recent_validations(days, limit)
             
         except Exception as e:
             logger.error(f"Erro ao buscar validações recentes: {e}")
@@ -206,41 +257,31 @@ class ValidationService:
     async def get_validation_summary(self) -> ValidationSummary:
         """Obtém resumo geral das validações do sistema"""
         try:
-            # Obter estatísticas gerais
-            stats = await self.validation_repo.get_validation_stats()
-            
-            # Calcular percentuais
-            total = stats.total_validations
-            confirmed_percentage = (stats.confirmed_validations / total * 100) if total > 0 else 0
-            disputed_percentage = (stats.disputed_validations / total * 100) if total > 0 else 0
+            cached = cache.get(SUMMARY_CACHE_KEY)
+            if cached is not None:
+                return cached
             
-            # Buscar validações recentes (últimos 7 dias)
-            recent_validations = await self.get_recent_validations(days=7, limit=100)
-            recent_count = len(recent_validations)
+            # Contadores, série diária e ranking pré-agregados no banco (migração 007)
+            data = await self.validation_repo.get_validation_summary(days=7, top=5)
+            if await self._refresh_leaderboard_if_stale(data.get("leaderboard_refreshed_at")):
+                # Relê para não guardar em cache o ranking anterior à atualização
+                data = await self.validation_repo.get_validation_summary(days=7, top=5)
             
-            # Top validadores (simplificado)
-            top_validators = []
-            for user_id, count in list(stats.validations_by_user.items())[:5]:
-                top_validators.append({
-                    "user_id": user_id,
-                    "validation_count": count
-                })
+            total = data.get("total_validations", 0)
+            confirmed_percentage = (data.get("confirmed_validations", 0) / total * 100) if total > 0 else 0
+            disputed_percentage = (data.get("disputed_validations", 0) / total * 100) if total > 0 else 0
             
-            # Tendências por dia (simplificado)
-            validation_trends = {}
-            for i in range(7):
-                date_key = (datetime.utcnow() - timedelta(days=i)).strftime("%Y-%m-%d")
-                validation_trends[date_key] = 0  # Simplificado
-            
-            return ValidationSummary(
+            summary = ValidationSummary(
                 total_validations=total,
-                recent_validations=recent_count,
+                recent_validations=data.get("recent_validations", 0),
                 confirmed_percentage=round(confirmed_percentage, 2),
                 disputed_percentage=round(disputed_percentage, 2),
-                average_confidence=stats.average_confidence,
-                top_validators=top_validators,
-                validation_trends=validation_trends
+                average_confidence=float(data.get("average_confidence") or 0),
+                top_validators=data.get("top_validators") or [],
+                validation_trends=data.get("validation_trends") or {}
             )
+            cache.set(SUMMARY_CACHE_KEY, summary, ttl_seconds=STATS_CACHE_TTL_SECONDS)
+            return summary
             
         except Exception as e:
             logger.error(f"Erro ao obter resumo geral de validações: {e}")
@@ -288,21 +329,43 @@ class ValidationService:
             logger.error(f"Erro ao obter resumo de validações: {e}")
             raise DatabaseError(f"Erro ao obter resumo: {str(e)}")
     
+    @staticmethod
+    def _stats_cache_key(user_id: Optional[str] = None) -> str:
+        return f"validation_stats:{user_id or 'global'}"
+    
+    def _invalidate_stats(self, user_id: str) -> None:
+        """Descarta as estatísticas em cache afetadas por uma escrita deste processo"""
+        cache.delete(self._stats_cache_key())
+        cache.delete(self._stats_cache_key(user_id))
+        cache.delete(SUMMARY_CACHE_KEY)
+    
+    async def _refresh_leaderboard_if_stale(self, refreshed_at: Optional[str]) -> bool:
+        """
+        Atualiza o ranking quando ele é mais velho que o intervalo configurado (sem pg_cron).
+        Retorna True quando o ranking foi atualizado
+        """
+        max_age = settings.VALIDATION_LEADERBOARD_REFRESH_SECONDS
+        if max_age <= 0 or not refreshed_at:
+            return False
+        try:
+            last_refresh = datetime.fromisoformat(str(refreshed_at).replace("Z", "+00:00"))
+            age = (datetime.now(last_refresh.tzinfo) - last_refresh).total_seconds()
+            if age > max_age:
+                await self.validation_repo.refresh_leaderboard()
+                return True
+        except Exception as e:
+            # Ranking velho não impede o resumo; tenta de novo na próxima leitura
+            logger.warning(f"Não foi possível atualizar o ranking de validadores: {e}")
+        return False
+    
     async def _validate_validation_data(
         self, 
         validation_data: ValidationCreate, 
         user_id: str
     ):
         """Valida dados da validação"""
-        # Verificar se o usuário pode validar esta observação
-        can_validate = await self.check_user_can_validate(
-            validation_data.observation_id, user_id
-        )
-        
-        if not can_validate:
-            raise ValidationError(
-                "Você não pode validar esta observação (já validou ou é o autor)"
-            )
+        # Autoria e validação duplicada são verificadas pelo banco no próprio INSERT
+        # (trigger + índice único, migração 006), sem consultas prévias
         
         # Validar nível de confiança
         if not (0.0 <= validation_data.confidence_level <= 1.0):
@@ -0,0 +1,110 @@
+"""
+Request-scoped viewer context loader
+DataLoader-style batcher for observation lists: collects the observation and
+author IDs of a whole response and resolves author name/avatar and the
+viewer's user_can_validate flag with one `in_()` query each, memoizing the
+results for the rest of the request.
+"""
+
+import logging
+from typing import Dict, Iterable, List, Optional, Set, TypeVar
+
+from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class ViewerContextLoader:
+    """Resolve user_name/user_avatar/user_can_validate em lote para um visualizador"""
+
+    def __init__(self, supabase: Optional[Client], viewer_id: Optional[str] = None):
+        self.supabase = supabase
+        self.viewer_id = viewer_id
+        self.users_table = "users"
+        self.validations_table = "observation_validations"
+        # Memória do request: autor -> {name, avatar_url}; observações já validadas pelo visualizador
+        self._authors: Dict[str, Dict[str, Optional[str]]] = {}
+        self._checked_observations: Set[str] = set()
+        self._validated_observations: Set[str] = set()
+
+    async def attach(self, observations: List[T]) -> List[T]:
+        """Cópias das observações com o contexto do visualizador preenchido
+
+        Copia em vez de alterar: as instâncias podem ser compartilhadas (índices em memória)
+        """
+        if not observations:
+            return observations
+
+        self._load_authors({
+            obs.user_id for obs in observations
+            if getattr(obs, "user_id", None) and not getattr(obs, "user_name", None)
+        })
+        if self.viewer_id:
+            self._load_viewer_validations({
+                obs.id for obs in observations
+                if getattr(obs, "user_id", None) != self.viewer_id
+            })
+
+        attached = []
+        for obs in observations:
+            update = {}
+            author = self._authors.get(getattr(obs, "user_id", None) or "")
+            if author and not getattr(obs, "user_name", None):
+                update["user_name"] = author.get("name")
+                if hasattr(obs, "user_avatar"):
+                    update["user_avatar"] = author.get("avatar_url")
+            if hasattr(obs, "user_can_validate"):
+                update["user_can_validate"] = self.can_validate(obs)
+            attached.append(obs.model_copy(update=update) if update else obs)
+        return attached
+
+    def can_validate(self, obs) -> bool:
+        """Visualizador autenticado, não é o autor e ainda não validou"""
+        if not self.viewer_id or getattr(obs, "user_id", None) == self.viewer_id:
+            return False
+        return obs.id not in self._validated_observations
+
+    def _load_authors(self, author_ids: Iterable[str]) -> None:
+        missing = [author_id for author_id in author_ids if author_id not in self._authors]
+        if not missing or self.supabase is None:
+            return
+        try:
+            result = (
+                self.supabase.table(self.users_table)
+                .select("id, full_name, username, avatar_url")
+                .in_("id", missing)
+                .execute()
+            )
+            for row in result.data or []:
+                self._authors[row["id"]] = {
+                    "name": row.get("full_name") or row.get("username"),
+                    "avatar_url": row.get("avatar_url")
+                }
+        except Exception as e:
+            logger.error(f"Erro ao carregar autores em lote: {e}")
+        # Não consultar de novo os ausentes neste request
+        for author_id in missing:
+            self._authors.setdefault(author_id, {})
+
+    def _load_viewer_validations(self, observation_ids: Iterable[str]) -> None:
+        missing = [obs_id for obs_id in observation_ids if obs_id not in self._checked_observations]
+        if not missing:
+            return
+        self._checked_observations.update(missing)
+        if self.supabase is None:
+            return
+        try:
+            result = (
+                self.supabase.table(self.validations_table)
+                .select("observation_id")
+                .eq("user_id", self.viewer_id)
+                .in_("observation_id", missing)
+                .execute()
+            )
+            self._validated_observations.update(row["observation_id"] for row in result.data or [])
+        except Exception as e:
+            logger.error(f"Erro ao carregar validações do usuário em lote: {e}")
+            # Sem a informação, não oferecer validação para as observações consultadas
+            self._validated_observations.update(missing)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+IBGE Biome Boundaries Builder
+Gera app/data/ibge_biomes.geojson (um feature por bioma, propriedade "biome")
+a partir da malha de Biomas 1:250.000 do IBGE, simplificada para consulta
+ponto-em-polígono em memória.
+
+Uso:
+    python app/utils/build_ibge_biomes.py [saida.geojson] [Biomas_250mil.zip|.shp]
+
+Requer geopandas (dependência geoespacial opcional).
+"""
+
+import json
+import logging
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from app.services.biome_service import BIOME_SLUGS, DEFAULT_BIOMES_FILE
+from app.services.gazetteer_service import normalize_name
+
+logger = logging.getLogger(__name__)
+
+IBGE_BIOMAS_URL = (
+    "https://geoftp.ibge.gov.br/informacoes_ambientais/estudos_ambientais/biomas/vetores/Biomas_250mil.zip"
+)
+
+# ~110 m: suficiente para recomendações e reduz o arquivo de centenas de MB para poucos MB
+SIMPLIFY_TOLERANCE_DEG = 0.001
+
+
+def build_biomes(output_path: Path = DEFAULT_BIOMES_FILE, source: Optional[Path] = None) -> int:
+    """
+    Lê (ou baixa) a malha de biomas, simplifica e grava o GeoJSON usado pelo BiomeLocator
+
+    Returns:
+        Número de biomas gravados
+    """
+    import geopandas as gpd
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if source is None:
+            source = Path(tmp) / "Biomas_250mil.zip"
+            logger.info("Baixando malha de biomas do IBGE...")
+            with httpx.Client(timeout=600.0, follow_redirects=True) as client:
+                with client.stream("GET", IBGE_BIOMAS_URL) as resp:
+                    resp.raise_for_status()
+                    with open(source, "wb") as f:
+                        for chunk in resp.iter_bytes():
+                            f.write(chunk)
+
+        frame = gpd.read_file(f"zip://{source}" if str(source).endswith(".zip") else source)
+
+    frame = frame.to_crs(epsg=4326)
+    name_column = next(
+        (c for c in frame.columns if c.lower() in ("bioma", "nom_bioma", "nome_bioma", "nome")), None
+    )
+    if name_column is None:
+        raise ValueError(f"Coluna com o nome do bioma não encontrada: {list(frame.columns)}")
+
+    frame["biome"] = frame[name_column].map(lambda name: BIOME_SLUGS.get(normalize_name(str(name))))
+    unknown = frame[frame["biome"].isna()][name_column].unique().tolist()
+    if unknown:
+        logger.warning(f"Biomas ignorados (nome desconhecido): {unknown}")
+    frame = frame[frame["biome"].notna()].dissolve(by="biome").reset_index()
+    frame["geometry"] = frame.geometry.simplify(SIMPLIFY_TOLERANCE_DEG, preserve_topology=True)
+
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"biome": row.biome, "name": str(row[name_column])},
+            "geometry": row.geometry.__geo_interface__,
+        }
+        for _, row in frame.iterrows()
+    ]
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, ensure_ascii=False)
+
+    logger.info(f"Malha de biomas gravada: {len(features)} biomas em {output_path}")
+    return len(features)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        target = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BIOMES_FILE
+        local_source = Path(sys.argv[2]) if len(sys.argv) > 2 else None
+        count = build_biomes(target, local_source)
+        print(f"Malha de biomas gerada com sucesso: {count} biomas")
+    except Exception as e:
+        print(f"Erro ao gerar malha de biomas: {e}")
+        sys.exit(1)
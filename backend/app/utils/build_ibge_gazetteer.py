@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+IBGE Gazetteer Builder
+Gera app/data/ibge_municipalities.csv (código, nome, UF, bbox, centróide)
+a partir das APIs de localidades e malhas do IBGE.
+"""
+
+import csv
+import logging
+import sys
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+import httpx
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from app.services.gazetteer_service import DEFAULT_GAZETTEER_FILE, GAZETTEER_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+IBGE_MUNICIPIOS_URL = "https://servicodados.ibge.gov.br/api/v1/localidades/municipios"
+IBGE_MALHA_URL = "https://servicodados.ibge.gov.br/api/v3/malhas/paises/BR"
+
+
+def _iter_rings(geometry: Dict) -> Iterable[List[List[float]]]:
+    if geometry["type"] == "Polygon":
+        yield from geometry["coordinates"]
+    elif geometry["type"] == "MultiPolygon":
+        for polygon in geometry["coordinates"]:
+            yield from polygon
+
+
+def _outer_rings(geometry: Dict) -> Iterable[List[List[float]]]:
+    if geometry["type"] == "Polygon":
+        yield geometry["coordinates"][0]
+    elif geometry["type"] == "MultiPolygon":
+        for polygon in geometry["coordinates"]:
+            yield polygon[0]
+
+
+def geometry_bbox(geometry: Dict) -> Tuple[float, float, float, float]:
+    """Bbox [minx, miny, maxx, maxy] de um Polygon/MultiPolygon GeoJSON"""
+    xs: List[float] = []
+    ys: List[float] = []
+    for ring in _iter_rings(geometry):
+        for x, y in ring:
+            xs.append(x)
+            ys.append(y)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def geometry_centroid(geometry: Dict) -> Tuple[float, float]:
+    """Centróide ponderado por área (shoelace) dos anéis externos"""
+    area_sum = cx_sum = cy_sum = 0.0
+    for ring in _outer_rings(geometry):
+        for (x0, y0), (x1, y1) in zip(ring, ring[1:]):
+            cross = x0 * y1 - x1 * y0
+            area_sum += cross
+            cx_sum += (x0 + x1) * cross
+            cy_sum += (y0 + y1) * cross
+    if area_sum == 0:
+        minx, miny, maxx, maxy = geometry_bbox(geometry)
+        return (minx + maxx) / 2, (miny + maxy) / 2
+    return cx_sum / (3 * area_sum), cy_sum / (3 * area_sum)
+
+
+def build_gazetteer(output_path: Path = DEFAULT_GAZETTEER_FILE) -> int:
+    """
+    Baixa nomes/UF e a malha municipal (qualidade mínima) e grava o CSV do gazetteer
+
+    Returns:
+        Número de municípios gravados
+    """
+    with httpx.Client(timeout=120.0) as client:
+        logger.info("Baixando lista de municípios do IBGE...")
+        resp = client.get(IBGE_MUNICIPIOS_URL)
+        resp.raise_for_status()
+        names: Dict[str, Tuple[str, str]] = {}
+        for it in resp.json():
+            uf = (it.get("microrregiao") or {}).get("mesorregiao", {}).get("UF", {}).get("sigla", "")
+            names[str(it["id"])] = (it["nome"], uf)
+
+        logger.info("Baixando malha municipal do IBGE...")
+        resp = client.get(IBGE_MALHA_URL, params={
+            "formato": "application/vnd.geo+json",
+            "qualidade": "minima",
+            "intrarregiao": "municipio",
+        })
+        resp.raise_for_status()
+        features = resp.json().get("features", [])
+
+    rows = []
+    for feature in features:
+        code = str(feature.get("properties", {}).get("codarea", ""))
+        if code not in names or not feature.get("geometry"):
+            continue
+        name, uf = names[code]
+        minx, miny, maxx, maxy = geometry_bbox(feature["geometry"])
+        cx, cy = geometry_centroid(feature["geometry"])
+        rows.append([
+            code, name, uf,
+            round(minx, 7), round(miny, 7), round(maxx, 7), round(maxy, 7),
+            round(cx, 7), round(cy, 7),
+        ])
+
+    missing = len(names) - len(rows)
+    if missing:
+        logger.warning(f"{missing} municípios sem geometria na malha do IBGE")
+
+    rows.sort(key=lambda r: r[0])
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(GAZETTEER_COLUMNS)
+        writer.writerows(rows)
+
+    logger.info(f"Gazetteer gravado: {len(rows)} municípios em {output_path}")
+    return len(rows)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        target = Path(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_GAZETTEER_FILE
+        count = build_gazetteer(target)
+        print(f"Gazetteer gerado com sucesso: {count} municípios")
+    except Exception as e:
+        print(f"Erro ao gerar gazetteer: {e}")
+        sys.exit(1)
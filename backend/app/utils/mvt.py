@@ -0,0 +1,165 @@
+"""
+Mapbox Vector Tile encoder (points only)
+Minimal protobuf writer for the MVT 2.1 spec, enough to publish point layers
+without pulling in a protobuf/mapbox-vector-tile dependency.
+"""
+
+import math
+import struct
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_EXTENT = 4096
+DEFAULT_BUFFER = 64
+
+# Geometry types / commands (spec 4.3)
+GEOM_POINT = 1
+CMD_MOVE_TO = 1
+
+
+def tile_bounds(z: int, x: int, y: int) -> Tuple[float, float, float, float]:
+    """Bounds (min_lon, min_lat, max_lon, max_lat) of an XYZ (web mercator) tile"""
+    n = 2 ** z
+    min_lon = x / n * 360.0 - 180.0
+    max_lon = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def buffered_tile_bounds(z: int, x: int, y: int, extent: int = DEFAULT_EXTENT, buffer: int = DEFAULT_BUFFER):
+    """Tile bounds grown by `buffer` tile units on each side (for symbols crossing tile edges)"""
+    min_lon, min_lat, max_lon, max_lat = tile_bounds(z, x, y)
+    pad = buffer / extent
+    dlon = (max_lon - min_lon) * pad
+    dlat = (max_lat - min_lat) * pad
+    return (
+        max(-180.0, min_lon - dlon),
+        max(-85.0511, min_lat - dlat),
+        min(180.0, max_lon + dlon),
+        min(85.0511, max_lat + dlat),
+    )
+
+
+def project_to_tile(
+    lons: Sequence[float],
+    lats: Sequence[float],
+    z: int,
+    x: int,
+    y: int,
+    extent: int = DEFAULT_EXTENT,
+) -> np.ndarray:
+    """Projects lon/lat arrays into integer tile coordinates (Nx2)"""
+    lon = np.asarray(lons, dtype=float)
+    lat = np.clip(np.asarray(lats, dtype=float), -85.0511, 85.0511)
+    n = 2 ** z
+    fx = (lon + 180.0) / 360.0 * n
+    lat_rad = np.radians(lat)
+    fy = (1.0 - np.log(np.tan(lat_rad) + 1.0 / np.cos(lat_rad)) / math.pi) / 2.0 * n
+    tx = np.round((fx - x) * extent).astype(np.int64)
+    ty = np.round((fy - y) * extent).astype(np.int64)
+    return np.column_stack([tx, ty])
+
+
+# ---- protobuf primitives ---------------------------------------------------
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    value &= 0xFFFFFFFFFFFFFFFF
+    while True:
+        bits = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(bits | 0x80)
+        else:
+            out.append(bits)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field: int, wire_type: int) -> bytes:
+    return _varint((field << 3) | wire_type)
+
+
+def _len_delimited(field: int, payload: bytes) -> bytes:
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field: int, values: Iterable[int]) -> bytes:
+    return _len_delimited(field, b"".join(_varint(v) for v in values))
+
+
+def _encode_value(value: Any) -> bytes:
+    """Tile.Value message"""
+    if isinstance(value, bool):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, int):
+        if value < 0:
+            return _key(6, 0) + _varint(_zigzag(value))
+        return _key(5, 0) + _varint(value)
+    if isinstance(value, float):
+        return _key(3, 1) + struct.pack("<d", value)
+    return _len_delimited(1, str(value).encode("utf-8"))
+
+
+# ---- layer encoder ---------------------------------------------------------
+
+class PointLayer:
+    """Accumulates point features for one layer and serializes Tile.Layer"""
+
+    def __init__(self, name: str, extent: int = DEFAULT_EXTENT):
+        self.name = name
+        self.extent = extent
+        self._keys: Dict[str, int] = {}
+        self._values: Dict[Tuple[type, Any], int] = {}
+        self._features: List[bytes] = []
+
+    def __len__(self) -> int:
+        return len(self._features)
+
+    def _tag(self, key: str, value: Any) -> Tuple[int, int]:
+        key_idx = self._keys.setdefault(key, len(self._keys))
+        value_key = (type(value), value)
+        value_idx = self._values.setdefault(value_key, len(self._values))
+        return key_idx, value_idx
+
+    def add_point(self, tx: int, ty: int, properties: Dict[str, Any], feature_id: Optional[int] = None) -> None:
+        tags: List[int] = []
+        for key, value in properties.items():
+            if value is None:
+                continue
+            if not isinstance(value, (bool, int, float, str)):
+                value = str(value)
+            tags.extend(self._tag(key, value))
+
+        geometry = [(CMD_MOVE_TO & 0x7) | (1 << 3), _zigzag(int(tx)), _zigzag(int(ty))]
+
+        feature = b""
+        if feature_id is not None:
+            feature += _key(1, 0) + _varint(feature_id)
+        if tags:
+            feature += _packed(2, tags)
+        feature += _key(3, 0) + _varint(GEOM_POINT)
+        feature += _packed(4, geometry)
+        self._features.append(feature)
+
+    def encode(self) -> bytes:
+        layer = _key(15, 0) + _varint(2)
+        layer += _len_delimited(1, self.name.encode("utf-8"))
+        for feature in self._features:
+            layer += _len_delimited(2, feature)
+        for key in self._keys:
+            layer += _len_delimited(3, key.encode("utf-8"))
+        for value_type, value in self._values:
+            layer += _len_delimited(4, _encode_value(value))
+        layer += _key(5, 0) + _varint(self.extent)
+        return layer
+
+
+def encode_tile(layers: Iterable[PointLayer]) -> bytes:
+    """Serializes a Tile message; empty layers are omitted"""
+    return b"".join(_len_delimited(3, layer.encode()) for layer in layers if len(layer))
@@ -0,0 +1,96 @@
+"""
+Login throughput / event-loop latency benchmark
+Fires N concurrent password verifications (the CPU-bound part of a login) and,
+in parallel, a heartbeat coroutine that measures how late the event loop wakes
+up. Compares bcrypt run inline in the coroutine (previous behaviour) with the
+bounded executor in app.core.password_hashing.
+
+Uso:
+    python benchmarks/login_throughput.py --logins 200 --concurrency 50 --workers 4
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+if str(BACKEND_DIR) not in sys.path:
+    sys.path.append(str(BACKEND_DIR))
+
+from app.core.password_hashing import PasswordHasher, hash_password_sync, verify_password_sync
+
+HEARTBEAT_INTERVAL = 0.005  # 5 ms
+
+
+async def heartbeat(lags: list, stop: asyncio.Event) -> None:
+    """Registra o atraso do event loop em relação ao intervalo esperado"""
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        expected = loop.time() + HEARTBEAT_INTERVAL
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+        lags.append(max(loop.time() - expected, 0.0))
+
+
+async def run_mode(mode: str, password_hash: str, logins: int, concurrency: int, workers: int) -> dict:
+    hasher = PasswordHasher(workers=workers, max_pending=0)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def login():
+        async with semaphore:
+            if mode == "inline":
+                ok = verify_password_sync("correct horse battery staple", password_hash)
+            else:
+                ok = await hasher.verify("correct horse battery staple", password_hash)
+            assert ok
+
+    lags: list = []
+    stop = asyncio.Event()
+    beat = asyncio.create_task(heartbeat(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await beat
+    hasher.shutdown()
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    return {
+        "mode": mode,
+        "logins_per_s": logins / elapsed,
+        "elapsed_s": elapsed,
+        "lag_p50_ms": statistics.median(lags_ms),
+        "lag_p99_ms": lags_ms[min(int(len(lags_ms) * 0.99), len(lags_ms) - 1)],
+        "lag_max_ms": lags_ms[-1],
+        "metrics": hasher.metrics() if mode == "executor" else None,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    password_hash = hash_password_sync("correct horse battery staple")
+    print(f"{args.logins} logins, concorrência {args.concurrency}, {args.workers} workers")
+    print(f"{'modo':<10}{'logins/s':>10}{'tempo (s)':>11}{'lag p50':>10}{'lag p99':>10}{'lag máx':>10}")
+    for mode in ("inline", "executor"):
+        result = asyncio.run(run_mode(mode, password_hash, args.logins, args.concurrency, args.workers))
+        print(
+            f"{result['mode']:<10}{result['logins_per_s']:>10.1f}{result['elapsed_s']:>11.2f}"
+            f"{result['lag_p50_ms']:>8.1f}ms{result['lag_p99_ms']:>8.1f}ms{result['lag_max_ms']:>8.1f}ms"
+        )
+        if result["metrics"]:
+            metrics = result["metrics"]
+            print(
+                f"          fila máx {metrics['max_queued']}, espera média {metrics['avg_wait_ms']} ms, "
+                f"bcrypt médio {metrics['avg_run_ms']} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,14 @@
+-- Migração 003: Índices para os tiles vetoriais (/tiles/{layer}/{z}/{x}/{y}.mvt)
+-- Os tiles filtram por faixa de longitude/latitude via PostgREST e usam
+-- max(updated_at) + count como versão dos dados de cada camada
+
+CREATE INDEX IF NOT EXISTS idx_hls_analysis_points_lon_lat ON hls_analysis_points(longitude, latitude)
+    WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_hls_analysis_points_updated_at ON hls_analysis_points(updated_at DESC);
+
+CREATE INDEX IF NOT EXISTS idx_observations_lon_lat ON observations(longitude, latitude)
+    WHERE deleted_at IS NULL AND visibility = 'public';
+CREATE INDEX IF NOT EXISTS idx_observations_updated_at ON observations(updated_at DESC);
+
+COMMENT ON INDEX idx_hls_analysis_points_lon_lat IS 'Recorte por bbox dos tiles vetoriais de pontos HLS';
+COMMENT ON INDEX idx_observations_lon_lat IS 'Recorte por bbox dos tiles vetoriais de observações';
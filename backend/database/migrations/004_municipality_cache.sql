@@ -0,0 +1,187 @@
+-- Migração 004: Cache de dados municipais (geometria, plano, série NDVI)
+-- Tabelas usadas por /cache/* e funções RPC que retornam tudo em uma única
+-- ida ao banco (um município ou vários de uma vez)
+
+CREATE TABLE IF NOT EXISTS municipality_geometry_cache (
+    municipality_code VARCHAR(10) PRIMARY KEY,
+    municipality_name VARCHAR(255),
+    state VARCHAR(2),
+    geometry_data JSONB NOT NULL,
+    bbox JSONB,
+    source VARCHAR(50) DEFAULT 'osm',
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW() + INTERVAL '30 days'
+);
+
+CREATE TABLE IF NOT EXISTS municipality_plan_cache (
+    municipality_code VARCHAR(10) PRIMARY KEY,
+    municipality_name VARCHAR(255),
+    state VARCHAR(2),
+    plan_data JSONB NOT NULL,
+    ndvi_data JSONB,
+    zones_data JSONB,
+    summary_data JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW() + INTERVAL '1 day'
+);
+
+CREATE TABLE IF NOT EXISTS municipality_ndvi_cache (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    municipality_code VARCHAR(10) NOT NULL,
+    date_observed DATE NOT NULL,
+    ndvi_value DECIMAL(4, 3),
+    cloud_coverage DECIMAL(5, 2),
+    statistics JSONB,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    expires_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW() + INTERVAL '7 days',
+    UNIQUE(municipality_code, date_observed)
+);
+
+-- Série NDVI é lida por município, mais recente primeiro
+CREATE INDEX IF NOT EXISTS idx_municipality_ndvi_cache_code_date
+    ON municipality_ndvi_cache(municipality_code, date_observed DESC);
+CREATE INDEX IF NOT EXISTS idx_municipality_geometry_cache_expires ON municipality_geometry_cache(expires_at);
+CREATE INDEX IF NOT EXISTS idx_municipality_plan_cache_expires ON municipality_plan_cache(expires_at);
+CREATE INDEX IF NOT EXISTS idx_municipality_ndvi_cache_expires ON municipality_ndvi_cache(expires_at);
+
+CREATE TRIGGER update_municipality_geometry_cache_updated_at BEFORE UPDATE ON municipality_geometry_cache
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+CREATE TRIGGER update_municipality_plan_cache_updated_at BEFORE UPDATE ON municipality_plan_cache
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+
+-- Dados em cache (não expirados) de vários municípios em uma consulta
+CREATE OR REPLACE FUNCTION get_municipality_cache_bulk(
+    p_codes TEXT[],
+    p_include_geometry BOOLEAN DEFAULT true,
+    p_include_plan BOOLEAN DEFAULT true,
+    p_include_ndvi BOOLEAN DEFAULT true,
+    p_ndvi_limit INTEGER DEFAULT 30
+)
+RETURNS TABLE (
+    municipality_code TEXT,
+    geometry JSONB,
+    plan JSONB,
+    ndvi JSONB
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        c.code,
+        CASE WHEN p_include_geometry AND g.municipality_code IS NOT NULL THEN jsonb_build_object(
+            'name', g.municipality_name,
+            'state', g.state,
+            'geometry', g.geometry_data,
+            'bbox', g.bbox,
+            'source', g.source,
+            'updated_at', g.updated_at
+        ) END,
+        CASE WHEN p_include_plan AND p.municipality_code IS NOT NULL THEN jsonb_build_object(
+            'name', p.municipality_name,
+            'state', p.state,
+            'plan', p.plan_data,
+            'ndvi_data', p.ndvi_data,
+            'zones', p.zones_data,
+            'summary', p.summary_data,
+            'updated_at', p.updated_at
+        ) END,
+        CASE WHEN p_include_ndvi AND n.time_series IS NOT NULL THEN jsonb_build_object(
+            'time_series', n.time_series,
+            'count', jsonb_array_length(n.time_series)
+        ) END
+    FROM unnest(p_codes) AS c(code)
+    LEFT JOIN municipality_geometry_cache g
+        ON p_include_geometry AND g.municipality_code = c.code AND g.expires_at > NOW()
+    LEFT JOIN municipality_plan_cache p
+        ON p_include_plan AND p.municipality_code = c.code AND p.expires_at > NOW()
+    LEFT JOIN LATERAL (
+        SELECT jsonb_agg(jsonb_build_object(
+            'date', s.date_observed,
+            'ndvi', s.ndvi_value,
+            'cloud_coverage', s.cloud_coverage,
+            'statistics', s.statistics
+        ) ORDER BY s.date_observed DESC) AS time_series
+        FROM (
+            SELECT date_observed, ndvi_value, cloud_coverage, statistics
+            FROM municipality_ndvi_cache
+            WHERE p_include_ndvi AND municipality_code = c.code AND expires_at > NOW()
+            ORDER BY date_observed DESC
+            LIMIT p_ndvi_limit
+        ) s
+    ) n ON true;
+$$;
+
+-- Status do cache (disponibilidade/validade) de vários municípios em uma consulta
+CREATE OR REPLACE FUNCTION get_municipality_cache_status(p_codes TEXT[])
+RETURNS TABLE (
+    municipality_code TEXT,
+    geometry_count BIGINT,
+    geometry_last_update TIMESTAMP WITH TIME ZONE,
+    geometry_expires_at TIMESTAMP WITH TIME ZONE,
+    plan_count BIGINT,
+    plan_last_update TIMESTAMP WITH TIME ZONE,
+    plan_expires_at TIMESTAMP WITH TIME ZONE,
+    ndvi_count BIGINT,
+    ndvi_last_date DATE,
+    ndvi_expires_at TIMESTAMP WITH TIME ZONE
+)
+LANGUAGE sql STABLE AS $$
+    SELECT
+        c.code,
+        g.cnt, g.last_update, g.expires_at,
+        p.cnt, p.last_update, p.expires_at,
+        n.cnt, n.last_date, n.expires_at
+    FROM unnest(p_codes) AS c(code)
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS cnt, MAX(updated_at) AS last_update, MIN(expires_at) AS expires_at
+        FROM municipality_geometry_cache
+        WHERE municipality_code = c.code AND expires_at > NOW()
+    ) g
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS cnt, MAX(updated_at) AS last_update, MIN(expires_at) AS expires_at
+        FROM municipality_plan_cache
+        WHERE municipality_code = c.code AND expires_at > NOW()
+    ) p
+    CROSS JOIN LATERAL (
+        SELECT COUNT(*) AS cnt, MAX(date_observed) AS last_date, MIN(expires_at) AS expires_at
+        FROM municipality_ndvi_cache
+        WHERE municipality_code = c.code AND expires_at > NOW()
+    ) n;
+$$;
+
+-- Estatísticas gerais do cache
+CREATE OR REPLACE FUNCTION get_municipality_cache_statistics()
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    SELECT jsonb_build_object(
+        'geometry', (
+            SELECT jsonb_build_object(
+                'total', COUNT(*),
+                'active', COUNT(*) FILTER (WHERE expires_at > NOW()),
+                'expired', COUNT(*) FILTER (WHERE expires_at <= NOW())
+            ) FROM municipality_geometry_cache
+        ),
+        'plan', (
+            SELECT jsonb_build_object(
+                'total', COUNT(*),
+                'active', COUNT(*) FILTER (WHERE expires_at > NOW()),
+                'expired', COUNT(*) FILTER (WHERE expires_at <= NOW())
+            ) FROM municipality_plan_cache
+        ),
+        'ndvi', (
+            SELECT jsonb_build_object(
+                'total', COUNT(*),
+                'active', COUNT(*) FILTER (WHERE expires_at > NOW()),
+                'expired', COUNT(*) FILTER (WHERE expires_at <= NOW())
+            ) FROM municipality_ndvi_cache
+        ),
+        'total_municipalities', (SELECT COUNT(*) FROM municipality_geometry_cache)
+    );
+$$;
+
+COMMENT ON TABLE municipality_geometry_cache IS 'Geometria (GeoJSON) e bbox em cache por município';
+COMMENT ON TABLE municipality_plan_cache IS 'Plano de ação em cache por município';
+COMMENT ON TABLE municipality_ndvi_cache IS 'Série temporal NDVI em cache por município';
+COMMENT ON FUNCTION get_municipality_cache_bulk IS 'Geometria + plano + série NDVI de vários municípios em uma única consulta';
+COMMENT ON FUNCTION get_municipality_cache_status IS 'Disponibilidade do cache por município (em lote)';
@@ -0,0 +1,135 @@
+-- Migração 005: Contadores incrementais de estatísticas de observações
+-- Mantidos por trigger a cada INSERT/UPDATE/DELETE em observations, para que
+-- /observations/stats seja uma única leitura barata (sem COUNT(*) na tabela)
+
+-- Contadores por escopo ('global' ou user_id) e dimensão
+--   dimension = 'total'     key = ''
+--   dimension = 'status'    key = pending | validated | rejected | ...
+--   dimension = 'type'      key = observation_type
+--   dimension = 'validated' key = ''  (is_validated = true)
+CREATE TABLE IF NOT EXISTS observation_stat_counters (
+    scope TEXT NOT NULL,
+    dimension VARCHAR(20) NOT NULL,
+    key TEXT NOT NULL DEFAULT '',
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, dimension, key)
+);
+
+-- Observações criadas por dia (para "recentes nos últimos N dias")
+CREATE TABLE IF NOT EXISTS observation_daily_counts (
+    scope TEXT NOT NULL,
+    day DATE NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, day)
+);
+
+CREATE OR REPLACE FUNCTION observation_stats_bump(p_scope TEXT, p_dimension TEXT, p_key TEXT, p_delta INTEGER)
+RETURNS VOID AS $$
+BEGIN
+    INSERT INTO observation_stat_counters (scope, dimension, key, count)
+    VALUES (p_scope, p_dimension, COALESCE(p_key, ''), p_delta)
+    ON CONFLICT (scope, dimension, key)
+    DO UPDATE SET count = observation_stat_counters.count + EXCLUDED.count;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION observation_stats_apply(obs observations, p_delta INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    s TEXT;
+BEGIN
+    FOREACH s IN ARRAY ARRAY['global', obs.user_id::TEXT] LOOP
+        PERFORM observation_stats_bump(s, 'total', '', p_delta);
+        PERFORM observation_stats_bump(s, 'status', obs.status, p_delta);
+        PERFORM observation_stats_bump(s, 'type', obs.observation_type, p_delta);
+        IF obs.is_validated THEN
+            PERFORM observation_stats_bump(s, 'validated', '', p_delta);
+        END IF;
+
+        INSERT INTO observation_daily_counts (scope, day, count)
+        VALUES (s, (obs.created_at AT TIME ZONE 'UTC')::DATE, p_delta)
+        ON CONFLICT (scope, day)
+        DO UPDATE SET count = observation_daily_counts.count + EXCLUDED.count;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION observation_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM observation_stats_apply(NEW, 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM observation_stats_apply(OLD, -1);
+    ELSIF (OLD.status, OLD.observation_type, OLD.is_validated, OLD.user_id, OLD.created_at)
+          IS DISTINCT FROM (NEW.status, NEW.observation_type, NEW.is_validated, NEW.user_id, NEW.created_at) THEN
+        -- Só mexe nos contadores quando uma coluna agregada muda
+        PERFORM observation_stats_apply(OLD, -1);
+        PERFORM observation_stats_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS observation_stats_counters ON observations;
+CREATE TRIGGER observation_stats_counters AFTER INSERT OR UPDATE OR DELETE ON observations
+    FOR EACH ROW EXECUTE FUNCTION observation_stats_trigger();
+
+-- Recalcula todos os contadores a partir de observations (carga inicial / reparo)
+CREATE OR REPLACE FUNCTION refresh_observation_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE observations IN SHARE MODE;
+    DELETE FROM observation_stat_counters;
+    DELETE FROM observation_daily_counts;
+
+    INSERT INTO observation_stat_counters (scope, dimension, key, count)
+    SELECT s.scope, d.dimension, d.key, COUNT(*)
+    FROM observations o
+    CROSS JOIN LATERAL (VALUES ('global'), (o.user_id::TEXT)) AS s(scope)
+    CROSS JOIN LATERAL (VALUES
+        ('total', ''),
+        ('status', COALESCE(o.status, '')),
+        ('type', COALESCE(o.observation_type, '')),
+        ('validated', CASE WHEN o.is_validated THEN '' END)
+    ) AS d(dimension, key)
+    WHERE d.key IS NOT NULL
+    GROUP BY s.scope, d.dimension, d.key;
+
+    INSERT INTO observation_daily_counts (scope, day, count)
+    SELECT s.scope, (o.created_at AT TIME ZONE 'UTC')::DATE, COUNT(*)
+    FROM observations o
+    CROSS JOIN LATERAL (VALUES ('global'), (o.user_id::TEXT)) AS s(scope)
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_observation_stats();
+
+-- Estatísticas prontas (global quando p_user_id é NULL)
+CREATE OR REPLACE FUNCTION get_observation_stats(p_user_id UUID DEFAULT NULL, p_days INTEGER DEFAULT 7)
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    WITH scope AS (
+        SELECT COALESCE(p_user_id::TEXT, 'global') AS s
+    ), counters AS (
+        SELECT c.dimension, c.key, c.count
+        FROM observation_stat_counters c, scope
+        WHERE c.scope = scope.s AND c.count <> 0
+    )
+    SELECT jsonb_build_object(
+        'total_observations', COALESCE((SELECT SUM(count) FROM counters WHERE dimension = 'total'), 0),
+        'pending_observations', COALESCE((SELECT SUM(count) FROM counters WHERE dimension = 'status' AND key = 'pending'), 0),
+        'validated_observations', COALESCE((SELECT SUM(count) FROM counters WHERE dimension = 'validated'), 0),
+        'rejected_observations', COALESCE((SELECT SUM(count) FROM counters WHERE dimension = 'status' AND key = 'rejected'), 0),
+        'observations_by_type', COALESCE((SELECT jsonb_object_agg(key, count) FROM counters WHERE dimension = 'type'), '{}'::jsonb),
+        'recent_observations', COALESCE((
+            SELECT SUM(d.count) FROM observation_daily_counts d, scope
+            WHERE d.scope = scope.s AND d.day >= ((NOW() AT TIME ZONE 'UTC') - make_interval(days => p_days))::DATE
+        ), 0)
+    );
+$$;
+
+COMMENT ON TABLE observation_stat_counters IS 'Contadores de observações por status/tipo/validação (global e por usuário), mantidos por trigger';
+COMMENT ON TABLE observation_daily_counts IS 'Observações criadas por dia (global e por usuário), mantidas por trigger';
+COMMENT ON FUNCTION refresh_observation_stats IS 'Recalcula os contadores de estatísticas a partir da tabela observations';
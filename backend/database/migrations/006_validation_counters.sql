@@ -0,0 +1,124 @@
+-- Migração 006: Contadores de validação incrementais na observação
+-- Cada INSERT/UPDATE/DELETE em observation_validations aplica +1/-1 nos
+-- contadores da observação e recalcula o status no mesmo UPDATE, sem reler
+-- as validações existentes (custo O(1) por escrita)
+
+ALTER TABLE observations ADD COLUMN IF NOT EXISTS confirmed_validations INTEGER DEFAULT 0;
+ALTER TABLE observations ADD COLUMN IF NOT EXISTS disputed_validations INTEGER DEFAULT 0;
+
+ALTER TABLE observation_validations ADD COLUMN IF NOT EXISTS user_id UUID REFERENCES users(id) ON DELETE CASCADE;
+ALTER TABLE observation_validations ADD COLUMN IF NOT EXISTS status VARCHAR(20);
+ALTER TABLE observation_validations ADD COLUMN IF NOT EXISTS confidence_level INTEGER;
+ALTER TABLE observation_validations ADD COLUMN IF NOT EXISTS evidence_images JSONB DEFAULT '[]'::jsonb;
+ALTER TABLE observation_validations ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW();
+
+-- Uma validação por usuário e observação (substitui as consultas prévias da API)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_observation_validations_obs_user
+    ON observation_validations(observation_id, user_id);
+
+-- Autor não pode validar a própria observação
+CREATE OR REPLACE FUNCTION observation_validation_check_author()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM observations WHERE id = NEW.observation_id AND user_id = NEW.user_id) THEN
+        RAISE EXCEPTION 'own_observation' USING ERRCODE = 'check_violation',
+            HINT = 'Não é possível validar sua própria observação';
+    END IF;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS observation_validation_check_author ON observation_validations;
+CREATE TRIGGER observation_validation_check_author BEFORE INSERT ON observation_validations
+    FOR EACH ROW EXECUTE FUNCTION observation_validation_check_author();
+
+-- Aplica deltas (total, confirmadas, disputadas) e recalcula o status:
+-- mínimo de 3 validações; >= 70% confirmadas -> validated, >= 70% disputadas -> rejected
+CREATE OR REPLACE FUNCTION apply_observation_validation_delta(
+    p_observation_id UUID,
+    p_total INTEGER,
+    p_confirmed INTEGER,
+    p_disputed INTEGER
+)
+RETURNS VOID AS $$
+BEGIN
+    IF p_total = 0 AND p_confirmed = 0 AND p_disputed = 0 THEN
+        RETURN;
+    END IF;
+
+    -- Deltas aplicados sobre a própria linha (bloqueada pelo UPDATE): sem
+    -- releitura em subconsulta, escritas concorrentes não se sobrescrevem.
+    -- As expressões do SET veem os valores antigos, por isso o status repete os cálculos
+    UPDATE observations SET
+        validation_count = GREATEST(COALESCE(validation_count, 0) + p_total, 0),
+        confirmed_validations = GREATEST(COALESCE(confirmed_validations, 0) + p_confirmed, 0),
+        disputed_validations = GREATEST(COALESCE(disputed_validations, 0) + p_disputed, 0),
+        status = CASE
+            WHEN GREATEST(COALESCE(validation_count, 0) + p_total, 0) < 3 THEN 'pending'
+            WHEN GREATEST(COALESCE(confirmed_validations, 0) + p_confirmed, 0)
+                 >= GREATEST(COALESCE(validation_count, 0) + p_total, 0) * 0.7 THEN 'validated'
+            WHEN GREATEST(COALESCE(disputed_validations, 0) + p_disputed, 0)
+                 >= GREATEST(COALESCE(validation_count, 0) + p_total, 0) * 0.7 THEN 'rejected'
+            ELSE 'under_review'
+        END
+    WHERE id = p_observation_id;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION observation_validation_counters_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_observation_validation_delta(
+            NEW.observation_id, 1,
+            (NEW.status = 'confirmed')::INTEGER,
+            (NEW.status = 'disputed')::INTEGER
+        );
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM apply_observation_validation_delta(
+            OLD.observation_id, -1,
+            -(OLD.status = 'confirmed')::INTEGER,
+            -(OLD.status = 'disputed')::INTEGER
+        );
+    ELSIF NEW.status IS DISTINCT FROM OLD.status THEN
+        PERFORM apply_observation_validation_delta(
+            NEW.observation_id, 0,
+            (NEW.status = 'confirmed')::INTEGER - (OLD.status = 'confirmed')::INTEGER,
+            (NEW.status = 'disputed')::INTEGER - (OLD.status = 'disputed')::INTEGER
+        );
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS observation_validation_counters ON observation_validations;
+CREATE TRIGGER observation_validation_counters AFTER INSERT OR DELETE OR UPDATE OF status ON observation_validations
+    FOR EACH ROW EXECUTE FUNCTION observation_validation_counters_trigger();
+
+-- Recalcula os contadores a partir das validações (carga inicial / reparo)
+CREATE OR REPLACE FUNCTION refresh_observation_validation_counts()
+RETURNS VOID AS $$
+BEGIN
+    UPDATE observations o SET
+        validation_count = COALESCE(v.total, 0),
+        confirmed_validations = COALESCE(v.confirmed, 0),
+        disputed_validations = COALESCE(v.disputed, 0)
+    FROM observations o2
+    LEFT JOIN (
+        SELECT observation_id,
+               COUNT(*) AS total,
+               COUNT(*) FILTER (WHERE status = 'confirmed') AS confirmed,
+               COUNT(*) FILTER (WHERE status = 'disputed') AS disputed
+        FROM observation_validations
+        GROUP BY observation_id
+    ) v ON v.observation_id = o2.id
+    WHERE o.id = o2.id
+      AND (o.validation_count, o.confirmed_validations, o.disputed_validations)
+          IS DISTINCT FROM (COALESCE(v.total, 0), COALESCE(v.confirmed, 0), COALESCE(v.disputed, 0));
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_observation_validation_counts();
+
+COMMENT ON FUNCTION apply_observation_validation_delta IS 'Incrementa os contadores de validação da observação e recalcula o status em um único UPDATE';
+COMMENT ON FUNCTION refresh_observation_validation_counts IS 'Recalcula validation_count/confirmed/disputed a partir de observation_validations';
@@ -0,0 +1,244 @@
+-- Migração 007: Estatísticas de validação agregadas no banco
+-- Contadores (global e por usuário) e validações por dia mantidos por trigger,
+-- ranking de validadores em materialized view atualizada periodicamente.
+-- /validations/stats e /validations/summary passam a ser leituras de custo constante
+
+-- Validações recentes (/validations/recent) lidas pelo índice, sem varrer a tabela
+CREATE INDEX IF NOT EXISTS idx_observation_validations_created_at
+    ON observation_validations(created_at DESC);
+
+-- Contadores por escopo ('global' ou user_id)
+CREATE TABLE IF NOT EXISTS validation_stat_counters (
+    scope TEXT PRIMARY KEY,
+    total BIGINT NOT NULL DEFAULT 0,
+    confirmed BIGINT NOT NULL DEFAULT 0,
+    disputed BIGINT NOT NULL DEFAULT 0,
+    confidence_sum BIGINT NOT NULL DEFAULT 0
+);
+
+-- Validações criadas por dia (global e por usuário), para validation_trends
+CREATE TABLE IF NOT EXISTS validation_daily_counts (
+    scope TEXT NOT NULL,
+    day DATE NOT NULL,
+    count BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (scope, day)
+);
+
+CREATE OR REPLACE FUNCTION validation_stats_apply(val observation_validations, p_delta INTEGER)
+RETURNS VOID AS $$
+DECLARE
+    s TEXT;
+BEGIN
+    FOREACH s IN ARRAY ARRAY['global', val.user_id::TEXT] LOOP
+        CONTINUE WHEN s IS NULL;
+
+        INSERT INTO validation_stat_counters (scope, total, confirmed, disputed, confidence_sum)
+        VALUES (
+            s,
+            p_delta,
+            p_delta * (val.status = 'confirmed')::INTEGER,
+            p_delta * (val.status = 'disputed')::INTEGER,
+            p_delta * COALESCE(val.confidence_level, 0)
+        )
+        ON CONFLICT (scope) DO UPDATE SET
+            total = validation_stat_counters.total + EXCLUDED.total,
+            confirmed = validation_stat_counters.confirmed + EXCLUDED.confirmed,
+            disputed = validation_stat_counters.disputed + EXCLUDED.disputed,
+            confidence_sum = validation_stat_counters.confidence_sum + EXCLUDED.confidence_sum;
+
+        INSERT INTO validation_daily_counts (scope, day, count)
+        VALUES (s, (COALESCE(val.created_at, NOW()) AT TIME ZONE 'UTC')::DATE, p_delta)
+        ON CONFLICT (scope, day)
+        DO UPDATE SET count = validation_daily_counts.count + EXCLUDED.count;
+    END LOOP;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION validation_stats_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM validation_stats_apply(NEW, 1);
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM validation_stats_apply(OLD, -1);
+    ELSIF (OLD.status, OLD.confidence_level, OLD.user_id, OLD.created_at)
+          IS DISTINCT FROM (NEW.status, NEW.confidence_level, NEW.user_id, NEW.created_at) THEN
+        PERFORM validation_stats_apply(OLD, -1);
+        PERFORM validation_stats_apply(NEW, 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS validation_stats_counters ON observation_validations;
+CREATE TRIGGER validation_stats_counters AFTER INSERT OR UPDATE OR DELETE ON observation_validations
+    FOR EACH ROW EXECUTE FUNCTION validation_stats_trigger();
+
+-- Recalcula contadores e séries diárias a partir das validações (carga inicial / reparo)
+CREATE OR REPLACE FUNCTION refresh_validation_stats()
+RETURNS VOID AS $$
+BEGIN
+    LOCK TABLE observation_validations IN SHARE MODE;
+    DELETE FROM validation_stat_counters;
+    DELETE FROM validation_daily_counts;
+
+    INSERT INTO validation_stat_counters (scope, total, confirmed, disputed, confidence_sum)
+    SELECT s.scope,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE v.status = 'confirmed'),
+           COUNT(*) FILTER (WHERE v.status = 'disputed'),
+           COALESCE(SUM(v.confidence_level), 0)
+    FROM observation_validations v
+    CROSS JOIN LATERAL (VALUES ('global'), (v.user_id::TEXT)) AS s(scope)
+    WHERE s.scope IS NOT NULL
+    GROUP BY s.scope;
+
+    INSERT INTO validation_daily_counts (scope, day, count)
+    SELECT s.scope, (v.created_at AT TIME ZONE 'UTC')::DATE, COUNT(*)
+    FROM observation_validations v
+    CROSS JOIN LATERAL (VALUES ('global'), (v.user_id::TEXT)) AS s(scope)
+    WHERE s.scope IS NOT NULL
+    GROUP BY 1, 2;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT refresh_validation_stats();
+
+-- Ranking de validadores (lido pelo resumo; atualizado periodicamente, não por escrita)
+DROP MATERIALIZED VIEW IF EXISTS validation_leaderboard;
+CREATE MATERIALIZED VIEW validation_leaderboard AS
+    SELECT
+        c.scope::UUID AS user_id,
+        COALESCE(u.full_name, u.username, 'Usuário Anônimo') AS name,
+        u.avatar_url,
+        c.total AS validation_count,
+        c.confirmed AS confirmed_count,
+        c.disputed AS disputed_count,
+        ROUND(c.confidence_sum::NUMERIC / NULLIF(c.total, 0), 2) AS average_confidence,
+        RANK() OVER (ORDER BY c.total DESC) AS rank
+    FROM validation_stat_counters c
+    LEFT JOIN users u ON u.id::TEXT = c.scope
+    WHERE c.scope <> 'global' AND c.total > 0
+    ORDER BY c.total DESC
+    LIMIT 100;
+
+-- Necessário para REFRESH ... CONCURRENTLY (leituras não bloqueiam durante a atualização)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_validation_leaderboard_user ON validation_leaderboard(user_id);
+
+CREATE TABLE IF NOT EXISTS validation_leaderboard_state (
+    id BOOLEAN PRIMARY KEY DEFAULT true CHECK (id),
+    refreshed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+INSERT INTO validation_leaderboard_state (id, refreshed_at) VALUES (true, NOW())
+    ON CONFLICT (id) DO UPDATE SET refreshed_at = EXCLUDED.refreshed_at;
+
+-- Chamadas a menos de 60 s da última atualização devolvem o horário atual sem
+-- refazer o REFRESH; o FOR UPDATE serializa chamadas simultâneas
+CREATE OR REPLACE FUNCTION refresh_validation_leaderboard()
+RETURNS TIMESTAMP WITH TIME ZONE AS $$
+DECLARE
+    v_refreshed_at TIMESTAMP WITH TIME ZONE;
+BEGIN
+    SELECT refreshed_at INTO v_refreshed_at FROM validation_leaderboard_state FOR UPDATE;
+    IF v_refreshed_at > NOW() - INTERVAL '60 seconds' THEN
+        RETURN v_refreshed_at;
+    END IF;
+
+    REFRESH MATERIALIZED VIEW CONCURRENTLY validation_leaderboard;
+    UPDATE validation_leaderboard_state SET refreshed_at = NOW() RETURNING refreshed_at INTO v_refreshed_at;
+    RETURN v_refreshed_at;
+END;
+$$ LANGUAGE plpgsql SECURITY DEFINER SET search_path = public;
+
+-- REFRESH exige ser dono da view: a função roda como o dono (SECURITY DEFINER) e
+-- só o service_role (backend) pode chamá-la; a chave anon não força atualizações
+REVOKE ALL ON FUNCTION refresh_validation_leaderboard() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION refresh_validation_leaderboard() TO service_role;
+
+-- Agenda a atualização a cada 5 minutos quando pg_cron estiver disponível;
+-- sem pg_cron a API chama refresh_validation_leaderboard() quando o ranking fica velho
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+        PERFORM cron.schedule('refresh_validation_leaderboard', '*/5 * * * *',
+                              'SELECT refresh_validation_leaderboard()');
+    END IF;
+END;
+$$;
+
+-- Estatísticas de validação (global quando p_user_id é NULL)
+CREATE OR REPLACE FUNCTION get_validation_stats(p_user_id UUID DEFAULT NULL, p_top INTEGER DEFAULT 10)
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    WITH c AS (
+        SELECT total, confirmed, disputed, confidence_sum
+        FROM validation_stat_counters
+        WHERE scope = COALESCE(p_user_id::TEXT, 'global')
+    )
+    SELECT jsonb_build_object(
+        'total_validations', COALESCE((SELECT total FROM c), 0),
+        'confirmed_validations', COALESCE((SELECT confirmed FROM c), 0),
+        'disputed_validations', COALESCE((SELECT disputed FROM c), 0),
+        'average_confidence', COALESCE((SELECT ROUND(confidence_sum::NUMERIC / NULLIF(total, 0), 2) FROM c), 0),
+        'validations_by_user', CASE
+            WHEN p_user_id IS NULL THEN COALESCE((
+                SELECT jsonb_object_agg(l.name, l.validation_count)
+                FROM (SELECT name, validation_count FROM validation_leaderboard ORDER BY rank LIMIT p_top) l
+            ), '{}'::jsonb)
+            ELSE COALESCE((
+                SELECT jsonb_build_object(COALESCE(u.full_name, u.username, 'Usuário Anônimo'), c.total)
+                FROM c LEFT JOIN users u ON u.id = p_user_id
+                WHERE c.total > 0
+            ), '{}'::jsonb)
+        END
+    );
+$$;
+
+-- Resumo geral: contadores, validações recentes, ranking e série diária (p_days dias, zeros incluídos)
+CREATE OR REPLACE FUNCTION get_validation_summary(p_days INTEGER DEFAULT 7, p_top INTEGER DEFAULT 5)
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    WITH c AS (
+        SELECT total, confirmed, disputed, confidence_sum
+        FROM validation_stat_counters
+        WHERE scope = 'global'
+    ), days AS (
+        SELECT d::DATE AS day
+        FROM generate_series(
+            (NOW() AT TIME ZONE 'UTC')::DATE - (p_days - 1),
+            (NOW() AT TIME ZONE 'UTC')::DATE,
+            INTERVAL '1 day'
+        ) AS d
+    ), trends AS (
+        SELECT days.day, COALESCE(dc.count, 0) AS count
+        FROM days
+        LEFT JOIN validation_daily_counts dc ON dc.scope = 'global' AND dc.day = days.day
+    )
+    SELECT jsonb_build_object(
+        'total_validations', COALESCE((SELECT total FROM c), 0),
+        'confirmed_validations', COALESCE((SELECT confirmed FROM c), 0),
+        'disputed_validations', COALESCE((SELECT disputed FROM c), 0),
+        'average_confidence', COALESCE((SELECT ROUND(confidence_sum::NUMERIC / NULLIF(total, 0), 2) FROM c), 0),
+        'recent_validations', (SELECT COALESCE(SUM(count), 0) FROM trends),
+        'validation_trends', (SELECT jsonb_object_agg(to_char(day, 'YYYY-MM-DD'), count) FROM trends),
+        'top_validators', COALESCE((
+            SELECT jsonb_agg(jsonb_build_object(
+                'user_id', l.user_id,
+                'name', l.name,
+                'avatar_url', l.avatar_url,
+                'validation_count', l.validation_count,
+                'confirmed_count', l.confirmed_count,
+                'average_confidence', l.average_confidence,
+                'rank', l.rank
+            ) ORDER BY l.rank, l.user_id)
+            FROM (SELECT * FROM validation_leaderboard ORDER BY rank LIMIT p_top) l
+        ), '[]'::jsonb),
+        'leaderboard_refreshed_at', (SELECT refreshed_at FROM validation_leaderboard_state)
+    );
+$$;
+
+COMMENT ON TABLE validation_stat_counters IS 'Totais de validações (global e por usuário), mantidos por trigger';
+COMMENT ON TABLE validation_daily_counts IS 'Validações criadas por dia (global e por usuário), mantidas por trigger';
+COMMENT ON MATERIALIZED VIEW validation_leaderboard IS 'Top 100 validadores; atualizada por refresh_validation_leaderboard()';
+COMMENT ON FUNCTION refresh_validation_stats IS 'Recalcula os contadores de validação a partir de observation_validations';
+COMMENT ON FUNCTION refresh_validation_leaderboard IS 'Atualiza o ranking de validadores sem bloquear leituras';
@@ -0,0 +1,109 @@
+-- Migração 008: Listagem de observações com filtros no banco e paginação por cursor
+-- GET /observations filtra por tipo/status/usuário/período/raio, pagina por
+-- (created_at, id) e devolve um total estimado pelo planner (sem COUNT(*) completo)
+
+-- Ordem de listagem + variantes por filtro mais comum (keyset sem sort)
+CREATE INDEX IF NOT EXISTS idx_observations_created_id
+    ON observations(created_at DESC, id DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_observations_status_created_id
+    ON observations(status, created_at DESC, id DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_observations_type_created_id
+    ON observations(observation_type, created_at DESC, id DESC) WHERE deleted_at IS NULL;
+CREATE INDEX IF NOT EXISTS idx_observations_user_created_id
+    ON observations(user_id, created_at DESC, id DESC) WHERE deleted_at IS NULL;
+
+-- Filtros opcionais (NULL = ignorado); p_exact_count_threshold: abaixo disso o total é contado
+-- de verdade (barato), acima usa a estimativa do planner. Retorna p_limit + 1 linhas (há próxima?)
+CREATE OR REPLACE FUNCTION list_observations(
+    p_observation_type TEXT DEFAULT NULL,
+    p_status TEXT DEFAULT NULL,
+    p_user_id UUID DEFAULT NULL,
+    p_lat DOUBLE PRECISION DEFAULT NULL,
+    p_lng DOUBLE PRECISION DEFAULT NULL,
+    p_radius_km DOUBLE PRECISION DEFAULT NULL,
+    p_date_from TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_date_to TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_has_images BOOLEAN DEFAULT NULL,
+    p_min_validations INTEGER DEFAULT NULL,
+    p_cursor_created_at TIMESTAMP WITH TIME ZONE DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL,
+    p_offset INTEGER DEFAULT 0,
+    p_limit INTEGER DEFAULT 20,
+    p_exact_count_threshold INTEGER DEFAULT 1000
+)
+RETURNS JSONB
+LANGUAGE plpgsql STABLE AS $$
+DECLARE
+    v_where TEXT := 'deleted_at IS NULL';
+    v_page_where TEXT;
+    v_plan JSONB;
+    v_total BIGINT;
+    v_estimated BOOLEAN := false;
+    v_rows JSONB;
+BEGIN
+    IF p_observation_type IS NOT NULL THEN
+        v_where := v_where || format(' AND observation_type = %L', p_observation_type);
+    END IF;
+    IF p_status IS NOT NULL THEN
+        v_where := v_where || format(' AND status = %L', p_status);
+    END IF;
+    IF p_user_id IS NOT NULL THEN
+        v_where := v_where || format(' AND user_id = %L::UUID', p_user_id);
+    END IF;
+    IF p_lat IS NOT NULL AND p_lng IS NOT NULL AND p_radius_km IS NOT NULL THEN
+        -- ST_DWithin em geography usa o índice GIST idx_observations_location
+        v_where := v_where || format(
+            ' AND ST_DWithin(location_point, ST_SetSRID(ST_MakePoint(%s, %s), 4326)::geography, %s)',
+            p_lng, p_lat, p_radius_km * 1000
+        );
+    END IF;
+    IF p_date_from IS NOT NULL THEN
+        v_where := v_where || format(' AND created_at >= %L::TIMESTAMPTZ', p_date_from);
+    END IF;
+    IF p_date_to IS NOT NULL THEN
+        v_where := v_where || format(' AND created_at <= %L::TIMESTAMPTZ', p_date_to);
+    END IF;
+    IF p_has_images IS NOT NULL THEN
+        v_where := v_where || CASE WHEN p_has_images
+            THEN ' AND jsonb_array_length(COALESCE(images, ''[]''::jsonb)) > 0'
+            ELSE ' AND jsonb_array_length(COALESCE(images, ''[]''::jsonb)) = 0' END;
+    END IF;
+    IF p_min_validations IS NOT NULL THEN
+        v_where := v_where || format(' AND validation_count >= %s', p_min_validations);
+    END IF;
+
+    -- Total: estimativa do planner; conta de fato quando o resultado é pequeno
+    EXECUTE 'EXPLAIN (FORMAT JSON) SELECT 1 FROM observations WHERE ' || v_where INTO v_plan;
+    v_total := (v_plan -> 0 -> 'Plan' ->> 'Plan Rows')::BIGINT;
+    IF v_total <= p_exact_count_threshold THEN
+        EXECUTE 'SELECT COUNT(*) FROM observations WHERE ' || v_where INTO v_total;
+    ELSE
+        v_estimated := true;
+    END IF;
+
+    -- Página: keyset em (created_at, id) quando há cursor, senão offset (compatibilidade)
+    v_page_where := v_where;
+    IF p_cursor_created_at IS NOT NULL AND p_cursor_id IS NOT NULL THEN
+        v_page_where := v_page_where || format(
+            ' AND (created_at, id) < (%L::TIMESTAMPTZ, %L::UUID)', p_cursor_created_at, p_cursor_id
+        );
+        p_offset := 0;
+    END IF;
+
+    EXECUTE format(
+        'SELECT COALESCE(jsonb_agg(to_jsonb(o) - ''location_point'' ORDER BY o.created_at DESC, o.id DESC), ''[]''::jsonb) FROM ('
+        '  SELECT * FROM observations WHERE %s'
+        '  ORDER BY created_at DESC, id DESC OFFSET %s LIMIT %s'
+        ') o',
+        v_page_where, GREATEST(p_offset, 0), p_limit + 1
+    ) INTO v_rows;
+
+    RETURN jsonb_build_object(
+        'observations', v_rows,
+        'total', v_total,
+        'total_is_estimate', v_estimated
+    );
+END;
+$$;
+
+COMMENT ON FUNCTION list_observations IS 'Observações filtradas (tipo/status/usuário/período/raio), paginadas por (created_at, id), com total estimado';
@@ -0,0 +1,76 @@
+-- Migração 009: Busca textual ranqueada de observações
+-- tsvector ponderado (título = A, descrição = B, local/endereço = C) sem acentos,
+-- índice GIN, trigramas para erros de digitação e RPC com ranking, trechos
+-- destacados e paginação por (rank, id)
+
+CREATE EXTENSION IF NOT EXISTS unaccent;
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- A API grava location_name (nome do local); address vem do schema original
+ALTER TABLE observations ADD COLUMN IF NOT EXISTS location_name VARCHAR(200);
+
+-- unaccent() não é IMMUTABLE; o wrapper com dicionário explícito pode ser usado em índices/colunas geradas
+CREATE OR REPLACE FUNCTION orbee_unaccent(TEXT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS $$
+    SELECT public.unaccent('public.unaccent'::regdictionary, $1);
+$$;
+
+ALTER TABLE observations ADD COLUMN IF NOT EXISTS search_vector TSVECTOR
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('portuguese', orbee_unaccent(COALESCE(title, ''))), 'A') ||
+        setweight(to_tsvector('portuguese', orbee_unaccent(COALESCE(description, ''))), 'B') ||
+        setweight(to_tsvector('portuguese', orbee_unaccent(COALESCE(location_name, '') || ' ' || COALESCE(address, ''))), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_observations_search_vector ON observations USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_observations_title_trgm
+    ON observations USING GIN (orbee_unaccent(lower(title)) gin_trgm_ops);
+
+-- Busca ranqueada. p_query é tratado como texto de busca web (aspas, OR, -termo),
+-- nunca interpolado em SQL. Retorna p_limit + 1 linhas (a última indica próxima página)
+CREATE OR REPLACE FUNCTION search_observations(
+    p_query TEXT,
+    p_observation_type TEXT DEFAULT NULL,
+    p_cursor_rank REAL DEFAULT NULL,
+    p_cursor_id UUID DEFAULT NULL,
+    p_limit INTEGER DEFAULT 20
+)
+RETURNS JSONB
+LANGUAGE sql STABLE AS $$
+    WITH q AS (
+        SELECT
+            websearch_to_tsquery('portuguese', orbee_unaccent(p_query)) AS tsq,
+            -- Destaque no texto original (com acentos): consulta com e sem acentos
+            websearch_to_tsquery('portuguese', p_query) || websearch_to_tsquery('portuguese', orbee_unaccent(p_query)) AS hlq,
+            orbee_unaccent(lower(p_query)) AS plain
+    ), matches AS (
+        SELECT
+            o.*,
+            (ts_rank_cd(o.search_vector, q.tsq, 1)
+             + 0.3 * similarity(orbee_unaccent(lower(o.title)), q.plain))::REAL AS search_rank
+        FROM observations o, q
+        WHERE o.deleted_at IS NULL
+          AND (o.search_vector @@ q.tsq OR orbee_unaccent(lower(o.title)) % q.plain)
+          AND (p_observation_type IS NULL OR o.observation_type = p_observation_type)
+    ), page AS (
+        SELECT *
+        FROM matches
+        WHERE p_cursor_rank IS NULL OR (search_rank, id) < (p_cursor_rank, p_cursor_id)
+        ORDER BY search_rank DESC, id DESC
+        LIMIT p_limit + 1
+    )
+    SELECT COALESCE(jsonb_agg(
+        (to_jsonb(page) - 'location_point' - 'search_vector') || jsonb_build_object(
+            'search_snippet', ts_headline(
+                'portuguese', COALESCE(page.description, ''), q.hlq,
+                'StartSel=<mark>, StopSel=</mark>, MaxWords=30, MinWords=10, MaxFragments=2, FragmentDelimiter=" ... "'
+            )
+        )
+        ORDER BY page.search_rank DESC, page.id DESC
+    ), '[]'::jsonb)
+    FROM page, q;
+$$;
+
+COMMENT ON COLUMN observations.search_vector IS 'tsvector ponderado (título A, descrição B, local C) usado por search_observations';
+COMMENT ON FUNCTION search_observations IS 'Busca textual ranqueada com trechos destacados e paginação por (rank, id)';
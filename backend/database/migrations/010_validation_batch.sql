@@ -0,0 +1,164 @@
+-- Migração 010: Envio de validações em lote (POST /validations/batch)
+-- Verificações de existência/autoria/duplicidade feitas por conjunto, um único
+-- INSERT e contadores das observações atualizados por instrução (não por linha)
+
+-- Status da observação a partir dos contadores:
+-- mínimo de 3 validações; >= 70% confirmadas -> validated, >= 70% disputadas -> rejected
+CREATE OR REPLACE FUNCTION observation_validation_status(p_total BIGINT, p_confirmed BIGINT, p_disputed BIGINT)
+RETURNS TEXT
+LANGUAGE sql IMMUTABLE AS $$
+    SELECT CASE
+        WHEN p_total < 3 THEN 'pending'
+        WHEN p_confirmed >= p_total * 0.7 THEN 'validated'
+        WHEN p_disputed >= p_total * 0.7 THEN 'rejected'
+        ELSE 'under_review'
+    END;
+$$;
+
+-- Aplica deltas de várias observações em um único UPDATE
+CREATE OR REPLACE FUNCTION apply_observation_validation_deltas(
+    p_observation_ids UUID[],
+    p_total BIGINT[],
+    p_confirmed BIGINT[],
+    p_disputed BIGINT[]
+)
+RETURNS VOID AS $$
+BEGIN
+    -- Deltas somados sobre a própria linha (bloqueada pelo UPDATE), sem reler os
+    -- contadores em subconsulta: escritas concorrentes não se sobrescrevem.
+    -- As expressões do SET veem os valores antigos, por isso o status repete os cálculos
+    UPDATE observations o SET
+        validation_count = GREATEST(COALESCE(o.validation_count, 0) + d.total, 0),
+        confirmed_validations = GREATEST(COALESCE(o.confirmed_validations, 0) + d.confirmed, 0),
+        disputed_validations = GREATEST(COALESCE(o.disputed_validations, 0) + d.disputed, 0),
+        status = observation_validation_status(
+            GREATEST(COALESCE(o.validation_count, 0) + d.total, 0),
+            GREATEST(COALESCE(o.confirmed_validations, 0) + d.confirmed, 0),
+            GREATEST(COALESCE(o.disputed_validations, 0) + d.disputed, 0)
+        )
+    FROM unnest(p_observation_ids, p_total, p_confirmed, p_disputed)
+        AS d(observation_id, total, confirmed, disputed)
+    WHERE o.id = d.observation_id
+      AND (d.total <> 0 OR d.confirmed <> 0 OR d.disputed <> 0);
+END;
+$$ LANGUAGE plpgsql;
+
+-- Contadores por instrução: um UPDATE por INSERT/UPDATE/DELETE, qualquer que seja o número de linhas
+CREATE OR REPLACE FUNCTION observation_validation_counters_stmt_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        PERFORM apply_observation_validation_deltas(
+            array_agg(observation_id), array_agg(total), array_agg(confirmed), array_agg(disputed)
+        )
+        FROM (
+            SELECT observation_id,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE status = 'confirmed') AS confirmed,
+                   COUNT(*) FILTER (WHERE status = 'disputed') AS disputed
+            FROM new_rows
+            GROUP BY observation_id
+        ) d;
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM apply_observation_validation_deltas(
+            array_agg(observation_id), array_agg(total), array_agg(confirmed), array_agg(disputed)
+        )
+        FROM (
+            SELECT observation_id,
+                   -COUNT(*) AS total,
+                   -COUNT(*) FILTER (WHERE status = 'confirmed') AS confirmed,
+                   -COUNT(*) FILTER (WHERE status = 'disputed') AS disputed
+            FROM old_rows
+            GROUP BY observation_id
+        ) d;
+    ELSE
+        PERFORM apply_observation_validation_deltas(
+            array_agg(observation_id), array_agg(total), array_agg(confirmed), array_agg(disputed)
+        )
+        FROM (
+            SELECT observation_id,
+                   SUM(sign) AS total,
+                   SUM(sign * (status = 'confirmed')::INTEGER) AS confirmed,
+                   SUM(sign * (status = 'disputed')::INTEGER) AS disputed
+            FROM (
+                SELECT observation_id, status, 1 AS sign FROM new_rows
+                UNION ALL
+                SELECT observation_id, status, -1 AS sign FROM old_rows
+            ) changes
+            GROUP BY observation_id
+        ) d;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Substitui o trigger por linha da migração 006
+DROP TRIGGER IF EXISTS observation_validation_counters ON observation_validations;
+
+DROP TRIGGER IF EXISTS observation_validation_counters_insert ON observation_validations;
+CREATE TRIGGER observation_validation_counters_insert AFTER INSERT ON observation_validations
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION observation_validation_counters_stmt_trigger();
+
+DROP TRIGGER IF EXISTS observation_validation_counters_delete ON observation_validations;
+CREATE TRIGGER observation_validation_counters_delete AFTER DELETE ON observation_validations
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION observation_validation_counters_stmt_trigger();
+
+DROP TRIGGER IF EXISTS observation_validation_counters_update ON observation_validations;
+CREATE TRIGGER observation_validation_counters_update AFTER UPDATE ON observation_validations
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION observation_validation_counters_stmt_trigger();
+
+-- Lote de validações de um usuário. p_items: [{observation_id, status, comment, confidence_level, evidence_images}]
+-- Resultado por item (na ordem de entrada): created | observation_not_found | own_observation | duplicate
+CREATE OR REPLACE FUNCTION create_validations_batch(p_user_id UUID, p_items JSONB)
+RETURNS JSONB
+LANGUAGE sql AS $$
+    WITH items AS (
+        SELECT
+            (i.ord - 1)::INTEGER AS idx,
+            i.item,
+            CASE WHEN i.item->>'observation_id' ~* '^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$'
+                 THEN (i.item->>'observation_id')::UUID END AS observation_id
+        FROM jsonb_array_elements(p_items) WITH ORDINALITY AS i(item, ord)
+    ), classified AS (
+        SELECT
+            items.*,
+            CASE
+                WHEN o.id IS NULL THEN 'observation_not_found'
+                WHEN o.user_id = p_user_id THEN 'own_observation'
+                WHEN v.id IS NOT NULL
+                  OR ROW_NUMBER() OVER (PARTITION BY items.observation_id ORDER BY items.idx) > 1 THEN 'duplicate'
+                ELSE 'created'
+            END AS outcome
+        FROM items
+        LEFT JOIN observations o ON o.id = items.observation_id
+        LEFT JOIN observation_validations v ON v.observation_id = items.observation_id AND v.user_id = p_user_id
+    ), inserted AS (
+        INSERT INTO observation_validations (observation_id, user_id, status, comment, confidence_level, evidence_images)
+        SELECT
+            observation_id,
+            p_user_id,
+            item->>'status',
+            item->>'comment',
+            (item->>'confidence_level')::INTEGER,
+            COALESCE(item->'evidence_images', '[]'::jsonb)
+        FROM classified
+        WHERE outcome = 'created'
+        -- Corrida com outro envio simultâneo do mesmo usuário: vira 'duplicate' abaixo
+        ON CONFLICT (observation_id, user_id) DO NOTHING
+        RETURNING id, observation_id
+    )
+    SELECT COALESCE(jsonb_agg(jsonb_build_object(
+        'index', c.idx,
+        'observation_id', c.item->>'observation_id',
+        'status', CASE WHEN c.outcome = 'created' AND i.id IS NULL THEN 'duplicate' ELSE c.outcome END,
+        'validation_id', i.id
+    ) ORDER BY c.idx), '[]'::jsonb)
+    FROM classified c
+    LEFT JOIN inserted i ON c.outcome = 'created' AND i.observation_id = c.observation_id;
+$$;
+
+COMMENT ON FUNCTION apply_observation_validation_deltas IS 'Aplica deltas de contadores de validação a várias observações em um único UPDATE';
+COMMENT ON FUNCTION create_validations_batch IS 'Cria um lote de validações com verificações por conjunto e um único INSERT; resultado por item';
@@ -0,0 +1,28 @@
+-- Migração 011: Versão do catálogo de recomendações
+-- O backend mantém o catálogo em memória e só o recarrega quando esta versão
+-- muda (qualquer INSERT/UPDATE/DELETE/TRUNCATE em recommendations)
+
+CREATE TABLE IF NOT EXISTS recommendation_catalog_version (
+    id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+    version BIGINT NOT NULL DEFAULT 1,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+INSERT INTO recommendation_catalog_version (id) VALUES (1) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_recommendation_catalog_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE recommendation_catalog_version
+    SET version = version + 1, updated_at = NOW()
+    WHERE id = 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS recommendation_catalog_version_bump ON recommendations;
+CREATE TRIGGER recommendation_catalog_version_bump
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON recommendations
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_recommendation_catalog_version();
+
+COMMENT ON TABLE recommendation_catalog_version IS 'Versão do catálogo de recomendações; o backend recarrega o cache em memória quando muda';
@@ -30,9 +30,20 @@ from .hls_analysis import (
 
 from .hls_ndvi_processing import (
     load_and_process_hls_data,
-    create_ndvi_composite
+    create_ndvi_composite,
+    StreamingNDVICompositor,
+    NDVICompositeAccumulator
 )
 
+from .hls_fmask import (
+    build_fmask_lut,
+    fmask_reason_counts
+)
+
+from .hls_parallel import iter_processed_scenes
+
+from .hls_batch import run_batch
+
 from .hls_degradation_analysis import (
     analyze_riparian_forest_degradation,
     load_river_geometry_for_buffer,
@@ -61,6 +72,18 @@ __all__ = [
     # hls_ndvi_processing
     'load_and_process_hls_data',
     'create_ndvi_composite',
+    'StreamingNDVICompositor',
+    'NDVICompositeAccumulator',
+    
+    # hls_fmask
+    'build_fmask_lut',
+    'fmask_reason_counts',
+    
+    # hls_parallel
+    'iter_processed_scenes',
+    
+    # hls_batch
+    'run_batch',
     
     # hls_degradation_analysis
     'analyze_riparian_forest_degradation',
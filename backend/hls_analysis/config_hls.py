@@ -21,6 +21,18 @@ HLS_COLLECTIONS = [
     "hls2-s30"   # HLS Sentinel-2 30m v2.0
 ]
 
+# STAC API (Microsoft Planetary Computer)
+STAC_API_URL = "https://planetarycomputer.microsoft.com/api/stac/v1"
+
+# Collections searched at once
+STAC_SEARCH_WORKERS = 2
+
+# On-disk STAC search cache; None = hls_analysis/cache/stac
+STAC_CACHE_DIR = None
+
+# Cached search lifetime in hours; None = never expires
+STAC_CACHE_TTL_HOURS = 24
+
 # =============================================================================
 # NDVI PROCESSING CONFIGURATIONS
 # =============================================================================
@@ -32,6 +44,19 @@ NDVI_MODERATE_THRESHOLD = 0.5   # Threshold to separate sparse from dense vegeta
 # Minimum valid pixels for analysis (fraction 0-1)
 MIN_VALID_PIXELS = 0.05
 
+# Detailed per-scene diagnostics (band dimensions, QA histogram, mask counts)
+VERBOSE_DIAGNOSTICS = False
+
+# =============================================================================
+# FMASK (QUALITY) CONFIGURATIONS
+# =============================================================================
+
+# Fmask flags that exclude a pixel: cirrus, cloud, adjacent, shadow, snow_ice, water
+FMASK_MASKED_CONDITIONS = ['cloud', 'adjacent', 'shadow', 'snow_ice', 'water']
+
+# Highest aerosol level kept: 'climatology', 'low', 'moderate' or 'high'
+FMASK_MAX_AEROSOL = "moderate"
+
 # =============================================================================
 # DEGRADATION ANALYSIS CONFIGURATIONS
 # =============================================================================
@@ -55,6 +80,62 @@ MAX_POINTS_PER_SEVERITY = 50
 # Sampling configurations
 SAMPLING_STEP = 3
 
+# =============================================================================
+# RASTER I/O CONFIGURATIONS
+# =============================================================================
+
+# Concurrent COG band reads per scene (red, NIR and Fmask)
+BAND_READ_WORKERS = 3
+
+# Analysis resolution in meters; None = native 30 m. Coarser values read COG overviews
+TARGET_RESOLUTION_M = None
+
+# On-disk cache of AOI band windows (shared by batch workers); None = disabled
+RASTER_CACHE_DIR = None
+
+# =============================================================================
+# PARALLEL SCENE PROCESSING
+# =============================================================================
+
+# Scene executor: 'process' (process pool), 'dask' (local dask distributed cluster) or 'serial'
+SCENE_EXECUTOR = "process"
+
+# Scenes processed at once; None = number of CPU cores
+SCENE_WORKERS = None
+
+# Memory limit per worker (e.g. '4GB'); None = no limit
+WORKER_MEMORY_LIMIT = "4GB"
+
+# Maximum number of scenes selected for the composite; None = every scene of the period
+MAX_SCENES = 3
+
+# =============================================================================
+# TEMPORAL COMPOSITE CONFIGURATIONS
+# =============================================================================
+
+# Composite method: 'mean' (weighted by valid fraction), 'max' (max NDVI),
+# 'median' (approximate, histogram sketch) or 'best' (best-scored pixel)
+COMPOSITE_METHOD = "mean"
+
+# Histogram bins over NDVI [-1, 1] for the approximate median (memory: 2 bytes per bin per pixel)
+COMPOSITE_MEDIAN_BINS = 40
+
+# Rows folded per block when adding a scene to the composite
+COMPOSITE_CHUNK_ROWS = 512
+
+# =============================================================================
+# MULTI-MUNICIPALITY BATCH CONFIGURATIONS
+# =============================================================================
+
+# Municipalities analyzed at once (one process each)
+BATCH_WORKERS = 2
+
+# Root folder of batch outputs (one subfolder per municipality + checkpoint)
+BATCH_OUTPUT_DIR = "batch_output"
+
+# Scene executor inside each batch worker ('serial' avoids nested process pools)
+BATCH_SCENE_EXECUTOR = "serial"
+
 # =============================================================================
 # EXPORT CONFIGURATIONS
 # =============================================================================
@@ -79,12 +160,21 @@ def get_config():
             'start_date': START_DATE,
             'end_date': END_DATE,
             'cloud_coverage_max': CLOUD_COVERAGE_MAX,
-            'hls_collections': HLS_COLLECTIONS
+            'hls_collections': HLS_COLLECTIONS,
+            'stac_api_url': STAC_API_URL,
+            'stac_search_workers': STAC_SEARCH_WORKERS,
+            'stac_cache_dir': STAC_CACHE_DIR,
+            'stac_cache_ttl_hours': STAC_CACHE_TTL_HOURS
         },
         'ndvi': {
             'critical_threshold': NDVI_CRITICAL_THRESHOLD,
             'moderate_threshold': NDVI_MODERATE_THRESHOLD,
-            'min_valid_pixels': MIN_VALID_PIXELS
+            'min_valid_pixels': MIN_VALID_PIXELS,
+            'verbose_diagnostics': VERBOSE_DIAGNOSTICS
+        },
+        'fmask': {
+            'masked_conditions': FMASK_MASKED_CONDITIONS,
+            'max_aerosol': FMASK_MAX_AEROSOL
         },
         'degradation': {
             'buffer_distance': BUFFER_DISTANCE,
@@ -95,6 +185,27 @@ def get_config():
             'max_per_severity': MAX_POINTS_PER_SEVERITY,
             'sampling_step': SAMPLING_STEP
         },
+        'io': {
+            'band_read_workers': BAND_READ_WORKERS,
+            'target_resolution_m': TARGET_RESOLUTION_M,
+            'raster_cache_dir': RASTER_CACHE_DIR
+        },
+        'parallel': {
+            'scene_executor': SCENE_EXECUTOR,
+            'scene_workers': SCENE_WORKERS,
+            'worker_memory_limit': WORKER_MEMORY_LIMIT,
+            'max_scenes': MAX_SCENES
+        },
+        'composite': {
+            'method': COMPOSITE_METHOD,
+            'median_bins': COMPOSITE_MEDIAN_BINS,
+            'chunk_rows': COMPOSITE_CHUNK_ROWS
+        },
+        'batch': {
+            'workers': BATCH_WORKERS,
+            'output_dir': BATCH_OUTPUT_DIR,
+            'scene_executor': BATCH_SCENE_EXECUTOR
+        },
         'export': {
             'output_dir': OUTPUT_DIR,
             'geojson_filename': GEOJSON_FILENAME,
@@ -106,10 +217,16 @@ def get_config():
 def update_config(**kwargs):
     """Updates specific configurations"""
     global START_DATE, END_DATE, CLOUD_COVERAGE_MAX
-    global NDVI_CRITICAL_THRESHOLD, NDVI_MODERATE_THRESHOLD
+    global STAC_SEARCH_WORKERS, STAC_CACHE_DIR, STAC_CACHE_TTL_HOURS
+    global NDVI_CRITICAL_THRESHOLD, NDVI_MODERATE_THRESHOLD, VERBOSE_DIAGNOSTICS
     global BUFFER_DISTANCE, BUFFER_DISTANCE_RIVER
     global MIN_DISTANCE_POINTS, MAX_POINTS_PER_SEVERITY
     global OUTPUT_DIR, GEOJSON_FILENAME, GEOTIFF_FILENAME, LOG_FILENAME
+    global FMASK_MASKED_CONDITIONS, FMASK_MAX_AEROSOL
+    global BAND_READ_WORKERS, TARGET_RESOLUTION_M, RASTER_CACHE_DIR
+    global SCENE_EXECUTOR, SCENE_WORKERS, WORKER_MEMORY_LIMIT, MAX_SCENES
+    global COMPOSITE_METHOD, COMPOSITE_MEDIAN_BINS, COMPOSITE_CHUNK_ROWS
+    global BATCH_WORKERS, BATCH_OUTPUT_DIR, BATCH_SCENE_EXECUTOR
     
     # Update search configurations
     if 'start_date' in kwargs:
@@ -118,12 +235,20 @@ def update_config(**kwargs):
         END_DATE = kwargs['end_date']
     if 'cloud_coverage_max' in kwargs:
         CLOUD_COVERAGE_MAX = kwargs['cloud_coverage_max']
+    if 'stac_search_workers' in kwargs:
+        STAC_SEARCH_WORKERS = kwargs['stac_search_workers']
+    if 'stac_cache_dir' in kwargs:
+        STAC_CACHE_DIR = kwargs['stac_cache_dir']
+    if 'stac_cache_ttl_hours' in kwargs:
+        STAC_CACHE_TTL_HOURS = kwargs['stac_cache_ttl_hours']
     
     # Update NDVI configurations
     if 'critical_threshold' in kwargs:
         NDVI_CRITICAL_THRESHOLD = kwargs['critical_threshold']
     if 'moderate_threshold' in kwargs:
         NDVI_MODERATE_THRESHOLD = kwargs['moderate_threshold']
+    if 'verbose_diagnostics' in kwargs:
+        VERBOSE_DIAGNOSTICS = kwargs['verbose_diagnostics']
     
     # Update buffer configurations
     if 'buffer_distance' in kwargs:
@@ -137,6 +262,46 @@ def update_config(**kwargs):
     if 'max_per_severity' in kwargs:
         MAX_POINTS_PER_SEVERITY = kwargs['max_per_severity']
     
+    # Update Fmask configurations
+    if 'fmask_masked_conditions' in kwargs:
+        FMASK_MASKED_CONDITIONS = kwargs['fmask_masked_conditions']
+    if 'fmask_max_aerosol' in kwargs:
+        FMASK_MAX_AEROSOL = kwargs['fmask_max_aerosol']
+    
+    # Update raster I/O configurations
+    if 'band_read_workers' in kwargs:
+        BAND_READ_WORKERS = kwargs['band_read_workers']
+    if 'target_resolution_m' in kwargs:
+        TARGET_RESOLUTION_M = kwargs['target_resolution_m']
+    if 'raster_cache_dir' in kwargs:
+        RASTER_CACHE_DIR = kwargs['raster_cache_dir']
+    
+    # Update parallel processing configurations
+    if 'scene_executor' in kwargs:
+        SCENE_EXECUTOR = kwargs['scene_executor']
+    if 'scene_workers' in kwargs:
+        SCENE_WORKERS = kwargs['scene_workers']
+    if 'worker_memory_limit' in kwargs:
+        WORKER_MEMORY_LIMIT = kwargs['worker_memory_limit']
+    if 'max_scenes' in kwargs:
+        MAX_SCENES = kwargs['max_scenes']
+    
+    # Update temporal composite configurations
+    if 'composite_method' in kwargs:
+        COMPOSITE_METHOD = kwargs['composite_method']
+    if 'composite_median_bins' in kwargs:
+        COMPOSITE_MEDIAN_BINS = kwargs['composite_median_bins']
+    if 'composite_chunk_rows' in kwargs:
+        COMPOSITE_CHUNK_ROWS = kwargs['composite_chunk_rows']
+    
+    # Update batch configurations
+    if 'batch_workers' in kwargs:
+        BATCH_WORKERS = kwargs['batch_workers']
+    if 'batch_output_dir' in kwargs:
+        BATCH_OUTPUT_DIR = kwargs['batch_output_dir']
+    if 'batch_scene_executor' in kwargs:
+        BATCH_SCENE_EXECUTOR = kwargs['batch_scene_executor']
+    
     # Update export configurations
     if 'output_dir' in kwargs:
         OUTPUT_DIR = kwargs['output_dir']
@@ -11,7 +11,11 @@ This script processes NASA HLS data for riparian forest analysis:
 import os
 import sys
 import json
+import hashlib
+import threading
+import time
 import warnings
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 
@@ -25,6 +29,7 @@ except ImportError:
     from config_hls import get_config
 
 # Main imports
+import pystac
 import pystac_client
 import planetary_computer as pc
 import rasterio
@@ -59,6 +64,10 @@ MIN_DISTANCE_POINTS = config['points']['min_distance']
 MAX_POINTS_PER_SEVERITY = config['points']['max_per_severity']
 BUFFER_DISTANCE_RIVER = config['degradation']['buffer_distance_river']
 SAMPLING_STEP = config['points']['sampling_step']
+STAC_API_URL = config['search']['stac_api_url']
+STAC_SEARCH_WORKERS = config['search']['stac_search_workers']
+STAC_CACHE_DIR = Path(config['search']['stac_cache_dir'] or Path(__file__).resolve().parent / "cache" / "stac")
+STAC_CACHE_TTL_HOURS = config['search']['stac_cache_ttl_hours']
 
 # HLS collection names
 HLS_COLLECTIONS = [
@@ -66,6 +75,54 @@ HLS_COLLECTIONS = [
     "hls2-s30"   # HLS Sentinel-2 30m v2.0
 ]
 
+# Fields extension: only what selection and band reading use (assets, date, clouds)
+STAC_SEARCH_FIELDS = {
+    "include": [
+        "id", "type", "stac_version", "stac_extensions", "collection", "bbox", "geometry",
+        "links", "assets", "properties.datetime", "properties.eo:cloud_cover"
+    ],
+    "exclude": []
+}
+
+# Catalog opened once per process (shared by every search / region)
+_catalog = None
+_catalog_lock = threading.Lock()
+
+def get_nominatim_client():
+    """Shared rate-limited Nominatim client (same disk cache as the API and osmnx)"""
+    backend_dir = Path(__file__).resolve().parent.parent
+    if str(backend_dir) not in sys.path:
+        sys.path.append(str(backend_dir))
+    from app.services.nominatim_client import nominatim_client
+    return nominatim_client
+
+def configure_osmnx_cache(ox):
+    """Points osmnx at the shared cache folder so Nominatim/Overpass responses are reused"""
+    ox.settings.use_cache = True
+    ox.settings.cache_folder = str(get_nominatim_client().cache_dir)
+
+def geocode_region_to_gdf(regiao: str) -> gpd.GeoDataFrame:
+    """
+    Equivalent of ox.geocode_to_gdf(regiao) going through the shared Nominatim client
+    (token bucket + coalescing + persistent cache): same request (limit=50) and,
+    like osmnx, the first (Multi)Polygon among the results
+    """
+    results = get_nominatim_client().geocode_sync(regiao)
+    results = [r for r in results if r.get("geojson", {}).get("type") in ("Polygon", "MultiPolygon")]
+    if not results:
+        raise ValueError(f"Nominatim não retornou polígono para '{regiao}'")
+    it = results[0]
+    feature = {
+        "type": "Feature",
+        "geometry": it["geojson"],
+        "properties": {
+            "display_name": it.get("display_name"),
+            "osm_type": it.get("osm_type"),
+            "osm_id": it.get("osm_id"),
+        },
+    }
+    return gpd.GeoDataFrame.from_features([feature], crs=CRS_WGS84)
+
 def check_hls_coverage(bounds):
     """Checks if the region has theoretical HLS coverage"""
     minx, miny, maxx, maxy = bounds
@@ -91,7 +148,7 @@ def check_hls_coverage(bounds):
     print("✅ Region within expected parameters for HLS")
     return True
 
-def load_aoi_data(region_name=None):
+def load_aoi_data(region_name=None, allow_local_fallback=True):
     """
     Loads AOI data ONLY from real sources.
     If region_name is provided, searches for rivers in the region with precise filtering.
@@ -99,6 +156,8 @@ def load_aoi_data(region_name=None):
     
     Args:
         region_name: Region name to search for rivers (e.g., "Sinimbu, Rio Grande do Sul, Brasil")
+        allow_local_fallback: Falls back to local GeoJSON files when the region search fails
+            (disabled in batch runs, where a local AOI would belong to another region)
     
     Returns:
         tuple: (AOI GeoDataFrame, source path)
@@ -115,6 +174,8 @@ def load_aoi_data(region_name=None):
             return aoi_gdf, f"rios_region_{region_name.replace(',', '_').replace(' ', '_')}"
         except Exception as e:
             print(f"⚠️ Error searching for rivers in region: {e}")
+            if not allow_local_fallback:
+                raise ValueError(f"Unable to load AOI for region '{region_name}': {e}")
             print("🔄 Trying to load local file...")
     
     # Option 1: Try to load local project file
@@ -156,18 +217,19 @@ def find_rivers_in_region_with_filter(regiao: str, buffer_distance: float = 200)
         GeoDataFrame: Unified AOI of rivers in the region
     """
     import osmnx as ox
+    configure_osmnx_cache(ox)
     
     print(f"🔍 Buscando rios na região '{regiao}'...")
     
     try:
-        # 1. Busca os limites administrativos do município
+        # 1. Busca os limites administrativos do município (Nominatim compartilhado)
         print("  📍 Obtendo limites administrativos...")
-        boundary = ox.geocode_to_gdf(regiao)
+        boundary = geocode_region_to_gdf(regiao)
         municipality_bounds = boundary.geometry.iloc[0]
         
-        # 2. Busca todos os rios na região
+        # 2. Busca todos os rios na região (polígono já geocodificado: sem 2ª chamada ao Nominatim)
         print("  🌊 Buscando rios na região...")
-        rivers = ox.features_from_place(regiao, tags={'waterway': 'river'})
+        rivers = ox.features_from_polygon(municipality_bounds, tags={'waterway': 'river'})
         
         if rivers.empty:
             raise ValueError(f"Nenhum rio encontrado na região '{regiao}'")
@@ -253,80 +315,113 @@ def find_rivers_in_region_with_filter(regiao: str, buffer_distance: float = 200)
         print(f"❌ Erro ao buscar rios: {e}")
         raise
 
-def search_hls_data(bounds, start_date, end_date, max_cloud=50):
-    """Busca dados HLS via Microsoft Planetary Computer STAC API"""
+def get_stac_catalog():
+    """Cliente STAC do Planetary Computer, aberto uma única vez por processo"""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            print("🌐 Conectando ao Microsoft Planetary Computer...")
+            _catalog = pystac_client.Client.open(STAC_API_URL)
+            print("✅ Conexão estabelecida com Microsoft Planetary Computer")
+        return _catalog
+
+def _stac_cache_path(collection, bounds, datetime_range, max_cloud):
+    """Arquivo de cache de uma busca: chave = coleção, bbox, período e filtro"""
+    key = json.dumps({
+        "collection": collection,
+        "bbox": [round(float(v), 6) for v in bounds],
+        "datetime": datetime_range,
+        "max_cloud": max_cloud,
+        "fields": STAC_SEARCH_FIELDS
+    }, sort_keys=True)
+    return STAC_CACHE_DIR / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+def _read_stac_cache(path):
+    if not path.exists():
+        return None
+    if STAC_CACHE_TTL_HOURS is not None and time.time() - path.stat().st_mtime > STAC_CACHE_TTL_HOURS * 3600:
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print(f"   ⚠️ Cache STAC ilegível ({path.name}): {e}")
+        return None
+
+def _write_stac_cache(path, item_dicts):
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(item_dicts, f)
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"   ⚠️ Não foi possível gravar o cache STAC: {e}")
+
+def _search_collection(collection, bounds, datetime_range, max_cloud, use_cache):
+    """
+    Busca uma coleção com o filtro de nuvens aplicado no servidor (CQL2) e
+    apenas os campos necessários (fields). Retorna dicts de itens NÃO assinados
+    """
+    cache_path = _stac_cache_path(collection, bounds, datetime_range, max_cloud)
+    if use_cache:
+        cached = _read_stac_cache(cache_path)
+        if cached is not None:
+            print(f"   💾 {collection}: {len(cached)} itens (cache)")
+            return cached
+
+    search = get_stac_catalog().search(
+        collections=[collection],
+        bbox=list(bounds),
+        datetime=datetime_range,
+        filter={"op": "<", "args": [{"property": "eo:cloud_cover"}, max_cloud]},
+        filter_lang="cql2-json",
+        fields=STAC_SEARCH_FIELDS
+    )
+    item_dicts = list(search.items_as_dicts())
+    print(f"   🛰️ {collection}: {len(item_dicts)} itens com nuvens < {max_cloud}%")
+    _write_stac_cache(cache_path, item_dicts)
+    return item_dicts
+
+def search_hls_data(bounds, start_date, end_date, max_cloud=50, use_cache=True):
+    """
+    Busca dados HLS via Microsoft Planetary Computer STAC API
+
+    Retorna a lista de itens ([] quando a busca funcionou e não há cenas) ou None
+    quando a busca falhou, para a falha não ser confundida com ausência de dados.
+    As coleções são consultadas em paralelo, com o filtro de nuvens no servidor, e
+    cada busca fica em cache em disco (bbox, período, filtro). As URLs dos assets
+    são assinadas só depois da leitura, então o cache não guarda tokens expirados.
+    """
     
     print(f"🔍 Buscando dados HLS...")
     print(f"   📅 Período: {start_date} a {end_date}")
     print(f"   ☁️ Máx. nuvens: {max_cloud}%")
     print(f"   📍 Bounds: {bounds}")
 
-    try:
-        # Conectar ao catálogo STAC do Microsoft Planetary Computer
-        print("🌐 Conectando ao Microsoft Planetary Computer...")
-        catalog = pystac_client.Client.open(
-            "https://planetarycomputer.microsoft.com/api/stac/v1",
-            modifier=pc.sign_inplace
-        )
-        print("✅ Conexão estabelecida com Microsoft Planetary Computer")
-
-        # Verificar coleções HLS disponíveis
-        print("📋 Verificando coleções HLS no Microsoft Planetary Computer...")
-        available_collections = []
-
-        for collection_id in HLS_COLLECTIONS:
-            try:
-                collection = catalog.get_collection(collection_id)
-                available_collections.append(collection_id)
-                print(f"   ✅ {collection_id}: Disponível")
-            except Exception as e:
-                print(f"   ❌ {collection_id}: Não disponível ({e})")
-
-        if not available_collections:
-            print("❌ Nenhuma coleção HLS disponível!")
-            return None
-
-        # Buscar itens HLS
-        all_items = []
-
-        for collection in available_collections:
-            print(f"\n🛰️ Buscando coleção: {collection}")
-
-            try:
-                # Busca inicial sem filtro de nuvens
-                print("   🔍 Busca inicial (sem filtro de nuvens)...")
-                search_initial = catalog.search(
-                    collections=[collection],
-                    bbox=bounds,
-                    datetime=f"{start_date}/{end_date}"
-                )
-
-                initial_items = list(search_initial.items())
-                print(f"   📊 Total de itens no período: {len(initial_items)}")
+    datetime_range = f"{start_date}/{end_date}"
 
-                if len(initial_items) == 0:
-                    print("   ⚠️ Nenhum item encontrado no período especificado")
-                    continue
-
-                # Aplicar filtro de nuvens
-                print(f"   ☁️ Aplicando filtro de nuvens (< {max_cloud}%)...")
-                filtered_items = []
-
-                for item in initial_items:
-                    cloud_cover = item.properties.get("eo:cloud_cover", 100)
-                    if cloud_cover < max_cloud:
-                        filtered_items.append(item)
+    def search(collection):
+        try:
+            return _search_collection(collection, bounds, datetime_range, max_cloud, use_cache)
+        except Exception as e:
+            print(f"   ❌ Erro na busca {collection}: {e}")
+            return None
 
-                print(f"   ✅ Itens após filtro: {len(filtered_items)}")
-                all_items.extend(filtered_items)
+    try:
+        workers = max(1, min(STAC_SEARCH_WORKERS, len(HLS_COLLECTIONS)))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(search, HLS_COLLECTIONS))
 
-            except Exception as e:
-                print(f"   ❌ Erro na busca {collection}: {e}")
-                continue
+        all_items = [pc.sign(pystac.Item.from_dict(d)) for item_dicts in results if item_dicts for d in item_dicts]
 
         if not all_items:
+            if any(item_dicts is None for item_dicts in results):
+                # Coleção sem resposta: não dá para afirmar que não há cenas
+                print("\n❌ DIAGNÓSTICO: Busca HLS falhou e nenhum item foi obtido")
+                return None
             print("\n❌ DIAGNÓSTICO: Nenhum item HLS encontrado!")
-            return None
+            return []
 
         # Ordenar por cobertura de nuvens
         all_items.sort(key=lambda x: x.properties.get("eo:cloud_cover", 100))
@@ -346,7 +441,7 @@ def select_best_item(items, max_items=3):
     if not items:
         return None
 
-    print(f"\n🎯 Selecionando melhores itens (máx: {max_items})...")
+    print(f"\n🎯 Selecionando melhores itens (máx: {max_items or 'todos'})...")
 
     # Filtrar e ordenar
     filtered_items = []
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+"""
+HLS Batch - Análise de mata ciliar para vários municípios
+Distribui os municípios entre processos, cada um com a sua pasta de saída,
+compartilhando os caches em disco (busca STAC, Nominatim/OSM e janelas de
+raster). O progresso fica em um checkpoint: uma execução interrompida retoma
+a partir dos municípios que ainda não terminaram.
+
+Uso:
+    python hls_batch.py "Sinimbu, RS" "Venâncio Aires, RS" [--workers 2]
+    python hls_batch.py --file municipios.txt [--output-dir batch_output] [--no-resume]
+
+Ou como API:
+    from hls_analysis.hls_batch import run_batch
+    run_batch(["Sinimbu, RS", "Vale do Sol, RS"], output_dir="batch_output")
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import re
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+# Importar configurações centralizadas
+try:
+    from .config_hls import get_config
+    from .hls_ndvi_processing import configure_raster_cache
+except ImportError:
+    from config_hls import get_config
+    from hls_ndvi_processing import configure_raster_cache
+
+# Carregar configurações centralizadas
+config = get_config()
+
+BATCH_WORKERS = config['batch']['workers']
+BATCH_OUTPUT_DIR = config['batch']['output_dir']
+BATCH_SCENE_EXECUTOR = config['batch']['scene_executor']
+RASTER_CACHE_DIR = config['io']['raster_cache_dir']
+
+CHECKPOINT_FILENAME = "batch_checkpoint.json"
+RUN_LOG_FILENAME = "batch_run.log"
+
+
+def region_slug(region):
+    """'Venâncio Aires, RS' -> 'venancio_aires_rs' (nome da pasta de saída)"""
+    ascii_name = unicodedata.normalize("NFKD", region).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "_", ascii_name.lower()).strip("_") or "regiao"
+
+
+class BatchCheckpoint:
+    """Estado por município em JSON, regravado atomicamente a cada conclusão"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.regions = {}
+        if self.path.exists():
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.regions = json.load(f).get("regions", {})
+
+    def is_done(self, region, retry_failed=True):
+        status = self.regions.get(region, {}).get("status")
+        return status in (("done", "no_data") if retry_failed else ("done", "no_data", "failed"))
+
+    def record(self, summary):
+        entry = dict(summary)
+        entry["finished_at"] = datetime.now().isoformat(timespec="seconds")
+        self.regions[summary["region"]] = entry
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"regions": self.regions}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+def _init_worker(raster_cache_dir):
+    """Inicializador dos processos: todos usam o mesmo cache de janelas de raster"""
+    configure_raster_cache(raster_cache_dir)
+
+
+def _warm_geocoding(regions):
+    """
+    Geocodifica os municípios no processo principal, em sequência, respeitando o
+    limite do Nominatim; os workers encontram as respostas no cache em disco
+    """
+    try:
+        from .hls_analysis import get_nominatim_client
+    except ImportError:
+        from hls_analysis import get_nominatim_client
+
+    client = get_nominatim_client()
+    for region in regions:
+        try:
+            client.geocode_sync(region)
+        except Exception as e:
+            print(f"   ⚠️ Geocodificação prévia falhou para {region}: {e}")
+
+
+def _run_region(region, output_dir, scene_executor):
+    """Executa a análise completa de um município (no processo do worker), com log próprio"""
+    try:
+        from .hls_complete_analysis import main
+    except ImportError:
+        from hls_complete_analysis import main
+
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, RUN_LOG_FILENAME), "a", encoding="utf-8") as log, \
+            contextlib.redirect_stdout(log):
+        print(f"\n===== {datetime.now().isoformat(timespec='seconds')} | {region} =====")
+        try:
+            summary = main(region=region, output_dir=output_dir, scene_executor=scene_executor, local_fallbacks=False)
+        except Exception as e:
+            print(f"❌ Erro na análise de {region}: {e}")
+            summary = {'region': region, 'output_dir': output_dir, 'status': 'failed', 'error': str(e)}
+    return summary
+
+
+def run_batch(regions, output_dir=None, workers=None, resume=True, retry_failed=True, scene_executor=None):
+    """
+    Analisa vários municípios em paralelo
+
+    Args:
+        regions: Nomes dos municípios (ex.: 'Sinimbu, Rio Grande do Sul, Brasil')
+        output_dir: Pasta raiz; cada município grava em <output_dir>/<slug> (padrão: configuração)
+        workers: Municípios simultâneos (padrão: configuração)
+        resume: Pula municípios já concluídos no checkpoint
+        retry_failed: Ao retomar, executa de novo os municípios que falharam
+        scene_executor: Executor das cenas dentro de cada worker (padrão: configuração)
+
+    Returns:
+        dict: município -> resumo (status 'done' | 'no_data' | 'failed', arquivos, pontos)
+    """
+    output_root = Path(output_dir or BATCH_OUTPUT_DIR)
+    output_root.mkdir(parents=True, exist_ok=True)
+    checkpoint_path = output_root / CHECKPOINT_FILENAME
+    if not resume and checkpoint_path.exists():
+        checkpoint_path.unlink()
+    checkpoint = BatchCheckpoint(checkpoint_path)
+
+    regions = list(dict.fromkeys(r.strip() for r in regions if r and r.strip()))
+    pending = [r for r in regions if not checkpoint.is_done(r, retry_failed)]
+    raster_cache_dir = RASTER_CACHE_DIR or output_root / "cache" / "rasters"
+    scene_executor = scene_executor or BATCH_SCENE_EXECUTOR
+    workers = max(1, min(workers or BATCH_WORKERS, len(pending) or 1))
+
+    print(f"🗂️ Lote HLS: {len(regions)} municípios, {len(regions) - len(pending)} já concluídos, {len(pending)} pendentes")
+    print(f"   📁 Saída: {output_root}")
+    print(f"   ⚙️ Workers: {workers} | cenas: {scene_executor} | cache de raster: {raster_cache_dir}")
+
+    def finished(summary, done):
+        checkpoint.record(summary)
+        icon = {"done": "✅", "no_data": "⚠️"}.get(summary["status"], "❌")
+        print(f"   {icon} [{done}/{len(pending)}] {summary['region']}: {summary['status']}"
+              + (f" ({summary['error']})" if summary.get('error') else ""))
+
+    if pending:
+        print("   🌍 Geocodificando municípios (cache compartilhado do Nominatim)...")
+        _warm_geocoding(pending)
+
+    jobs = {region: str(output_root / region_slug(region)) for region in pending}
+    if workers == 1:
+        _init_worker(raster_cache_dir)
+        for done, region in enumerate(pending, start=1):
+            finished(_run_region(region, jobs[region], scene_executor), done)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(raster_cache_dir,)) as pool:
+            futures = {
+                pool.submit(_run_region, region, region_dir, scene_executor): region
+                for region, region_dir in jobs.items()
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                region = futures[future]
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    # Worker morto (ex.: falta de memória): o município fica como falha e será retomado
+                    summary = {'region': region, 'output_dir': jobs[region], 'status': 'failed', 'error': str(e)}
+                finished(summary, done)
+
+    return {region: checkpoint.regions.get(region) for region in regions}
+
+
+def _read_regions_file(path):
+    """Um município por linha; linhas vazias e iniciadas por '#' são ignoradas"""
+    with open(path, "r", encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Análise HLS de mata ciliar para vários municípios")
+    parser.add_argument("regions", nargs="*", help="Municípios (ex.: 'Sinimbu, Rio Grande do Sul, Brasil')")
+    parser.add_argument("--file", "-f", help="Arquivo com um município por linha")
+    parser.add_argument("--output-dir", "-o", default=None, help=f"Pasta raiz de saída (padrão: {BATCH_OUTPUT_DIR})")
+    parser.add_argument("--workers", "-w", type=int, default=None, help=f"Municípios simultâneos (padrão: {BATCH_WORKERS})")
+    parser.add_argument("--scene-executor", choices=("serial", "process", "dask"), default=None,
+                        help=f"Executor das cenas em cada worker (padrão: {BATCH_SCENE_EXECUTOR})")
+    parser.add_argument("--no-resume", action="store_true", help="Ignora o checkpoint e processa tudo de novo")
+    parser.add_argument("--skip-failed", action="store_true", help="Ao retomar, não repete municípios que falharam")
+    args = parser.parse_args(argv)
+
+    regions = list(args.regions)
+    if args.file:
+        regions.extend(_read_regions_file(args.file))
+    if not regions:
+        parser.error("informe ao menos um município (argumentos ou --file)")
+
+    results = run_batch(
+        regions,
+        output_dir=args.output_dir,
+        workers=args.workers,
+        resume=not args.no_resume,
+        retry_failed=not args.skip_failed,
+        scene_executor=args.scene_executor
+    )
+
+    failed = [region for region, summary in results.items() if not summary or summary.get("status") == "failed"]
+    print(f"\n🎯 Lote finalizado: {len(results) - len(failed)} ok, {len(failed)} com falha")
+    for region in failed:
+        print(f"   ❌ {region}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -21,7 +21,8 @@ try:
         check_hls_coverage, load_aoi_data, search_hls_data, 
         select_best_item, convert_numpy_types
     )
-    from .hls_ndvi_processing import load_and_process_hls_data, create_ndvi_composite
+    from .hls_ndvi_processing import StreamingNDVICompositor
+    from .hls_parallel import iter_processed_scenes
     from .hls_degradation_analysis import (
         analyze_riparian_forest_degradation, load_river_geometry_for_buffer,
         generate_points_from_real_ndvi
@@ -37,7 +38,8 @@ except ImportError:
         check_hls_coverage, load_aoi_data, search_hls_data, 
         select_best_item, convert_numpy_types
     )
-    from hls_ndvi_processing import load_and_process_hls_data, create_ndvi_composite
+    from hls_ndvi_processing import StreamingNDVICompositor
+    from hls_parallel import iter_processed_scenes
     from hls_degradation_analysis import (
         analyze_riparian_forest_degradation, load_river_geometry_for_buffer,
         generate_points_from_real_ndvi
@@ -60,6 +62,7 @@ NDVI_CRITICAL_THRESHOLD = config['ndvi']['critical_threshold']
 NDVI_MODERATE_THRESHOLD = config['ndvi']['moderate_threshold']
 MIN_DISTANCE_POINTS = config['points']['min_distance']
 MAX_POINTS_PER_SEVERITY = config['points']['max_per_severity']
+MAX_SCENES = config['parallel']['max_scenes']
 BUFFER_DISTANCE_RIVER = config['degradation']['buffer_distance_river']
 
 def generate_unique_point_id(lat, lon, ndvi_value=None, timestamp=None):
@@ -155,15 +158,30 @@ def configure_region():
     print("=" * 40)
     return REGION_NAME
 
-def main():
-    """Função principal do script"""
+def main(region=None, output_dir=".", scene_executor=None, local_fallbacks=True):
+    """
+    Função principal do script
+
+    Args:
+        region: Município/região (padrão: REGION_NAME)
+        output_dir: Pasta dos arquivos gerados (padrão: pasta atual)
+        scene_executor: Executor das cenas ('process' | 'dask' | 'serial'; padrão: configuração)
+        local_fallbacks: Usa AOI/rio de arquivos locais quando a busca da região falha
+            (desligado no processamento em lote)
+
+    Returns:
+        dict: Resumo da execução (status: 'done' | 'no_data' | 'failed', arquivos, pontos).
+              'no_data' só quando a busca funcionou e não há cenas/pontos utilizáveis;
+              busca com erro ou todas as cenas com erro resultam em 'failed'
+    """
     print("🚀 Iniciando HLS Complete Analysis - Análise de Mata Ciliar")
     print("📡 Processamento de dados HLS (Harmonized Landsat Sentinel)")
     print("🌿 Foco: Detecção de degradação em mata ciliar")
     print("=" * 60)
     
     # Configurar região
-    region = configure_region()
+    region = region or configure_region()
+    summary = {'region': region, 'output_dir': output_dir, 'status': 'failed', 'files': [], 'critical_points': 0}
 
     # ETAPA 1: Carregamento da AOI
     print("\n📍 ETAPA 1: Carregamento da Área de Interesse")
@@ -172,7 +190,7 @@ def main():
     
     try:
         # Carregar AOI com filtro preciso por região
-        aoi_gdf, source_path = load_aoi_data(region_name=region)
+        aoi_gdf, source_path = load_aoi_data(region_name=region, allow_local_fallback=local_fallbacks)
         
         print(f"✅ AOI carregada: {source_path}")
         print(f"📊 Informações da AOI:")
@@ -222,7 +240,8 @@ def main():
 
     except Exception as e:
         print(f"❌ Erro ao carregar AOI: {e}")
-        return
+        summary['error'] = f"AOI: {e}"
+        return summary
 
     # ETAPA 2: Busca de dados HLS
     print("\n📡 ETAPA 2: Busca de Dados HLS")
@@ -231,9 +250,11 @@ def main():
     try:
         print("🚀 Iniciando busca HLS...")
         hls_items = search_hls_data(bounds, START_DATE, END_DATE, CLOUD_COVERAGE_MAX)
+        # None = a busca falhou; [] = a busca funcionou e não há cenas
+        search_failed = hls_items is None
 
         if hls_items and len(hls_items) > 0:
-            selected_hls_items = select_best_item(hls_items, max_items=3)
+            selected_hls_items = select_best_item(hls_items, max_items=MAX_SCENES)
             print(f"\n✅ {len(selected_hls_items)} itens HLS selecionados para processamento")
         else:
             print("\n❌ FALHA TOTAL: Nenhum item HLS encontrado")
@@ -242,37 +263,37 @@ def main():
     except Exception as e:
         print(f"❌ Erro crítico na busca HLS: {e}")
         selected_hls_items = None
+        search_failed = True
 
     # ETAPA 3: Processamento NDVI
     print("\n🌿 ETAPA 3: Processamento NDVI")
     print("-" * 50)
     
-    processed_hls_data = []
+    final_ndvi_data = None
+    failed_scenes = []
     
     if selected_hls_items:
-        print("🚀 Processando itens HLS selecionados...")
-
-        for i, item in enumerate(selected_hls_items):
-            print(f"\n📊 Processando item {i+1}/{len(selected_hls_items)}...")
+        print("🚀 Processando itens HLS selecionados em paralelo...")
 
-            processed_data = load_and_process_hls_data(item, bounds)
+        # Cada cena entra na composição assim que termina
+        compositor = StreamingNDVICompositor()
+        for done, (i, item, processed_data) in enumerate(iter_processed_scenes(selected_hls_items, bounds, executor=scene_executor, failed=failed_scenes), start=1):
+            print(f"\n📊 Item {i+1}/{len(selected_hls_items)} finalizado ({done}/{len(selected_hls_items)}): {item.id}")
 
             if processed_data:
-                processed_hls_data.append(processed_data)
+                compositor.add(processed_data)
                 print("   ✅ Processamento concluído")
             else:
                 print("   ❌ Processamento falhou")
 
         # Criar composição final
-        if processed_hls_data:
-            final_ndvi_data = create_ndvi_composite(processed_hls_data)
-            print(f"\n✅ Processamento NDVI concluído com {len(processed_hls_data)} itens")
+        if len(compositor):
+            final_ndvi_data = compositor.result()
+            print(f"\n✅ Processamento NDVI concluído com {len(compositor)} itens")
         else:
             print("\n❌ Nenhum item HLS processado com sucesso")
-            final_ndvi_data = None
     else:
         print("❌ Nenhum item HLS disponível para processamento")
-        final_ndvi_data = None
 
     # ETAPA 4: Análise de Degradação
     print("\n🌊 ETAPA 4: Análise de Degradação da Mata Ciliar")
@@ -303,7 +324,7 @@ def main():
         print("🚀 Iniciando geração de pontos críticos...")
 
         # Carregar geometria do rio
-        river_gdf, river_buffer_geom = load_river_geometry_for_buffer()
+        river_gdf, river_buffer_geom = load_river_geometry_for_buffer() if local_fallbacks else (None, None)
         
         if river_buffer_geom is None:
             print("⚠️ Usando buffer da análise de degradação como fallback")
@@ -341,11 +362,11 @@ def main():
         print("🚀 Iniciando exportação de resultados...")
 
         # Garantir diretório de saída
-        if ensure_output_directory("."):
+        if ensure_output_directory(output_dir):
             # Caminhos de saída (usando configurações centralizadas)
-            geojson_path = config['export']['geojson_filename']
-            geotiff_path = config['export']['geotiff_filename']
-            log_path = config['export']['log_filename']
+            geojson_path = os.path.join(output_dir, config['export']['geojson_filename'])
+            geotiff_path = os.path.join(output_dir, config['export']['geotiff_filename'])
+            log_path = os.path.join(output_dir, config['export']['log_filename'])
 
             print(f"📍 Caminhos de saída:")
             print(f"   📄 GeoJSON: {geojson_path}")
@@ -406,8 +427,12 @@ def main():
             else:
                 print(f"   ❌ {log_path} NÃO ENCONTRADO")
 
+            summary['files'] = files_created
+            summary['critical_points'] = int(critical_points_data['total_points'])
+            summary['status'] = 'done' if files_created else 'failed'
+
             if files_created:
-                print(f"\n📁 Arquivos criados na pasta atual:")
+                print(f"\n📁 Arquivos criados em {output_dir}:")
                 for file_path in files_created:
                     print(f"   📄 {file_path}")
 
@@ -425,6 +450,14 @@ def main():
     else:
         print("❌ Dados insuficientes para exportação")
         print("   Verifique se todas as etapas anteriores foram executadas com sucesso")
+        if search_failed:
+            # Falha transitória (STAC indisponível, rede): o lote tenta de novo
+            summary['error'] = "busca HLS falhou"
+        elif selected_hls_items and len(failed_scenes) == len(selected_hls_items):
+            summary['error'] = f"todas as {len(failed_scenes)} cenas falharam no processamento"
+        else:
+            # Busca sem cenas ou cenas sem pixels válidos/pontos: resultado válido, não é falha
+            summary['status'] = 'no_data'
 
     print("\n🎯 Script HLS Complete Analysis finalizado!")
     print("📋 INSTRUÇÕES DE USO:")
@@ -454,5 +487,7 @@ def main():
     print("- Mesmo local geográfico sempre terá o mesmo ID")
     print("- Ideal para acompanhamento temporal e comparação de NDVI")
 
+    return summary
+
 if __name__ == "__main__":
     main()
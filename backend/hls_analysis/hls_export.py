@@ -302,6 +302,8 @@ def create_processing_log(critical_points_data, degradation_analysis, final_ndvi
         # Dados HLS processados
         if final_ndvi_data and 'source_items' in final_ndvi_data:
             log_content.append("\n🛰️ DADOS HLS PROCESSADOS:")
+            if 'method' in final_ndvi_data:
+                log_content.append(f"  Composição: {final_ndvi_data['method']} ({len(final_ndvi_data['source_items'])} cenas)")
             for i, item_data in enumerate(final_ndvi_data['source_items']):
                 item = item_data['item']
                 stats = item_data['stats']
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+HLS Fmask - Decodificação bit a bit da banda Fmask (HLS v2)
+A Fmask é um byte com flags empacotadas (cirrus, nuvem, adjacente, sombra,
+neve/gelo, água, nível de aerossol). Como só existem 256 valores possíveis,
+a política de mascaramento vira uma tabela de 256 entradas: a máscara de um
+bloco é um único acesso indexado e as contagens por motivo saem de um único
+bincount sobre o histograma da banda.
+"""
+
+import numpy as np
+
+# Importar configurações centralizadas
+try:
+    from .config_hls import get_config
+except ImportError:
+    from config_hls import get_config
+
+# Carregar configurações centralizadas
+config = get_config()
+
+FMASK_MASKED_CONDITIONS = config['fmask']['masked_conditions']
+FMASK_MAX_AEROSOL = config['fmask']['max_aerosol']
+
+# Bits da Fmask HLS v2 (guia do usuário HLS v2.0, tabela 9)
+FMASK_BITS = {
+    'cirrus': 0,      # reservado, não usado no HLS v2
+    'cloud': 1,
+    'adjacent': 2,    # adjacente a nuvem/sombra
+    'shadow': 3,
+    'snow_ice': 4,
+    'water': 5,
+}
+
+# Bits 6-7: nível de aerossol
+AEROSOL_LEVELS = ('climatology', 'low', 'moderate', 'high')
+
+# Valor de preenchimento (sem dado); NaN e valores fora de 0..255 também caem aqui
+FMASK_FILL = 255
+
+# Motivos de exclusão, em ordem de prioridade (um pixel conta só no primeiro motivo)
+FMASK_REASONS = ('clear', 'fill', 'cirrus', 'cloud', 'adjacent', 'shadow', 'snow_ice', 'water', 'aerosol')
+
+
+def build_fmask_lut(masked_conditions=None, max_aerosol=None):
+    """
+    Monta as tabelas de 256 entradas da política de mascaramento
+
+    Args:
+        masked_conditions: Flags que excluem o pixel (nomes de FMASK_BITS; padrão: configuração)
+        max_aerosol: Maior nível de aerossol aceito (AEROSOL_LEVELS; padrão: configuração)
+
+    Returns:
+        (valid_lut, reason_lut): máscara booleana e índice do motivo (FMASK_REASONS) por valor
+    """
+    masked_conditions = FMASK_MASKED_CONDITIONS if masked_conditions is None else masked_conditions
+    max_aerosol = max_aerosol or FMASK_MAX_AEROSOL
+
+    unknown = set(masked_conditions) - set(FMASK_BITS)
+    if unknown:
+        raise ValueError(f"Condições Fmask desconhecidas: {sorted(unknown)}")
+    if max_aerosol not in AEROSOL_LEVELS:
+        raise ValueError(f"Nível de aerossol inválido: {max_aerosol}")
+
+    values = np.arange(256, dtype=np.uint16)
+    reason_lut = np.zeros(256, dtype=np.uint8)
+    decided = np.zeros(256, dtype=bool)
+
+    def assign(reason, hit):
+        hit = hit & ~decided
+        reason_lut[hit] = FMASK_REASONS.index(reason)
+        decided[hit] = True
+
+    assign('fill', values == FMASK_FILL)
+    for condition in FMASK_BITS:
+        if condition in masked_conditions:
+            assign(condition, ((values >> FMASK_BITS[condition]) & 1) == 1)
+    assign('aerosol', (values >> 6) > AEROSOL_LEVELS.index(max_aerosol))
+
+    return reason_lut == 0, reason_lut
+
+
+def fmask_index(qa_values):
+    """Valores QA como índices 0..255 para as tabelas (NaN/fora do intervalo -> preenchimento)"""
+    if qa_values.dtype == np.uint8:
+        return qa_values
+    in_range = (qa_values >= 0) & (qa_values < 256)
+    return np.where(in_range, qa_values, FMASK_FILL).astype(np.uint8)
+
+
+def fmask_reason_counts(qa_hist, reason_lut):
+    """Pixels por motivo de exclusão a partir do histograma QA de 256 posições"""
+    counts = np.bincount(reason_lut, weights=qa_hist, minlength=len(FMASK_REASONS))
+    return {reason: int(count) for reason, count in zip(FMASK_REASONS, counts)}
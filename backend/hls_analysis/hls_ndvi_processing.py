@@ -4,18 +4,32 @@ HLS NDVI Processing - Processamento NDVI com Máscaras de Qualidade
 Funções para processamento de dados HLS e cálculo de NDVI
 """
 
+import hashlib
+import json
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
 import numpy as np
 import xarray as xr
 import rioxarray as rxr
 import rasterio
+from rasterio.crs import CRS
+from rasterio.enums import Resampling
+from rasterio.warp import transform_bounds
+from rasterio.windows import Window
 from pyproj import Transformer
 import planetary_computer as pc
 
 # Importar configurações centralizadas
 try:
     from .config_hls import get_config
+    from .hls_fmask import build_fmask_lut, fmask_index, fmask_reason_counts
 except ImportError:
     from config_hls import get_config
+    from hls_fmask import build_fmask_lut, fmask_index, fmask_reason_counts
 
 # Carregar configurações centralizadas
 config = get_config()
@@ -24,9 +38,227 @@ config = get_config()
 NDVI_CRITICAL_THRESHOLD = config['ndvi']['critical_threshold']
 NDVI_MODERATE_THRESHOLD = config['ndvi']['moderate_threshold']
 MIN_VALID_PIXELS = config['ndvi']['min_valid_pixels']
+BAND_READ_WORKERS = config['io']['band_read_workers']
+TARGET_RESOLUTION_M = config['io']['target_resolution_m']
+RASTER_CACHE_DIR = config['io']['raster_cache_dir']
+VERBOSE_DIAGNOSTICS = config['ndvi']['verbose_diagnostics']
+COMPOSITE_METHOD = config['composite']['method']
+COMPOSITE_MEDIAN_BINS = config['composite']['median_bins']
+COMPOSITE_CHUNK_ROWS = config['composite']['chunk_rows']
+
+# Linhas por bloco na passada única de NDVI/diagnósticos
+NDVI_CHUNK_ROWS = 512
+
+# Leitura de COGs remotos: só as requisições de intervalo necessárias, sem listar diretórios
+COG_READ_ENV = {
+    "GDAL_DISABLE_READDIR_ON_OPEN": "EMPTY_DIR",
+    "GDAL_HTTP_MERGE_CONSECUTIVE_RANGES": "YES",
+    "GDAL_HTTP_MULTIPLEX": "YES",
+    "CPL_VSIL_CURL_ALLOWED_EXTENSIONS": ".tif,.TIF,.tiff",
+    "VSI_CACHE": "TRUE",
+}
+
+
+def _aoi_window(src, aoi_bounds):
+    """Janela de pixels do COG que cobre a AOI (bounds WGS84), calculada pelo geotransform"""
+    left, bottom, right, top = transform_bounds("EPSG:4326", src.crs, *aoi_bounds, densify_pts=21)
+    inverse = ~src.transform
+    cols, rows = zip(*(inverse * (x, y) for x, y in ((left, top), (right, top), (left, bottom), (right, bottom))))
+    col_off = max(int(math.floor(min(cols))), 0)
+    row_off = max(int(math.floor(min(rows))), 0)
+    col_end = min(int(math.ceil(max(cols))), src.width)
+    row_end = min(int(math.ceil(max(rows))), src.height)
+    if col_end <= col_off or row_end <= row_off:
+        raise ValueError("AOI fora da área coberta pela cena")
+    return Window(col_off, row_off, col_end - col_off, row_end - row_off)
+
+
+def _overview_factor(src, target_resolution):
+    """Maior nível de overview cuja resolução não ultrapassa a resolução pedida"""
+    if not target_resolution:
+        return 1
+    native_resolution = abs(src.res[0])
+    factor = 1
+    for level in src.overviews(1):
+        if native_resolution * level <= target_resolution:
+            factor = max(factor, level)
+    return factor
+
+
+def _raster_cache_path(band_url, aoi_bounds, target_resolution):
+    """Chave da janela: URL sem o token SAS (a assinatura muda a cada busca), bounds e resolução"""
+    key = json.dumps({
+        "url": band_url.split("?", 1)[0],
+        "bounds": [round(float(v), 6) for v in aoi_bounds],
+        "resolution": target_resolution
+    }, sort_keys=True)
+    return Path(RASTER_CACHE_DIR) / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.npz"
+
+
+def configure_raster_cache(cache_dir):
+    """Ativa (ou desativa, com None) o cache em disco das janelas lidas, compartilhável entre processos"""
+    global RASTER_CACHE_DIR
+    RASTER_CACHE_DIR = str(cache_dir) if cache_dir else None
+
+
+def _read_window_array(band_url, aoi_bounds, target_resolution):
+    """Lê a janela da AOI: (dados, transform, crs, nodata, fator de overview)"""
+    with rasterio.Env(**COG_READ_ENV):
+        with rasterio.open(band_url) as src:
+            window = _aoi_window(src, aoi_bounds)
+            factor = _overview_factor(src, target_resolution)
+            out_shape = (
+                max(int(math.ceil(window.height / factor)), 1),
+                max(int(math.ceil(window.width / factor)), 1),
+            )
+            # Com out_shape reduzido o GDAL lê direto do overview correspondente
+            data = src.read(1, window=window, out_shape=out_shape, resampling=Resampling.nearest)
+            transform = src.window_transform(window) * rasterio.Affine.scale(
+                window.width / out_shape[1], window.height / out_shape[0]
+            )
+            return data, transform, src.crs, src.nodata, factor
+
+
+def _cached_window_array(band_url, aoi_bounds, target_resolution):
+    """_read_window_array com cache em disco (RASTER_CACHE_DIR)"""
+    if not RASTER_CACHE_DIR:
+        return _read_window_array(band_url, aoi_bounds, target_resolution)
+
+    path = _raster_cache_path(band_url, aoi_bounds, target_resolution)
+    if path.exists():
+        try:
+            with np.load(path) as cached:
+                meta = json.loads(str(cached["meta"]))
+                return (
+                    cached["data"],
+                    rasterio.Affine(*meta["transform"]),
+                    CRS.from_wkt(meta["crs"]),
+                    meta["nodata"],
+                    meta["factor"]
+                )
+        except Exception as e:
+            print(f"   ⚠️ Cache de raster ilegível ({path.name}): {e}")
+
+    data, transform, crs, nodata, factor = _read_window_array(band_url, aoi_bounds, target_resolution)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"transform": list(transform)[:6], "crs": crs.to_wkt(), "nodata": nodata, "factor": factor}
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, data=data, meta=np.array(json.dumps(meta)))
+        os.replace(tmp, path)
+    except Exception as e:
+        print(f"   ⚠️ Não foi possível gravar o cache de raster: {e}")
+    return data, transform, crs, nodata, factor
+
+
+def read_band_window(band_url, aoi_bounds, target_resolution=None):
+    """Lê apenas a janela da AOI de uma banda COG (usando overview se a resolução permitir)"""
+    data, transform, crs, nodata, factor = _cached_window_array(band_url, aoi_bounds, target_resolution)
+    out_shape = data.shape
+
+    # Coordenadas dos centros dos pixels, como no rioxarray
+    xs = transform.c + transform.a * (np.arange(out_shape[1]) + 0.5)
+    ys = transform.f + transform.e * (np.arange(out_shape[0]) + 0.5)
+    band_data = xr.DataArray(data, dims=("y", "x"), coords={"y": ys, "x": xs})
+    band_data = band_data.rio.write_crs(crs).rio.write_transform(transform)
+    if nodata is not None:
+        band_data = band_data.rio.write_nodata(nodata)
+    return band_data, factor
+
+def _merge_stats(acc, values):
+    """Combina estatísticas de um bloco (contagem, média, M2 de Chan et al., min, max)"""
+    n = values.size
+    if n == 0:
+        return
+    mean = float(values.mean())
+    m2 = float(((values - mean) ** 2).sum())
+    total = acc['count'] + n
+    delta = mean - acc['mean']
+    acc['m2'] += m2 + delta * delta * acc['count'] * n / total
+    acc['mean'] += delta * n / total
+    acc['count'] = total
+    acc['min'] = min(acc['min'], float(values.min()))
+    acc['max'] = max(acc['max'], float(values.max()))
+
+
+def fused_ndvi_pass(red_values, nir_values, qa_values, valid_lut, verbose=False, chunk_rows=NDVI_CHUNK_ROWS):
+    """
+    Percorre as bandas uma única vez, em blocos de linhas, e calcula:
+    máximos de red/NIR (detecção de escala), histograma QA, máscara Fmask
+    (um acesso à tabela por bloco), contagens das máscaras, NDVI e estatísticas
+    """
+    rows = red_values.shape[0]
+    ndvi = np.full(red_values.shape, np.nan, dtype=np.float64)
+    valid_mask = np.zeros(qa_values.shape, dtype=bool)
+    qa_hist = np.zeros(256, dtype=np.int64)
+    red_max = nir_max = -np.inf
+    counts = {'denom_ok': 0, 'red_ok': 0, 'nir_ok': 0, 'red_positive': 0, 'nir_positive': 0}
+    acc = {'count': 0, 'mean': 0.0, 'm2': 0.0, 'min': np.inf, 'max': -np.inf}
+
+    for start in range(0, rows, chunk_rows):
+        block = slice(start, start + chunk_rows)
+        red_b = red_values[block].astype(np.float64, copy=False)
+        nir_b = nir_values[block].astype(np.float64, copy=False)
+        qa_b = fmask_index(qa_values[block])
+
+        red_finite = np.isfinite(red_b)
+        nir_finite = np.isfinite(nir_b)
+        if red_finite.any():
+            red_max = max(red_max, float(red_b[red_finite].max()))
+        if nir_finite.any():
+            nir_max = max(nir_max, float(nir_b[nir_finite].max()))
+
+        qa_hist += np.bincount(qa_b.ravel(), minlength=256)
+        clear = valid_lut[qa_b]
+        valid_mask[block] = clear
+
+        denominator = nir_b + red_b
+        denom_ok = denominator != 0
+        red_ok = (red_b >= 0) & red_finite
+        nir_ok = (nir_b >= 0) & nir_finite
+        valid = denom_ok & red_ok & nir_ok & clear
+
+        counts['denom_ok'] += int(np.count_nonzero(denom_ok))
+        counts['red_ok'] += int(np.count_nonzero(red_ok))
+        counts['nir_ok'] += int(np.count_nonzero(nir_ok))
+        if verbose:
+            counts['red_positive'] += int(np.count_nonzero(red_finite & (red_b > 0)))
+            counts['nir_positive'] += int(np.count_nonzero(nir_finite & (nir_b > 0)))
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ndvi_b = np.where(valid, (nir_b - red_b) / denominator, np.nan)
+        ndvi[block] = ndvi_b
+        _merge_stats(acc, ndvi_b[valid])
+
+    empty = acc['count'] == 0
+    return {
+        'ndvi': ndvi,
+        'valid_mask': valid_mask,
+        'red_max': float(red_max) if np.isfinite(red_max) else float('nan'),
+        'nir_max': float(nir_max) if np.isfinite(nir_max) else float('nan'),
+        'qa_hist': qa_hist,
+        'stats': {
+            'count': acc['count'],
+            'min': float('nan') if empty else acc['min'],
+            'max': float('nan') if empty else acc['max'],
+            'mean': float('nan') if empty else acc['mean'],
+            'std': float('nan') if empty else float(np.sqrt(acc['m2'] / acc['count'])),
+        },
+        **counts,
+    }
+
+
+def load_and_process_hls_data(item, aoi_bounds, verbose=None, raise_errors=False):
+    """
+    Carrega e processa dados HLS para cálculo NDVI (verbose=None usa a configuração)
+
+    Retorna None quando a cena não tem pixels válidos suficientes; erros de leitura
+    ou processamento também retornam None, ou são propagados com raise_errors=True
+    """
 
-def load_and_process_hls_data(item, aoi_bounds):
-    """Carrega e processa dados HLS para cálculo NDVI"""
+    if verbose is None:
+        verbose = VERBOSE_DIAGNOSTICS
     
     print(f"📥 Processando item: {item.collection_id}")
     print(f"   📅 Data: {item.properties.get('datetime', 'N/A')[:10]}")
@@ -77,53 +309,37 @@ def load_and_process_hls_data(item, aoi_bounds):
 
         print(f"   🗺️ CRS detectado: {hls_crs}")
 
-        # Carregar bandas individualmente
-        print("   🔄 Carregando bandas individualmente...")
+        # Carregar as bandas em paralelo, lendo só a janela da AOI de cada COG
+        print(f"   🔄 Carregando bandas em paralelo (janela da AOI, {BAND_READ_WORKERS} leituras simultâneas)...")
         band_arrays = {}
 
-        for band in bands_to_load:
-            print(f"      📊 Carregando banda {band}...")
-
+        def load_band(band):
             # Obter URL da banda
-            band_asset = item.assets[band]
-            band_url = band_asset.href
+            band_url = item.assets[band].href
 
             # Assinar URL se necessário (Microsoft Planetary Computer)
             if 'planetarycomputer' in band_url:
                 band_url = pc.sign(band_url)
 
-            # Carregar com rioxarray
-            try:
-                band_data = rxr.open_rasterio(
-                    band_url,
-                    chunks={'x': 512, 'y': 512}  # Chunking para performance
-                )
-
-                # CORREÇÃO: Forçar reprojeção para o CRS correto se necessário
-                if str(band_data.rio.crs) != hls_crs:
-                    print(f"      🔄 Reprojetando {band} de {band_data.rio.crs} para {hls_crs}")
-                    band_data = band_data.rio.reproject(hls_crs)
-                    print(f"      ✅ {band} reprojetado para {hls_crs}")
-
-                # Reprojetar para bounds se necessário
-                if str(band_data.rio.crs) != "EPSG:4326":
-                    # Reprojetar bounds para CRS da banda
-                    transformer = Transformer.from_crs("EPSG:4326", band_data.rio.crs, always_xy=True)
-                    minx_proj, miny_proj = transformer.transform(aoi_bounds[0], aoi_bounds[1])
-                    maxx_proj, maxy_proj = transformer.transform(aoi_bounds[2], aoi_bounds[3])
-
-                    # Recortar para AOI
-                    band_data = band_data.rio.clip_box(minx_proj, miny_proj, maxx_proj, maxy_proj)
-                else:
-                    # Recortar diretamente
-                    band_data = band_data.rio.clip_box(*aoi_bounds)
-
-                band_arrays[band] = band_data.squeeze()
-                print(f"      ✅ {band}: {band_data.shape}")
-
-            except Exception as band_error:
-                print(f"      ❌ Erro ao carregar {band}: {band_error}")
-                raise band_error
+            band_data, factor = read_band_window(band_url, aoi_bounds, TARGET_RESOLUTION_M)
+
+            # CORREÇÃO: Forçar reprojeção para o CRS correto se necessário
+            if str(band_data.rio.crs) != hls_crs:
+                print(f"      🔄 Reprojetando {band} de {band_data.rio.crs} para {hls_crs}")
+                band_data = band_data.rio.reproject(hls_crs)
+            return band_data, factor
+
+        with ThreadPoolExecutor(max_workers=BAND_READ_WORKERS) as executor:
+            futures = {band: executor.submit(load_band, band) for band in bands_to_load}
+            for band, future in futures.items():
+                try:
+                    band_data, factor = future.result()
+                except Exception as band_error:
+                    print(f"      ❌ Erro ao carregar {band}: {band_error}")
+                    raise band_error
+                band_arrays[band] = band_data
+                overview_note = f" (overview 1/{factor})" if factor > 1 else ""
+                print(f"      ✅ {band}: {band_data.shape}{overview_note}")
 
         # Verificar se todas as bandas foram carregadas
         if len(band_arrays) != len(bands_to_load):
@@ -135,119 +351,67 @@ def load_and_process_hls_data(item, aoi_bounds):
         qa = band_arrays[qa_band]
 
         print(f"   ✅ Todas as bandas carregadas com sucesso!")
-        print(f"   📐 Dimensões Red: {red.shape}")
-        print(f"   📐 Dimensões NIR: {nir.shape}")
-        print(f"   📐 Dimensões QA: {qa.shape}")
-        print(f"   🗺️ CRS: {red.rio.crs}")
-
-        # Aplicar escala HLS se necessário
-        red_max = float(np.nanmax(red.values))
-        nir_max = float(np.nanmax(nir.values))
-
+        if verbose:
+            print(f"   📐 Dimensões Red: {red.shape}")
+            print(f"   📐 Dimensões NIR: {nir.shape}")
+            print(f"   📐 Dimensões QA: {qa.shape}")
+            print(f"   🗺️ CRS: {red.rio.crs}")
+
+        # Uma única passada (em blocos) calcula escala, histograma QA, máscara Fmask,
+        # contagens das máscaras, NDVI e estatísticas
+        print("   🧮 Calculando NDVI e diagnósticos (passada única)...")
+        valid_lut, reason_lut = build_fmask_lut()
+        diag = fused_ndvi_pass(red.values, nir.values, qa.values, valid_lut, verbose=verbose)
+
+        red_max, nir_max = diag['red_max'], diag['nir_max']
         print(f"   📈 Valores máximos: Red={red_max:.3f}, NIR={nir_max:.3f}")
 
         # Se os valores estão acima de 1, aplicar escala (dados em 0-10000)
+        # O NDVI não depende da escala: só as bandas devolvidas são ajustadas
         if red_max > 1.5 or nir_max > 1.5:
             print("   🔢 Aplicando escala HLS (dividindo por 10000)...")
             red = red / 10000.0
             nir = nir / 10000.0
-
-            # Verificar valores após escala
-            red_scaled_max = float(np.nanmax(red.values))
-            nir_scaled_max = float(np.nanmax(nir.values))
-            print(f"   📊 Valores após escala: Red={red_scaled_max:.3f}, NIR={nir_scaled_max:.3f}")
+            if verbose:
+                print(f"   📊 Valores após escala: Red={red_max / 10000.0:.3f}, NIR={nir_max / 10000.0:.3f}")
         else:
             print("   ✅ Dados já estão em escala de reflectância (0-1)")
 
-        # Verificar se há valores válidos nas bandas
-        red_valid = np.sum(np.isfinite(red.values) & (red.values > 0))
-        nir_valid = np.sum(np.isfinite(nir.values) & (nir.values > 0))
-        print(f"   📊 Pixels com valores válidos: Red={red_valid}, NIR={nir_valid}")
-
-        # Aplicar máscara de qualidade (Fmask HLS)
-        print("   🎭 Aplicando máscara de qualidade...")
-
-        # Investigar os valores da máscara QA
-        qa_unique = np.unique(qa.values)
-        qa_counts = {val: int(np.sum(qa.values == val)) for val in qa_unique}
-        print(f"   📊 Valores únicos na máscara QA: {qa_unique}")
-        print(f"   📈 Contagem por valor: {qa_counts}")
-
-        # Máscara mais permissiva inicialmente para diagnóstico
-        valid_mask = (qa == 0) | (qa == 1) | (qa == 2)
-
-        # Se ainda não há pixels válidos, ser ainda mais permissivo
-        valid_pixels_count = int(np.sum(valid_mask.values))
-        print(f"   🔍 Pixels válidos com máscara padrão: {valid_pixels_count}")
-
-        if valid_pixels_count == 0:
-            print("   ⚠️ Nenhum pixel válido com máscara padrão, tentando máscara mais permissiva...")
-            valid_mask = (qa != 255) & (qa != 4)
-            valid_pixels_count = int(np.sum(valid_mask.values))
-            print(f"   🔍 Pixels válidos com máscara permissiva: {valid_pixels_count}")
-
-        if valid_pixels_count == 0:
-            print("   ⚠️ Ainda sem pixels válidos, usando todos os pixels para diagnóstico...")
-            valid_mask = qa >= 0  # Todos os pixels
-            valid_pixels_count = int(np.sum(valid_mask.values))
-            print(f"   🔍 Total de pixels: {valid_pixels_count}")
-
-        # Calcular NDVI
-        print("   🧮 Calculando NDVI...")
-        denominator = nir + red
-
-        # Criar máscara combinada de forma segura
-        print("   🎭 Criando máscara combinada...")
-
-        # Componentes da máscara
-        denom_ok = (denominator != 0)
-        red_ok = (red >= 0) & np.isfinite(red)
-        nir_ok = (nir >= 0) & np.isfinite(nir)
-
-        # Diagnósticos das máscaras
-        print(f"   📊 Diagnóstico das máscaras:")
-        print(f"      - Denominador OK: {int(np.sum(denom_ok.values))}")
-        print(f"      - Red OK: {int(np.sum(red_ok.values))}")
-        print(f"      - NIR OK: {int(np.sum(nir_ok.values))}")
-        print(f"      - QA válido: {valid_pixels_count}")
-
-        # Máscara combinada
-        combined_mask = denom_ok & valid_mask & red_ok & nir_ok
-        combined_valid = int(np.sum(combined_mask.values))
-        print(f"      - Máscara combinada: {combined_valid}")
-
-        # Calcular NDVI com máscara segura
-        ndvi = xr.where(
-            combined_mask,
-            (nir - red) / denominator,
-            np.nan
-        )
-
-        # Se ainda não há pixels válidos, tentar NDVI sem máscara QA
-        if combined_valid == 0:
-            print("   🔄 Tentando NDVI sem máscara de qualidade...")
-            simple_mask = denom_ok & red_ok & nir_ok
-            simple_valid = int(np.sum(simple_mask.values))
-            print(f"   📊 Pixels válidos sem QA: {simple_valid}")
-
-            if simple_valid > 0:
-                ndvi = xr.where(
-                    simple_mask,
-                    (nir - red) / denominator,
-                    np.nan
-                )
-                combined_valid = simple_valid
+        if verbose:
+            print(f"   📊 Pixels com valores válidos: Red={diag['red_positive']}, NIR={diag['nir_positive']}")
+            qa_counts = {value: int(count) for value, count in enumerate(diag['qa_hist']) if count}
+            print(f"   📊 Valores únicos na máscara QA: {np.array(sorted(qa_counts))}")
+            print(f"   📈 Contagem por valor: {qa_counts}")
+
+        # Máscara de qualidade (Fmask HLS, decodificada bit a bit)
+        reasons = fmask_reason_counts(diag['qa_hist'], reason_lut)
+        excluded = {reason: count for reason, count in reasons.items() if reason != 'clear' and count}
+        print(f"   🎭 Máscara Fmask: {reasons['clear']:,} pixels limpos")
+        if excluded:
+            print(f"   🚫 Excluídos por motivo: {excluded}")
+
+        if verbose:
+            print(f"   📊 Diagnóstico das máscaras:")
+            print(f"      - Denominador OK: {diag['denom_ok']}")
+            print(f"      - Red OK: {diag['red_ok']}")
+            print(f"      - NIR OK: {diag['nir_ok']}")
+            print(f"      - QA válido: {reasons['clear']}")
+            print(f"      - Máscara combinada: {diag['stats']['count']}")
+
+        valid_mask = xr.DataArray(diag['valid_mask'], coords=qa.coords, dims=qa.dims)
+        ndvi = xr.DataArray(diag['ndvi'], coords=red.coords, dims=red.dims)
 
         # Estatísticas
-        valid_pixels = np.sum(~np.isnan(ndvi.values))
+        stats = diag['stats']
+        valid_pixels = stats['count']
         total_pixels = ndvi.size
         valid_fraction = valid_pixels / total_pixels
 
         print(f"   📊 Estatísticas NDVI:")
         print(f"      - Pixels válidos: {valid_pixels:,} ({valid_fraction:.1%})")
-        print(f"      - NDVI min: {np.nanmin(ndvi.values):.3f}")
-        print(f"      - NDVI max: {np.nanmax(ndvi.values):.3f}")
-        print(f"      - NDVI médio: {np.nanmean(ndvi.values):.3f}")
+        print(f"      - NDVI min: {stats['min']:.3f}")
+        print(f"      - NDVI max: {stats['max']:.3f}")
+        print(f"      - NDVI médio: {stats['mean']:.3f}")
 
         # Critério mais flexível para áreas pequenas
         min_threshold = min(MIN_VALID_PIXELS, 0.01)  # Pelo menos 1% ou o mínimo configurado
@@ -271,10 +435,10 @@ def load_and_process_hls_data(item, aoi_bounds):
             'valid_fraction': valid_fraction,
             'item': item,
             'stats': {
-                'min': float(np.nanmin(ndvi.values)),
-                'max': float(np.nanmax(ndvi.values)),
-                'mean': float(np.nanmean(ndvi.values)),
-                'std': float(np.nanstd(ndvi.values)),
+                'min': stats['min'],
+                'max': stats['max'],
+                'mean': stats['mean'],
+                'std': stats['std'],
                 'valid_pixels': int(valid_pixels),
                 'total_pixels': int(total_pixels)
             }
@@ -282,48 +446,196 @@ def load_and_process_hls_data(item, aoi_bounds):
 
     except Exception as e:
         print(f"   ❌ Erro no processamento: {e}")
+        if raise_errors:
+            raise
         return None
 
-def create_ndvi_composite(processed_items):
-    """Cria composição NDVI a partir de múltiplos itens"""
-    
+def create_ndvi_composite(processed_items, method=None):
+    """Cria composição NDVI a partir de múltiplos itens (cena a cena, memória limitada)"""
+
     if not processed_items:
         return None
 
-    print(f"\n🎨 Criando composição NDVI de {len(processed_items)} itens...")
-
-    # Se apenas um item, retornar diretamente
-    if len(processed_items) == 1:
-        return processed_items[0]
-
-    # Múltiplos itens: criar composição baseada na qualidade
-    ndvi_arrays = []
-    weights = []
-
+    compositor = StreamingNDVICompositor(method)
     for item_data in processed_items:
-        ndvi_arrays.append(item_data['ndvi'])
-        # Peso baseado na fração de pixels válidos
-        weights.append(item_data['valid_fraction'])
+        compositor.add(item_data)
+    return compositor.result()
+
+
+COMPOSITE_METHODS = ('mean', 'max', 'median', 'best')
+
+
+def scene_score(item_data):
+    """Qualidade da cena para o melhor pixel: fração válida × fração sem nuvens"""
+    cloud_cover = item_data['item'].properties.get('eo:cloud_cover', 100) or 0
+    return item_data['valid_fraction'] * (1.0 - min(float(cloud_cover), 100.0) / 100.0)
+
+
+class StreamingNDVICompositor:
+    """
+    Composição temporal NDVI fora da memória: as cenas entram uma a uma (na ordem
+    em que terminam) e são dobradas bloco a bloco em acumuladores do tamanho de
+    UMA cena, independentemente do número de cenas
+
+    Métodos:
+        mean: média ponderada pela fração de pixels válidos
+        max: NDVI máximo por pixel
+        median: mediana aproximada por um histograma fixo por pixel (postos
+                interpolados dentro do bin; erro < largura do bin, 0.05 com 40 bins)
+        best: valor da cena de maior score (scene_score) em cada pixel
+    """
+
+    def __init__(self, method=None, median_bins=None, chunk_rows=None):
+        self.method = method or COMPOSITE_METHOD
+        if self.method not in COMPOSITE_METHODS:
+            raise ValueError(f"Método de composição inválido: {self.method} (use {', '.join(COMPOSITE_METHODS)})")
+        self.median_bins = median_bins or COMPOSITE_MEDIAN_BINS
+        self.chunk_rows = chunk_rows or COMPOSITE_CHUNK_ROWS
+        self.source_items = []
+        self._first = None
+        self._reference = None
+        self._state = None
+
+    def __len__(self):
+        return len(self.source_items)
+
+    def _align(self, ndvi):
+        """Leva a cena para a grade da primeira cena (mesmo CRS, transform e forma)"""
+        ref = self._reference
+        if ndvi.shape == ref.shape and ndvi.rio.crs == ref.rio.crs \
+                and np.allclose(ndvi.x.values, ref.x.values) and np.allclose(ndvi.y.values, ref.y.values):
+            return ndvi.values
+        return ndvi.rio.reproject_match(ref, resampling=Resampling.nearest, nodata=np.nan).values
+
+    def _init_state(self, shape):
+        if self.method == 'mean':
+            self._state = {
+                'weighted_sum': np.zeros(shape, dtype=np.float64),
+                'weight_sum': np.zeros(shape, dtype=np.float64)
+            }
+        elif self.method == 'max':
+            self._state = {'max': np.full(shape, np.nan, dtype=np.float32)}
+        elif self.method == 'median':
+            self._state = {'hist': np.zeros(shape + (self.median_bins,), dtype=np.uint16)}
+        else:
+            self._state = {
+                'value': np.full(shape, np.nan, dtype=np.float32),
+                'score': np.full(shape, -np.inf, dtype=np.float32)
+            }
 
-    # Composição ponderada
-    ndvi_stack = xr.concat(ndvi_arrays, dim='time')
-    weights_array = xr.DataArray(weights, dims=['time'])
+    def _fold(self, values, weight, score):
+        """Dobra uma cena nos acumuladores, bloco de linhas a bloco de linhas"""
+        state = self._state
+        for start in range(0, values.shape[0], self.chunk_rows):
+            block = slice(start, start + self.chunk_rows)
+            ndvi_b = values[block]
+            valid = np.isfinite(ndvi_b)
+
+            if self.method == 'mean':
+                state['weighted_sum'][block] += np.where(valid, ndvi_b * weight, 0.0)
+                state['weight_sum'][block] += np.where(valid, weight, 0.0)
+            elif self.method == 'max':
+                state['max'][block] = np.fmax(state['max'][block], ndvi_b)
+            elif self.method == 'median':
+                bins = np.clip(((ndvi_b[valid] + 1.0) / 2.0 * self.median_bins).astype(np.int64), 0, self.median_bins - 1)
+                rows, cols = np.nonzero(valid)
+                np.add.at(state['hist'][block], (rows, cols, bins), 1)
+            else:
+                better = valid & (score > state['score'][block])
+                state['value'][block] = np.where(better, ndvi_b, state['value'][block])
+                state['score'][block] = np.where(better, score, state['score'][block])
+
+    def _median(self):
+        """
+        Mediana aproximada a partir dos histogramas, bloco a bloco. Os valores de
+        cada bin são tratados como espalhados uniformemente dentro dele; com n
+        ímpar vale o posto (n+1)/2 e com n par a média dos postos n/2 e n/2+1
+        """
+        hist = self._state['hist']
+        width = 2.0 / self.median_bins
+        median = np.full(hist.shape[:2], np.nan, dtype=np.float32)
+        for start in range(0, hist.shape[0], self.chunk_rows):
+            block = slice(start, start + self.chunk_rows)
+            hist_b = hist[block]
+            cumulative = np.cumsum(hist_b, axis=-1, dtype=np.int64)
+            total = cumulative[..., -1]
+
+            def rank_value(rank):
+                """Valor estimado do rank-ésimo (1..n) pixel ordenado"""
+                k = np.argmax(cumulative >= rank[..., None], axis=-1)
+                in_bin = np.take_along_axis(hist_b, k[..., None], axis=-1)[..., 0]
+                before = np.take_along_axis(cumulative, k[..., None], axis=-1)[..., 0] - in_bin
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    position = (rank - before - 0.5) / in_bin
+                return -1.0 + (k + position) * width
+
+            lower = rank_value((total + 1) // 2)
+            upper = rank_value(total // 2 + 1)
+            median[block] = np.where(total > 0, (lower + upper) / 2.0, np.nan)
+        return median
+
+    def add(self, item_data):
+        """Acrescenta uma cena processada (resultado de load_and_process_hls_data)"""
+        ndvi = item_data['ndvi']
+        if self._reference is None:
+            self._reference = ndvi
+            self._first = item_data
+            self._init_state(ndvi.shape)
+        else:
+            # Cena única devolvida inteira; a partir da segunda, só os acumuladores
+            self._first = None
+
+        self._fold(self._align(ndvi), item_data['valid_fraction'], scene_score(item_data))
+
+        # Mantém apenas o necessário para o log; arrays da cena são liberados
+        self.source_items.append({
+            'item': item_data['item'],
+            'stats': item_data['stats'],
+            'valid_fraction': item_data['valid_fraction']
+        })
+
+    def result(self):
+        """Composição final no mesmo formato de create_ndvi_composite"""
+        if not self.source_items:
+            return None
+
+        print(f"\n🎨 Criando composição NDVI ({self.method}) de {len(self.source_items)} itens...")
+
+        # Se apenas um item, retornar diretamente
+        if self._first is not None:
+            return self._first
+
+        if self.method == 'mean':
+            weight_sum = self._state['weight_sum']
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values = np.where(weight_sum > 0, self._state['weighted_sum'] / weight_sum, np.nan)
+        elif self.method == 'max':
+            values = self._state['max']
+        elif self.method == 'median':
+            values = self._median()
+        else:
+            values = self._state['value']
 
-    # Média ponderada ignorando NaN
-    composite_ndvi = ndvi_stack.weighted(weights_array).mean(dim='time', skipna=True)
+        composite_ndvi = xr.DataArray(values, coords=self._reference.coords, dims=self._reference.dims)
+        composite_ndvi = composite_ndvi.rio.write_crs(self._reference.rio.crs)
 
-    print("✅ Composição NDVI criada")
-    print(f"   📊 NDVI final min: {np.nanmin(composite_ndvi.values):.3f}")
-    print(f"   📊 NDVI final max: {np.nanmax(composite_ndvi.values):.3f}")
-    print(f"   📊 NDVI final médio: {np.nanmean(composite_ndvi.values):.3f}")
+        print("✅ Composição NDVI criada")
+        print(f"   📊 NDVI final min: {np.nanmin(values):.3f}")
+        print(f"   📊 NDVI final max: {np.nanmax(values):.3f}")
+        print(f"   📊 NDVI final médio: {np.nanmean(values):.3f}")
 
-    return {
-        'ndvi': composite_ndvi,
-        'source_items': processed_items,
-        'stats': {
-            'min': float(np.nanmin(composite_ndvi.values)),
-            'max': float(np.nanmax(composite_ndvi.values)),
-            'mean': float(np.nanmean(composite_ndvi.values)),
-            'std': float(np.nanstd(composite_ndvi.values))
+        return {
+            'ndvi': composite_ndvi,
+            'method': self.method,
+            'source_items': self.source_items,
+            'stats': {
+                'min': float(np.nanmin(values)),
+                'max': float(np.nanmax(values)),
+                'mean': float(np.nanmean(values)),
+                'std': float(np.nanstd(values))
+            }
         }
-    }
+
+
+# Nome anterior (composição por média ponderada)
+NDVICompositeAccumulator = StreamingNDVICompositor
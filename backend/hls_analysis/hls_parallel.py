@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+HLS Parallel - Processamento paralelo de cenas HLS
+Executa load_and_process_hls_data para várias cenas em um pool de processos
+(ou em um cluster dask distributed local) e entrega cada resultado assim que
+fica pronto, para que a composição avance sem esperar a cena mais lenta.
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Importar configurações centralizadas
+try:
+    from .config_hls import get_config
+    from .hls_ndvi_processing import load_and_process_hls_data
+except ImportError:
+    from config_hls import get_config
+    from hls_ndvi_processing import load_and_process_hls_data
+
+# Carregar configurações centralizadas
+config = get_config()
+
+SCENE_EXECUTOR = config['parallel']['scene_executor']
+SCENE_WORKERS = config['parallel']['scene_workers']
+WORKER_MEMORY_LIMIT = config['parallel']['worker_memory_limit']
+
+_MEMORY_UNITS = {"": 1, "B": 1}
+for _power, _prefix in enumerate("KMGT", start=1):
+    _MEMORY_UNITS[_prefix] = _MEMORY_UNITS[f"{_prefix}B"] = 1024 ** _power
+
+
+def parse_memory_limit(value):
+    """'4GB' / '512MB' / 4294967296 -> bytes (None = sem limite)"""
+    if value in (None, "", 0):
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = re.fullmatch(r"\s*([\d.]+)\s*([KMGT]?B?)\s*", str(value).upper())
+    if not match:
+        raise ValueError(f"Limite de memória inválido: {value}")
+    return int(float(match.group(1)) * _MEMORY_UNITS[match.group(2)])
+
+
+def _limit_worker_memory(limit_bytes):
+    """Inicializador do processo: limita o espaço de endereçamento do worker (Unix)"""
+    if not limit_bytes:
+        return
+    try:
+        import resource
+        resource.setrlimit(resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+    except (ImportError, ValueError, OSError) as e:
+        print(f"   ⚠️ Não foi possível limitar a memória do worker: {e}")
+
+
+def _resolve_workers(workers, n_items):
+    workers = workers or SCENE_WORKERS or os.cpu_count() or 1
+    return max(1, min(int(workers), n_items))
+
+
+def iter_processed_scenes(items, aoi_bounds, executor=None, workers=None, memory_limit=None, failed=None):
+    """
+    Processa as cenas em paralelo e produz (índice, item, resultado) na ordem de conclusão
+
+    Args:
+        items: Itens STAC selecionados
+        aoi_bounds: Bounds da AOI (WGS84)
+        executor: 'process' | 'dask' | 'serial' (padrão: configuração)
+        workers: Número de workers (padrão: configuração ou núcleos disponíveis)
+        memory_limit: Limite de memória por worker, ex.: '4GB' (padrão: configuração)
+        failed: Lista opcional que recebe os índices das cenas que falharam
+
+    O resultado é None quando a cena falha (inclusive por falta de memória no worker)
+    ou não tem pixels válidos suficientes; só as falhas entram em `failed`
+    """
+    items = list(items)
+    if not items:
+        return
+
+    executor = executor or SCENE_EXECUTOR
+    workers = _resolve_workers(workers, len(items))
+    memory_limit = memory_limit if memory_limit is not None else WORKER_MEMORY_LIMIT
+
+    if executor == "serial" or workers == 1:
+        for index, item in enumerate(items):
+            try:
+                result = load_and_process_hls_data(item, aoi_bounds, raise_errors=True)
+            except Exception:
+                result = _scene_failed(failed, index)
+            yield index, item, result
+        return
+
+    if executor == "dask":
+        yield from _iter_dask(items, aoi_bounds, workers, memory_limit, failed)
+        return
+
+    print(f"   ⚙️ Pool de processos: {workers} workers, limite de memória {memory_limit or 'nenhum'}")
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_limit_worker_memory,
+        initargs=(parse_memory_limit(memory_limit),)
+    ) as pool:
+        futures = {
+            pool.submit(load_and_process_hls_data, item, aoi_bounds, raise_errors=True): index
+            for index, item in enumerate(items)
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   ❌ Worker falhou na cena {items[index].id}: {e}")
+                result = _scene_failed(failed, index)
+            yield index, items[index], result
+
+
+def _scene_failed(failed, index):
+    """Registra a cena que falhou (quando pedido) e devolve o resultado vazio"""
+    if failed is not None:
+        failed.append(index)
+    return None
+
+
+def _iter_dask(items, aoi_bounds, workers, memory_limit, failed=None):
+    """Mesmo contrato, em um LocalCluster do dask distributed (memory_limit por worker)"""
+    from dask.distributed import Client, LocalCluster, as_completed as dask_as_completed
+
+    print(f"   ⚙️ Cluster dask local: {workers} workers, limite de memória {memory_limit or 'nenhum'}")
+    with LocalCluster(
+        n_workers=workers,
+        threads_per_worker=1,
+        processes=True,
+        memory_limit=memory_limit or 0
+    ) as cluster, Client(cluster) as client:
+        futures = [
+            client.submit(load_and_process_hls_data, item, aoi_bounds, raise_errors=True, pure=False)
+            for item in items
+        ]
+        index_of = {future.key: index for index, future in enumerate(futures)}
+        for future in dask_as_completed(futures):
+            index = index_of[future.key]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"   ❌ Worker falhou na cena {items[index].id}: {e}")
+                result = _scene_failed(failed, index)
+            yield index, items[index], result
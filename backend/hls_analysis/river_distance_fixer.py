@@ -11,6 +11,11 @@ import osmnx as ox
 from pyproj import Transformer
 import numpy as np
 
+try:
+    from .hls_analysis import configure_osmnx_cache, geocode_region_to_gdf
+except ImportError:
+    from hls_analysis import configure_osmnx_cache, geocode_region_to_gdf
+
 def fix_river_distances_in_geojson(geojson_path, region="Sinimbu, Rio Grande do Sul, Brasil"):
     """
     Corrige as distâncias do rio em um arquivo GeoJSON existente
@@ -43,8 +48,10 @@ def fix_river_distances_in_geojson(geojson_path, region="Sinimbu, Rio Grande do
     print(f"🌊 Buscando rios na região: {region}")
     
     try:
-        # Buscar rios
-        rivers = ox.features_from_place(region, tags={'waterway': 'river'})
+        # Buscar rios (geocodificação via cliente Nominatim compartilhado)
+        configure_osmnx_cache(ox)
+        boundary = geocode_region_to_gdf(region)
+        rivers = ox.features_from_polygon(boundary.geometry.iloc[0], tags={'waterway': 'river'})
         
         if rivers.empty:
             print("❌ Nenhum rio encontrado na região")
@@ -1,9 +1,11 @@
+import asyncio
 import os
 import sys
 from pathlib import Path
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from fastapi.staticfiles import StaticFiles
 import uvicorn
 from contextlib import asynccontextmanager
 
@@ -14,7 +16,12 @@ if str(CURRENT_DIR) not in sys.path:
 
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.core.database import init_db
+from app.core.database import init_db, get_supabase_client
+from app.services.gazetteer_service import gazetteer
+from app.services.biome_service import biome_locator
+from app.services.image_upload_service import image_upload_service
+from app.core.password_hashing import password_hasher
+from app.services.recommendation_catalog import recommendation_catalog
 
 
 @asynccontextmanager
@@ -22,9 +29,22 @@ async def lifespan(app: FastAPI):
     # Startup
     print("🚀 Iniciando OrBee.Online Backend...")
     await init_db()
+    gazetteer.load()
+    # Tabela incompleta: avisa ou, com IBGE_GAZETTEER_AUTO_BUILD, regenera em segundo plano
+    asyncio.get_running_loop().run_in_executor(None, gazetteer.ensure_complete)
+    biome_locator.load()
+    # Sem a malha de biomas: avisa ou, com IBGE_BIOMES_AUTO_BUILD, gera em segundo plano (aproximação até lá)
+    asyncio.get_running_loop().run_in_executor(None, biome_locator.ensure_loaded)
+    try:
+        recommendation_catalog.refresh(get_supabase_client())
+    except Exception as e:
+        # Carregado sob demanda na primeira consulta
+        print(f"⚠️ Catálogo de recomendações não carregado: {e}")
     yield
     # Shutdown
     print("🛑 Encerrando OrBee.Online Backend...")
+    image_upload_service.shutdown()
+    password_hasher.shutdown()
 
 
 app = FastAPI(
@@ -46,6 +66,10 @@ app.add_middleware(
 # Rotas da API
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# Imagens enviadas (original + derivados WebP), servidas como arquivos estáticos
+image_upload_service.upload_dir.mkdir(parents=True, exist_ok=True)
+app.mount(settings.MEDIA_URL, StaticFiles(directory=str(image_upload_service.upload_dir)), name="media")
+
 
 @app.get("/")
 async def root():
@@ -62,7 +86,8 @@ async def root():
 async def health_check():
     return JSONResponse({
         "status": "healthy",
-        "service": "orbee-api"
+        "service": "orbee-api",
+        "password_hashing": password_hasher.metrics()
     })
 
 